@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, Literal, Dict
 
 
 class Settings(BaseSettings):
@@ -9,7 +9,81 @@ class Settings(BaseSettings):
     frontend_url: str
     node_env: str = "production"
     port: int = 8000
+    # Роль процесса: all - API и фоновые задачи в одном процессе,
+    # api - только API (задачи уходят воркеру), worker - только задачи парсинга
+    server_role: Literal["all", "api", "worker"] = "all"
+    web_concurrency: int = 1  # Число процессов uvicorn для API
+    worker_max_jobs: int = 2  # Сколько задач парсинга воркер выполняет одновременно
+    # Лимиты одновременных задач по типам на процесс-воркер (JSON: {"parse_category": 2});
+    # тип без лимита ограничен только worker_max_jobs
+    job_type_limits: Dict[str, int] = {"update_prices": 1, "parse_category": 1, "parse_products": 1}
+    job_poll_seconds: float = 30.0  # Опрос очереди scrape_jobs на случай пропущенного NOTIFY
+    # Задача, от воркера которой нет heartbeat дольше job_stale_seconds, считается брошенной
+    # и продолжается другим воркером с checkpoint; после job_max_attempts захватов - failed
+    job_stale_seconds: float = 120.0
+    job_max_attempts: int = 3
+    # Пул потоков Selenium: число одновременных браузеров и длина очереди к ним
+    selenium_pool_size: int = 1
+    selenium_queue_size: int = 4
+    # Процессы для разбора HTML страниц товаров (0 - разбирать в потоке текущего процесса)
+    parse_process_pool_size: int = 2
+    # Общий HTTP-клиент Poizon (app/utils/poizon_client.py)
+    poizon_http2: bool = True  # Работает, если установлен пакет h2
+    poizon_max_connections: int = 20
+    poizon_max_connections_per_host: int = 6  # Верхняя граница AIMD-окна одновременных запросов к хосту
+    # Адаптивный темп запросов к хосту (app/utils/rate_limiter.py): запросов в секунду и пачка
+    poizon_max_rate_per_host: float = 4.0
+    poizon_min_rate_per_host: float = 0.2
+    poizon_rate_burst: int = 4
+    # Повторы временных ошибок (таймауты, 429/5xx): число попыток и экспоненциальная пауза
+    poizon_retry_attempts: int = 4
+    poizon_retry_base_delay: float = 1.0
+    poizon_retry_max_delay: float = 30.0
+    # Circuit breaker хоста (app/utils/circuit_breaker.py): отказов подряд до паузы,
+    # начальная и максимальная пауза, сколько запрос может ждать конца паузы
+    poizon_circuit_failure_threshold: int = 5
+    poizon_circuit_open_seconds: float = 30.0
+    poizon_circuit_max_open_seconds: float = 600.0
+    poizon_circuit_max_wait_seconds: float = 300.0
+    poizon_cookies: Optional[str] = None  # Cookies согласия: "name=value; name2=value2"
+    poizon_max_page_bytes: int = 8 * 1024 * 1024  # Предел размера страницы при потоковой загрузке
+    # Дисковый кэш страниц с перепроверкой по ETag/Last-Modified (пустая строка - без кэша)
+    poizon_http_cache_dir: Optional[str] = ".cache/poizon-http"
+    poizon_http_cache_max_bytes: int = 512 * 1024 * 1024
+    # Отключенные стратегии разбора страницы товара: "title/json_ld,price/text_regex"
+    poizon_disabled_strategies: Optional[str] = None
+    # Сколько POST /admin/parse-poizon ждет задачу парсинга товара, прежде чем ответить 504
+    admin_parse_wait_seconds: float = 300.0
+    # Обновление цен: сколько товаров обрабатывается одновременно и размер пачки записи в БД
+    # (фактический темп запросов задает ограничитель хоста)
+    price_refresh_workers: int = 8
+    price_refresh_write_batch: int = 50
+    # Очередь обновления цен: товары берутся по давность × частота изменения цены × популярность,
+    # пока не истечет бюджет времени; base_change_rate (изменений в сутки) - минимальная частота,
+    # чтобы товары со стабильной ценой тоже проверялись
+    price_refresh_time_budget_seconds: float = 1800.0
+    price_refresh_base_change_rate: float = 0.05
+    # Аренда товаров (несколько запусков на разных процессах и нодах не пересекаются):
+    # срок аренды (продлевается, пока товар обрабатывается), размер арендуемой пачки
+    # и сколько задач update_prices ставит один cron-запрос
+    price_refresh_lease_seconds: float = 300.0
+    price_refresh_lease_batch: int = 20
+    price_refresh_parallel_jobs: int = 1
+    # Популярность товара - просмотры карточки с затуханием; счетчики пишутся в БД раз в flush_seconds
+    popularity_half_life_days: float = 7.0
+    product_views_flush_seconds: float = 60.0
+    # Параллельное скачивание изображений товара: на один товар, на процесс, таймаут на изображение
+    image_download_concurrency: int = 5
+    image_download_global_concurrency: int = 16
+    image_download_timeout: float = 15.0
+    # Логи (app/logging_config.py): уровень и формат вывода (text или json - одна JSON-строка на запись)
+    log_level: str = "INFO"
+    log_format: Literal["text", "json"] = "text"
     cors_origins: Optional[str] = None
+    # In-memory снимок каталога для GET /products (см. app/db/catalog_snapshot.py).
+    # Изменения приходят через LISTEN/NOTIFY, периодическое обновление - страховка
+    catalog_snapshot_enabled: bool = True
+    catalog_snapshot_refresh_seconds: float = 300.0
     # Примечание: бот управляется через n8n, токен нужен только для валидации initData
 
     class Config:
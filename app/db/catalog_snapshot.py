@@ -0,0 +1,303 @@
+"""
+In-memory снимок активного каталога для списков товаров.
+Фильтры и сортировка get_products выполняются в памяти, Postgres видит только запись
+и редкие инкрементальные обновления по updated_at.
+"""
+import logging
+import asyncio
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from app.db import queries
+from app.utils.category_mapping import MAIN_CATEGORIES_WITH_SUBCATEGORIES
+
+logger = logging.getLogger(__name__)
+
+
+# Перекрытие окна инкрементального обновления: строки, закоммиченные чуть позже
+# своего updated_at, не должны потеряться
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+class ProductSummary:
+    """Краткая карточка товара в снимке (без per-row dict)"""
+    __slots__ = (
+        'id', 'title', 'description', 'price_cents', 'category', 'season',
+        'source_url', 'created_at', 'updated_at', 'size_guide', 'images_urls',
+        'title_lower', 'description_lower'
+    )
+
+    def __init__(self, row: Dict[str, Any]):
+        self.id = str(row['id'])
+        self.title = row.get('title')
+        self.description = row.get('description')
+        self.price_cents = row.get('price_cents')
+        self.category = row.get('category')
+        self.season = row.get('season')
+        self.source_url = row.get('source_url')
+        self.created_at = row.get('created_at')
+        self.updated_at = row.get('updated_at')
+        self.size_guide = row.get('size_guide')
+        self.images_urls = tuple(row.get('images_urls') or ())
+        # NULL в ILIKE не совпадает ни с чем, поэтому None сохраняем как None
+        self.title_lower = self.title.lower() if self.title is not None else None
+        self.description_lower = self.description.lower() if self.description is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Карточка в том же виде, что возвращает queries.get_products"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'price_cents': self.price_cents,
+            'category': self.category,
+            'season': self.season,
+            'source_url': self.source_url,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'is_active': True,
+            'size_guide': self.size_guide,
+            'images_urls': list(self.images_urls),
+            'images_base64': []
+        }
+
+
+def _sort_key(item: ProductSummary):
+    # ORDER BY created_at DESC; NULL в Postgres при DESC идут первыми
+    created_at = item.created_at
+    return (created_at is None, created_at.timestamp() if created_at is not None else 0)
+
+
+def _ilike_matcher(pattern: str) -> Callable[[Optional[str]], bool]:
+    """
+    Аналог ILIKE для уже приведенного к нижнему регистру текста.
+    Шаблон вида %текст% без спецсимволов проверяется поиском подстроки.
+    """
+    inner = pattern[1:-1] if len(pattern) >= 2 and pattern[0] == '%' and pattern[-1] == '%' else None
+    if inner is not None and not any(ch in inner for ch in '%_\\'):
+        needle = inner.lower()
+        return lambda text: text is not None and needle in text
+
+    parts = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        if ch == '%':
+            parts.append('.*')
+        elif ch == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(ch))
+        i += 1
+    regex = re.compile(''.join(parts), re.IGNORECASE | re.DOTALL)
+    return lambda text: text is not None and regex.fullmatch(text) is not None
+
+
+class CatalogSnapshot:
+    """Снимок активных товаров; чтение без блокировок, запись через copy-on-write"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (by_id, ordered, by_category) подменяется целиком, читатели берут ссылку один раз
+        self._view: Tuple[Dict[str, ProductSummary], Tuple[ProductSummary, ...], Dict[str, Tuple[ProductSummary, ...]]] = ({}, (), {})
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._view[0])
+
+    def load(self) -> None:
+        """Полная загрузка активного каталога"""
+        rows = queries.get_product_summaries_changed_since(None)
+        by_id = {}
+        for row in rows:
+            item = ProductSummary(row)
+            by_id[item.id] = item
+        with self._lock:
+            first_load = not self.loaded
+            self._watermark = self._max_updated_at(rows, None)
+            self._publish(by_id)
+            self.loaded = True
+        if first_load:
+            logger.info("Catalog snapshot loaded: %s products", len(by_id))
+
+    def refresh(self) -> int:
+        """Инкрементальное обновление по updated_at, возвращает число примененных изменений"""
+        if not self.loaded or self._watermark is None:
+            self.load()
+            return 0
+        since = self._watermark - REFRESH_OVERLAP
+        rows = queries.get_product_summaries_changed_since(since)
+        return self.apply(rows)
+
+    def apply(self, rows: List[Dict[str, Any]]) -> int:
+        """Применить изменившиеся строки: активные добавить/обновить, неактивные удалить"""
+        if not rows:
+            return 0
+        with self._lock:
+            by_id = self._view[0]
+            changed = 0
+            new_by_id = None
+            for row in rows:
+                product_id = str(row['id'])
+                existing = by_id.get(product_id)
+                if not row.get('is_active', True):
+                    if existing is None:
+                        continue
+                    new_by_id = new_by_id if new_by_id is not None else dict(by_id)
+                    new_by_id.pop(product_id, None)
+                    changed += 1
+                    continue
+                if existing is not None and existing.updated_at is not None and existing.updated_at == row.get('updated_at'):
+                    continue
+                new_by_id = new_by_id if new_by_id is not None else dict(by_id)
+                new_by_id[product_id] = ProductSummary(row)
+                changed += 1
+            self._watermark = self._max_updated_at(rows, self._watermark)
+            if new_by_id is not None:
+                self._publish(new_by_id)
+        return changed
+
+    def remove(self, product_id: str) -> None:
+        """Убрать товар из снимка (удален или деактивирован)"""
+        with self._lock:
+            by_id = self._view[0]
+            if product_id in by_id:
+                new_by_id = dict(by_id)
+                del new_by_id[product_id]
+                self._publish(new_by_id)
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        season: Optional[str] = None,
+        q: Optional[str] = None,
+        size: Optional[str] = None,
+        brand: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Те же фильтры и порядок, что у queries.get_products"""
+        _, ordered, by_category = self._view
+        candidates = ordered
+        if category:
+            if category in MAIN_CATEGORIES_WITH_SUBCATEGORIES:
+                categories = {category, *MAIN_CATEGORIES_WITH_SUBCATEGORIES[category]}
+                candidates = [item for item in ordered if item.category in categories]
+            else:
+                candidates = by_category.get(category, ())
+
+        checks = []
+        if season:
+            checks.append(lambda item: item.season == season)
+        if q:
+            q_match = _ilike_matcher(f'%{q}%')
+            checks.append(lambda item: q_match(item.title_lower) or q_match(item.description_lower))
+        if size:
+            size_match = _ilike_matcher(f'%{size}:%')
+            checks.append(lambda item: size_match(item.description_lower))
+        if brand:
+            brand_match = _ilike_matcher(f'%{brand}%')
+            checks.append(lambda item: brand_match(item.title_lower))
+
+        # LIMIT/OFFSET как в SQL: limit=0 - пустой ответ; отрицательные значения отсекает валидация роута
+        start = offset or 0
+        stop = start + limit if limit is not None else None
+        results = []
+        if stop is not None and start >= stop:
+            return results
+        matched = 0
+        for item in candidates:
+            if checks and not all(check(item) for check in checks):
+                continue
+            if matched >= start:
+                results.append(item.to_dict())
+            matched += 1
+            if stop is not None and matched >= stop:
+                break
+        return results
+
+    async def apply_notifications(self, payloads: List[Dict[str, Any]]) -> None:
+        """Точечное применение уведомлений об изменениях товаров (из ChangeFeed)"""
+        if not self.loaded:
+            return
+        deleted = set()
+        changed = []
+        for payload in payloads:
+            product_id = payload.get('id')
+            if not product_id:
+                continue
+            if payload.get('op') == 'delete':
+                deleted.add(product_id)
+            elif product_id not in changed:
+                changed.append(product_id)
+        for product_id in deleted:
+            self.remove(product_id)
+        changed = [product_id for product_id in changed if product_id not in deleted]
+        if changed:
+            rows = await asyncio.to_thread(queries.get_products_by_ids, changed, True)
+            self.apply(rows)
+
+    def get_many(self, product_ids: List[str]) -> List[Dict[str, Any]]:
+        """Карточки по списку id в порядке запроса"""
+        by_id = self._view[0]
+        return [by_id[product_id].to_dict() for product_id in product_ids if product_id in by_id]
+
+    def start(self, refresh_seconds: float) -> None:
+        """Запустить фоновую загрузку и периодическое обновление снимка"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._refresh_loop(refresh_seconds))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def refresh_soon(self) -> None:
+        """Попросить фоновую задачу обновиться сразу (после записи в этом процессе)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _refresh_loop(self, refresh_seconds: float) -> None:
+        while True:
+            try:
+                changed = await asyncio.to_thread(self.refresh)
+                if changed and self.loaded:
+                    logger.info("Catalog snapshot refreshed: %s changes, %s products", changed, len(self))
+            except Exception as e:
+                logger.error("Error refreshing catalog snapshot: %s", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _publish(self, by_id: Dict[str, ProductSummary]) -> None:
+        ordered = tuple(sorted(by_id.values(), key=_sort_key, reverse=True))
+        by_category: Dict[str, List[ProductSummary]] = {}
+        for item in ordered:
+            by_category.setdefault(item.category, []).append(item)
+        self._view = (by_id, ordered, {key: tuple(value) for key, value in by_category.items()})
+
+    @staticmethod
+    def _max_updated_at(rows: List[Dict[str, Any]], current: Optional[datetime]) -> Optional[datetime]:
+        for row in rows:
+            updated_at = row.get('updated_at')
+            if updated_at is not None and (current is None or updated_at > current):
+                current = updated_at
+        return current
+
+
+catalog_snapshot = CatalogSnapshot()
@@ -0,0 +1,106 @@
+"""
+Слушатель Postgres LISTEN/NOTIFY для согласования кэшей между воркерами и нодами.
+Держит отдельное autocommit-соединение (через PgBouncer работает только в session mode)
+и передает обработчику пачки payload'ов, накопившихся с прошлого пробуждения.
+"""
+import logging
+import asyncio
+import json
+import psycopg2
+import psycopg2.extensions
+from typing import Optional, List, Dict, Any, Callable, Awaitable
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+KEEPALIVE_SECONDS = 60.0
+
+
+class ChangeFeed:
+    """Фоновая задача LISTEN <channel> с переподключением"""
+
+    def __init__(
+        self,
+        channel: str,
+        handler: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+        on_reconnect: Optional[Callable[[], None]] = None
+    ):
+        self.channel = channel
+        self.handler = handler
+        # Пока соединения не было, уведомления терялись - даем кэшу шанс догнать
+        self.on_reconnect = on_reconnect
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        delay = 1.0
+        first_connect = True
+        while True:
+            conn = None
+            loop = asyncio.get_running_loop()
+            try:
+                conn = await asyncio.to_thread(self._connect)
+                logger.info("Listening for %s notifications", self.channel)
+                delay = 1.0
+                if not first_connect and self.on_reconnect:
+                    self.on_reconnect()
+                first_connect = False
+
+                readable = asyncio.Event()
+                loop.add_reader(conn.fileno(), readable.set)
+                try:
+                    while True:
+                        try:
+                            await asyncio.wait_for(readable.wait(), timeout=KEEPALIVE_SECONDS)
+                        except asyncio.TimeoutError:
+                            # Тишина в канале: проверяем, что соединение живо
+                            with conn.cursor() as cur:
+                                cur.execute('SELECT 1')
+                        readable.clear()
+                        conn.poll()
+                        payloads = []
+                        while conn.notifies:
+                            notify = conn.notifies.pop(0)
+                            try:
+                                payloads.append(json.loads(notify.payload))
+                            except (json.JSONDecodeError, TypeError):
+                                logger.warning("Ignoring malformed %s payload: %s", self.channel, notify.payload[:200])
+                        if payloads:
+                            try:
+                                await self.handler(payloads)
+                            except Exception as e:
+                                logger.error("Error handling %s notifications: %s", self.channel, e)
+                finally:
+                    loop.remove_reader(conn.fileno())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("%s listener error: %s, reconnecting in %.0fs", self.channel, e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _connect(self):
+        conn = psycopg2.connect(settings.database_url)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self.channel}"')
+        return conn
@@ -0,0 +1,56 @@
+"""
+Счетчик просмотров карточек товаров для popularity_score (очередь обновления цен).
+Просмотры копятся в памяти процесса и раз в PRODUCT_VIEWS_FLUSH_SECONDS пишутся
+в БД одной пачкой: запрос карточки не делает лишней записи в Postgres.
+"""
+import logging
+import asyncio
+from collections import Counter
+from typing import Optional
+from app.config import settings
+from app.db import queries
+
+logger = logging.getLogger(__name__)
+
+
+class ProductViews:
+    def __init__(self):
+        self._views: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, product_id: str) -> None:
+        self._views[product_id] += 1
+
+    def start(self, flush_seconds: float) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop(flush_seconds))
+
+    async def stop(self) -> None:
+        """Остановить фоновую запись и записать накопленное"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        views, self._views = self._views, Counter()
+        if not views:
+            return
+        try:
+            await asyncio.to_thread(
+                queries.add_product_views, dict(views), settings.popularity_half_life_days * 86400
+            )
+        except Exception as e:
+            logger.warning("Failed to save %s product views: %s", sum(views.values()), e)
+
+    async def _flush_loop(self, flush_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(flush_seconds)
+            await self.flush()
+
+
+product_views = ProductViews()
@@ -1,7 +1,30 @@
 from typing import Optional, List, Dict, Any
+from datetime import datetime
 from app.db.connection import get_db_connection
 
 
+# Поля краткой карточки товара для списков
+PRODUCT_SUMMARY_COLUMNS = """
+    id, title, description, price_cents, category, season,
+    source_url, created_at, updated_at, is_active,
+    size_guide, images_urls, images_base64
+"""
+
+# Канал LISTEN/NOTIFY об изменениях товаров (см. app/db/change_feed.py)
+PRODUCT_CHANGES_CHANNEL = 'product_changes'
+# Канал, которым постановка задачи в scrape_jobs будит воркеры (см. app/worker.py)
+SCRAPE_JOBS_CHANNEL = 'scrape_jobs'
+
+
+def _notify_product_change(cur, product_id: Any, category: Optional[str], operation: str) -> None:
+    """Уведомление об изменении товара; доставляется слушателям после коммита транзакции"""
+    import json
+    cur.execute(
+        'SELECT pg_notify(%s, %s)',
+        (PRODUCT_CHANGES_CHANNEL, json.dumps({'id': str(product_id), 'category': category, 'op': operation}))
+    )
+
+
 def upsert_user(user_data: Dict[str, Any]) -> Dict[str, Any]:
     """Создать или обновить пользователя"""
     with get_db_connection() as conn:
@@ -54,10 +77,8 @@ def get_products(
     with get_db_connection() as conn:
         with conn.cursor() as cur:
             # Выбираем только нужные поля
-            query = """
-                SELECT id, title, description, price_cents, category, season,
-                       source_url, created_at, updated_at, is_active,
-                       size_guide, images_urls, images_base64
+            query = f"""
+                SELECT {PRODUCT_SUMMARY_COLUMNS}
                 FROM products
                 WHERE is_active = true
             """
@@ -105,56 +126,103 @@ def get_products(
             
             cur.execute(query, params)
             rows = cur.fetchall()
-            import json
-            results = []
-            for row in rows:
-                result = dict(row)
-                
-                # images_urls
-                images_urls = result.get('images_urls')
-                if images_urls:
-                    if isinstance(images_urls, str):
-                        try:
-                            result['images_urls'] = json.loads(images_urls)
-                        except (json.JSONDecodeError, TypeError):
-                            result['images_urls'] = []
-                    elif not isinstance(images_urls, list):
-                        result['images_urls'] = []
-                else:
-                    result['images_urls'] = []
-                
-                # fallback: если images_urls нет, но images_base64 содержит URL
-                if not result['images_urls']:
-                    images_base64 = result.get('images_base64')
-                    if images_base64:
-                        if isinstance(images_base64, str):
-                            try:
-                                images_base64 = json.loads(images_base64)
-                            except (json.JSONDecodeError, TypeError):
-                                images_base64 = []
-                        if (
-                            images_base64
-                            and isinstance(images_base64, list)
-                            and isinstance(images_base64[0], str)
-                            and images_base64[0].startswith('http')
-                        ):
-                            result['images_urls'] = images_base64
-                        else:
-                            result['images_urls'] = []
-                
-                # для списка товаров не возвращаем тяжелые данные
-                result['images_base64'] = []
-                
-                # size_guide
-                size_guide = result.get('size_guide')
-                if isinstance(size_guide, str):
-                    try:
-                        result['size_guide'] = json.loads(size_guide)
-                    except (json.JSONDecodeError, TypeError):
-                        result['size_guide'] = None
-                
-                results.append(result)
-            return results
+            return [_row_to_summary(row) for row in rows]
+
+
+def get_products_by_ids(product_ids: List[str], include_inactive: bool = False) -> List[Dict[str, Any]]:
+    """
+    Возвращаем краткие карточки товаров по списку id одним запросом.
+    Порядок совпадает с порядком переданных id, неактивные (если не include_inactive)
+    и несуществующие пропускаются.
+    """
+    if not product_ids:
+        return []
+    
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # IN с кортежем планировщик разворачивает в id = ANY(...) по индексу первичного ключа,
+            # при этом литералы приводятся к типу колонки
+            cur.execute(
+                f"""
+                SELECT {PRODUCT_SUMMARY_COLUMNS}
+                FROM products
+                WHERE id IN %s AND (is_active = true OR %s)
+                """,
+                (tuple(product_ids), include_inactive)
+            )
+            rows = cur.fetchall()
+    
+    by_id = {str(row['id']): _row_to_summary(row) for row in rows}
+    return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+
+def get_product_summaries_changed_since(since: Optional[datetime]) -> List[Dict[str, Any]]:
+    """
+    Краткие карточки для снимка каталога.
+    Без since - все активные товары, иначе все измененные после since (включая деактивированные).
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            if since is None:
+                cur.execute(f'SELECT {PRODUCT_SUMMARY_COLUMNS} FROM products WHERE is_active = true')
+            else:
+                cur.execute(
+                    f'SELECT {PRODUCT_SUMMARY_COLUMNS} FROM products WHERE updated_at > %s',
+                    (since,)
+                )
+            rows = cur.fetchall()
+            return [_row_to_summary(row) for row in rows]
+
+
+def _row_to_summary(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Преобразовать строку products в краткую карточку для списков (без тяжелых images_base64)"""
+    import json
+    result = dict(row)
+    
+    # images_urls
+    images_urls = result.get('images_urls')
+    if images_urls:
+        if isinstance(images_urls, str):
+            try:
+                result['images_urls'] = json.loads(images_urls)
+            except (json.JSONDecodeError, TypeError):
+                result['images_urls'] = []
+        elif not isinstance(images_urls, list):
+            result['images_urls'] = []
+    else:
+        result['images_urls'] = []
+    
+    # fallback: если images_urls нет, но images_base64 содержит URL
+    if not result['images_urls']:
+        images_base64 = result.get('images_base64')
+        if images_base64:
+            if isinstance(images_base64, str):
+                try:
+                    images_base64 = json.loads(images_base64)
+                except (json.JSONDecodeError, TypeError):
+                    images_base64 = []
+            if (
+                images_base64
+                and isinstance(images_base64, list)
+                and isinstance(images_base64[0], str)
+                and images_base64[0].startswith('http')
+            ):
+                result['images_urls'] = images_base64
+            else:
+                result['images_urls'] = []
+    
+    # для списка товаров не возвращаем тяжелые данные
+    result['images_base64'] = []
+    
+    # size_guide
+    size_guide = result.get('size_guide')
+    if isinstance(size_guide, str):
+        try:
+            result['size_guide'] = json.loads(size_guide)
+        except (json.JSONDecodeError, TypeError):
+            result['size_guide'] = None
+    
+    return result
 
 
 def get_product_by_id(product_id: str) -> Optional[Dict[str, Any]]:
@@ -240,6 +308,7 @@ def create_product(product_data: Dict[str, Any]) -> Dict[str, Any]:
                 }
             )
             row = cur.fetchone()
+            _notify_product_change(cur, row['id'], row['category'], 'create')
             result = dict(row)
             # Парсим JSON обратно
             if isinstance(result.get('images_base64'), str):
@@ -303,6 +372,8 @@ def update_product(
             if not placeholders:
                 return get_product_by_id(product_id)
             
+            # updated_at нужен снимку каталога для инкрементального обновления
+            placeholders.append('updated_at = NOW()')
             params.append(product_id)
             query = f'UPDATE products SET {", ".join(placeholders)} WHERE id = %s RETURNING *'
             
@@ -310,6 +381,7 @@ def update_product(
             row = cur.fetchone()
             if not row:
                 return None
+            _notify_product_change(cur, row['id'], row['category'], 'update')
             result = dict(row)
             if isinstance(result.get('images_base64'), str):
                 try:
@@ -334,18 +406,366 @@ def delete_product(product_id: str) -> bool:
     with get_db_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                'UPDATE products SET is_active = false WHERE id = %s',
+                'UPDATE products SET is_active = false, updated_at = NOW() WHERE id = %s RETURNING id, category',
                 (product_id,)
             )
-            return cur.rowcount > 0
+            row = cur.fetchone()
+            if not row:
+                return False
+            _notify_product_change(cur, row['id'], row['category'], 'delete')
+            return True
+
+
+# Сглаживание оценки частоты изменения цены (изменений в сутки) по результатам проверок
+PRICE_CHANGE_EWMA_ALPHA = 0.3
+
+
+def _price_change_rate_sql(changed: bool) -> str:
+    """
+    Новое значение price_change_rate после проверки (старые значения колонок строки).
+    Изменение за интервал между проверками дает 1/интервал (сутки, не меньше часа), его отсутствие - 0.
+    Первая проверка и первый хэш ничего не говорят о частоте изменений
+    """
+    observed = '1.0 / GREATEST(EXTRACT(EPOCH FROM NOW() - last_checked_at) / 86400.0, 1.0 / 24)' if changed else '0.0'
+    alpha = PRICE_CHANGE_EWMA_ALPHA
+    return f"""
+        CASE WHEN last_checked_at IS NULL OR price_hash IS NULL THEN price_change_rate
+        ELSE {alpha} * {observed} + {1 - alpha} * COALESCE(price_change_rate, 0) END
+    """
+
+
+# Популярность на текущий момент: накопленный счет, затухающий с периодом полураспада %(half_life)s секунд
+_POPULARITY_NOW_SQL = """
+    COALESCE(popularity_score, 0)
+    * POWER(0.5, EXTRACT(EPOCH FROM NOW() - COALESCE(popularity_updated_at, NOW())) / %(half_life)s)
+"""
 
 
-def get_all_products_with_source_url() -> List[Dict[str, Any]]:
-    """Получить все товары с source_url для обновления"""
+def get_db_now() -> datetime:
+    """Текущее время по часам БД (для сравнения с отметками, записанными через NOW())"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT NOW() AS now")
+            return cur.fetchone()['now']
+
+
+def lease_products_for_price_refresh(
+    owner: str,
+    limit: int,
+    lease_seconds: float,
+    checked_before: datetime,
+    base_change_rate: float,
+    popularity_half_life_seconds: float
+) -> List[Dict[str, Any]]:
+    """
+    Взять в аренду до limit товаров, которые пора обновить: не проверенные после checked_before
+    (начало запуска) и не арендованные другими. Очередь: сначала ни разу не проверенные,
+    затем по ожидаемому числу изменений цены с последней проверки - давность (сутки)
+    × (частота изменений + base_change_rate) с поправкой на популярность.
+    base_change_rate не дает товарам со стабильной ценой выпасть из обновления совсем.
+    FOR UPDATE SKIP LOCKED и срок аренды: параллельные запуски (процессы, ноды) получают
+    непересекающиеся пачки, а аренда упавшего запуска истекает, и товары берут другие.
+    Истекшая аренда того же owner - товар, который этот запуск не смог обновить: повторно он его не берет
+    """
     with get_db_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                'SELECT id, source_url, title, price_cents FROM products WHERE is_active = true AND source_url IS NOT NULL'
+                """
+                UPDATE products p
+                SET refresh_lease_owner = %(owner)s,
+                    refresh_lease_until = NOW() + make_interval(secs => %(lease_seconds)s)
+                FROM (
+                    SELECT id FROM products
+                    WHERE is_active = true AND source_url IS NOT NULL
+                      AND (last_checked_at IS NULL OR last_checked_at < %(checked_before)s)
+                      AND (refresh_lease_until IS NULL OR refresh_lease_until < NOW())
+                      AND refresh_lease_owner IS DISTINCT FROM %(owner)s
+                    ORDER BY
+                        last_checked_at IS NOT NULL,
+                        EXTRACT(EPOCH FROM NOW() - last_checked_at) / 86400.0
+                            * (COALESCE(price_change_rate, 0) + %(base_rate)s)
+                            * (1 + LN(1 + """ + _POPULARITY_NOW_SQL + """)) DESC,
+                        created_at
+                    LIMIT %(limit)s
+                    FOR UPDATE SKIP LOCKED
+                ) due
+                WHERE p.id = due.id
+                RETURNING p.id, p.source_url, p.title, p.category, p.price_cents, p.price_hash, p.last_checked_at,
+                          p.price_change_rate, p.popularity_score
+                """,
+                {
+                    'owner': owner,
+                    'limit': limit,
+                    'lease_seconds': lease_seconds,
+                    'checked_before': checked_before,
+                    'base_rate': base_change_rate,
+                    'half_life': popularity_half_life_seconds,
+                }
             )
             rows = cur.fetchall()
             return [dict(row) for row in rows]
+
+
+def renew_product_leases(owner: str, product_ids: List[Any], lease_seconds: float) -> int:
+    """Продлить аренду товаров, которые еще обрабатываются; возвращает число продленных"""
+    if not product_ids:
+        return 0
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE products SET refresh_lease_until = NOW() + make_interval(secs => %s)
+                WHERE refresh_lease_owner = %s AND id IN %s
+                """,
+                (lease_seconds, owner, tuple(product_ids))
+            )
+            return cur.rowcount
+
+
+def release_product_leases(owner: str, keep_ids: Optional[List[Any]] = None) -> None:
+    """
+    Снять оставшиеся аренды запуска (товары, до которых он не дошел).
+    Аренды keep_ids (товары, которые не удалось обновить) остаются и истекают сами:
+    до этого товар не берет ни один запуск
+    """
+    query = 'UPDATE products SET refresh_lease_owner = NULL, refresh_lease_until = NULL WHERE refresh_lease_owner = %s'
+    params: List[Any] = [owner]
+    if keep_ids:
+        query += ' AND id NOT IN %s'
+        params.append(tuple(keep_ids))
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+
+
+def add_product_views(views: Dict[str, int], popularity_half_life_seconds: float) -> None:
+    """
+    Добавить просмотры товаров к popularity_score (с затуханием накопленного счета).
+    Без updated_at и уведомлений - для каталога товар не менялся
+    """
+    from psycopg2.extras import execute_batch
+    if not views:
+        return
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            execute_batch(
+                cur,
+                """
+                UPDATE products
+                SET popularity_score = """ + _POPULARITY_NOW_SQL + """ + %(views)s,
+                    popularity_updated_at = NOW()
+                WHERE id = %(id)s
+                """,
+                [
+                    {'id': product_id, 'views': count, 'half_life': popularity_half_life_seconds}
+                    for product_id, count in views.items()
+                ]
+            )
+
+
+def update_product_prices(rows: List[Dict[str, Any]]) -> None:
+    """
+    Записать пачку результатов обновления цен одной транзакцией.
+    rows: id, category, price_cents, description, price_hash. Запросы уходят пачками
+    (execute_batch), id остаются нетипизированными литералами и приводятся к типу колонки.
+    Хэш цен изменился - изменение учитывается в price_change_rate. Аренда товара снимается
+    """
+    import json
+    from psycopg2.extras import execute_batch
+    if not rows:
+        return
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            execute_batch(
+                cur,
+                """
+                UPDATE products
+                SET price_cents = %(price_cents)s, description = %(description)s,
+                    price_hash = %(price_hash)s, price_change_rate = """ + _price_change_rate_sql(True) + """,
+                    last_checked_at = NOW(), updated_at = NOW(),
+                    refresh_lease_owner = NULL, refresh_lease_until = NULL
+                WHERE id = %(id)s
+                """,
+                rows
+            )
+            execute_batch(
+                cur,
+                'SELECT pg_notify(%s, %s)',
+                [
+                    (PRODUCT_CHANGES_CHANNEL, json.dumps({'id': str(row['id']), 'category': row.get('category'), 'op': 'update'}))
+                    for row in rows
+                ]
+            )
+
+
+def mark_products_checked(product_ids: List[str]) -> None:
+    """
+    Отметить проверку товаров, цены которых не изменились: last_checked_at и price_change_rate,
+    аренда снимается; без updated_at и уведомлений - для каталога товар не менялся
+    """
+    if not product_ids:
+        return
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                'UPDATE products SET price_change_rate = ' + _price_change_rate_sql(False) + ', '
+                'last_checked_at = NOW(), refresh_lease_owner = NULL, refresh_lease_until = NULL '
+                'WHERE id IN %s',
+                (tuple(product_ids),)
+            )
+
+
+def _job_json(value: Any):
+    """JSONB-параметр: id товаров и даты сериализуются строками"""
+    import json
+    from psycopg2.extras import Json
+    return Json(value, dumps=lambda v: json.dumps(v, default=str, ensure_ascii=False))
+
+
+def enqueue_scrape_job(job_id: str, job_type: str, params: Dict[str, Any]) -> None:
+    """
+    Поставить задачу в очередь scrape_jobs и разбудить воркеры.
+    Уведомление уходит после коммита, так что воркер уже видит строку задачи
+    """
+    import json
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                'INSERT INTO scrape_jobs (id, type, params) VALUES (%s, %s, %s)',
+                (job_id, job_type, _job_json(params))
+            )
+            cur.execute(
+                'SELECT pg_notify(%s, %s)',
+                (SCRAPE_JOBS_CHANNEL, json.dumps({'id': job_id, 'type': job_type}))
+            )
+
+
+def claim_scrape_job(
+    job_types: List[str],
+    worker: str,
+    stale_seconds: float,
+    max_attempts: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Забрать самую старую задачу среди job_types: из очереди или брошенную - running,
+    от воркера которой не было вестей дольше stale_seconds (упал процесс, OOM).
+    Брошенная max_attempts раз задача считается неисполнимой и завершается с ошибкой.
+    SKIP LOCKED: конкурирующие воркеры не ждут друг друга и не получают одну задачу дважды
+    """
+    if not job_types:
+        return None
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE scrape_jobs
+                SET state = 'failed', error = 'Worker lost too many times', finished_at = NOW(), updated_at = NOW()
+                WHERE state = 'running' AND updated_at < NOW() - make_interval(secs => %s) AND attempts >= %s
+                """,
+                (stale_seconds, max_attempts)
+            )
+            cur.execute(
+                """
+                UPDATE scrape_jobs
+                SET state = 'running', worker = %s, attempts = attempts + 1,
+                    started_at = COALESCE(started_at, NOW()), updated_at = NOW()
+                WHERE id = (
+                    SELECT id FROM scrape_jobs
+                    WHERE type = ANY(%s) AND (
+                        state = 'queued'
+                        OR (state = 'running' AND updated_at < NOW() - make_interval(secs => %s))
+                    )
+                    ORDER BY created_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, type, params, worker, attempts, results, checkpoint
+                """,
+                (worker, list(job_types), stale_seconds)
+            )
+            return cur.fetchone()
+
+
+def save_scrape_job_progress(
+    job_id: str,
+    worker: str,
+    counters: Dict[str, int],
+    results: Dict[str, Any],
+    checkpoint: Optional[Dict[str, Any]]
+) -> bool:
+    """
+    Промежуточные счетчики, исходы и checkpoint выполняющейся задачи; заодно heartbeat (updated_at).
+    False - задачу забрал другой воркер, считая эту брошенной
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE scrape_jobs SET counters = %s, results = %s, checkpoint = %s, updated_at = NOW()
+                WHERE id = %s AND worker = %s AND state = 'running'
+                """,
+                (_job_json(counters), _job_json(results), _job_json(checkpoint), job_id, worker)
+            )
+            return cur.rowcount > 0
+
+
+def finish_scrape_job(
+    job_id: str,
+    worker: str,
+    state: str,
+    counters: Dict[str, int],
+    results: Dict[str, Any],
+    error: Optional[str] = None
+) -> None:
+    """Записать окончательное состояние задачи (если ее не забрал другой воркер)"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE scrape_jobs
+                SET state = %s, counters = %s, results = %s, error = %s, checkpoint = NULL,
+                    finished_at = NOW(), updated_at = NOW()
+                WHERE id = %s AND worker = %s
+                """,
+                (state, _job_json(counters), _job_json(results), error, job_id, worker)
+            )
+
+
+def requeue_scrape_job(
+    job_id: str,
+    worker: str,
+    counters: Dict[str, int],
+    results: Dict[str, Any],
+    checkpoint: Optional[Dict[str, Any]]
+) -> None:
+    """
+    Вернуть прерванную задачу в очередь (остановка процесса посреди выполнения)
+    вместе с прогрессом: следующий воркер продолжит с checkpoint
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE scrape_jobs
+                SET state = 'queued', worker = NULL, attempts = GREATEST(attempts - 1, 0),
+                    counters = %s, results = %s, checkpoint = %s, updated_at = NOW()
+                WHERE id = %s AND worker = %s AND state = 'running'
+                """,
+                (_job_json(counters), _job_json(results), _job_json(checkpoint), job_id, worker)
+            )
+
+
+def get_scrape_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Задача по id со временем выполнения (до текущего момента, если не завершена)"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, type, params, state, counters, results, error, worker, attempts,
+                       created_at, started_at, finished_at, updated_at,
+                       EXTRACT(EPOCH FROM COALESCE(finished_at, NOW()) - started_at) AS elapsed_seconds
+                FROM scrape_jobs WHERE id = %s
+                """,
+                (job_id,)
+            )
+            return cur.fetchone()
@@ -0,0 +1,96 @@
+"""
+Дополнения схемы БД, которые нужны коду и применяются при старте процесса.
+Сначала по каталогу (information_schema, pg_indexes) проверяется, чего не хватает, и
+выполняется только недостающий DDL: ALTER TABLE берет ACCESS EXCLUSIVE блокировку
+таблицы даже с IF NOT EXISTS, и при каждом старте процесса она ждала бы текущие запросы
+к products и блокировала следующие. Недостающее применяется под advisory-блокировкой,
+чтобы одновременно стартующие API и воркеры не мешали друг другу.
+"""
+import logging
+from typing import List, Set
+from app.db.connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+# Ключ pg_advisory_xact_lock для изменений схемы (произвольное постоянное число)
+SCHEMA_LOCK_KEY = 7_340_043
+
+# (объект, DDL) в порядке применения; объект - "таблица.колонка" для колонок,
+# имя таблицы или индекса для CREATE. DDL выполняется, только если объекта нет
+SCHEMA_CHANGES = (
+    # Хэш ценовой части страницы товара и время последней проверки (обновление цен)
+    ('products.price_hash', 'ALTER TABLE products ADD COLUMN IF NOT EXISTS price_hash TEXT'),
+    ('products.last_checked_at', 'ALTER TABLE products ADD COLUMN IF NOT EXISTS last_checked_at TIMESTAMPTZ'),
+    # Очередь обновления цен: частота изменения цены (EWMA, изменений в сутки) и популярность
+    ('products.price_change_rate',
+     'ALTER TABLE products ADD COLUMN IF NOT EXISTS price_change_rate DOUBLE PRECISION'),
+    ('products.popularity_score', 'ALTER TABLE products ADD COLUMN IF NOT EXISTS popularity_score DOUBLE PRECISION'),
+    ('products.popularity_updated_at',
+     'ALTER TABLE products ADD COLUMN IF NOT EXISTS popularity_updated_at TIMESTAMPTZ'),
+    # Аренда товаров параллельными запусками обновления цен: кто взял и до какого момента
+    ('products.refresh_lease_owner', 'ALTER TABLE products ADD COLUMN IF NOT EXISTS refresh_lease_owner TEXT'),
+    ('products.refresh_lease_until', 'ALTER TABLE products ADD COLUMN IF NOT EXISTS refresh_lease_until TIMESTAMPTZ'),
+    ('products_refresh_lease_owner_idx',
+     'CREATE INDEX IF NOT EXISTS products_refresh_lease_owner_idx ON products (refresh_lease_owner) '
+     'WHERE refresh_lease_owner IS NOT NULL'),
+    # Очередь задач парсинга (app/jobs.py): параметры, состояние, счетчики и исходы по товарам
+    ('scrape_jobs', """
+    CREATE TABLE IF NOT EXISTS scrape_jobs (
+        id TEXT PRIMARY KEY,
+        type TEXT NOT NULL,
+        params JSONB NOT NULL DEFAULT '{}',
+        state TEXT NOT NULL DEFAULT 'queued',
+        counters JSONB NOT NULL DEFAULT '{}',
+        results JSONB,
+        error TEXT,
+        worker TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        started_at TIMESTAMPTZ,
+        finished_at TIMESTAMPTZ,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """),
+    ('scrape_jobs_queued_idx',
+     "CREATE INDEX IF NOT EXISTS scrape_jobs_queued_idx ON scrape_jobs (created_at) WHERE state = 'queued'"),
+    # Возобновление задач: состояние обхода, число захватов воркерами, поиск брошенных по heartbeat
+    ('scrape_jobs.checkpoint', 'ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS checkpoint JSONB'),
+    ('scrape_jobs.attempts', 'ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0'),
+    ('scrape_jobs_running_idx',
+     "CREATE INDEX IF NOT EXISTS scrape_jobs_running_idx ON scrape_jobs (updated_at) WHERE state = 'running'"),
+)
+
+
+def _existing_objects(cur) -> Set[str]:
+    """Колонки ("таблица.колонка"), таблицы и индексы текущей схемы"""
+    cur.execute(
+        """
+        SELECT table_name || '.' || column_name AS name FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        UNION ALL
+        SELECT tablename FROM pg_tables WHERE schemaname = current_schema()
+        UNION ALL
+        SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()
+        """
+    )
+    return {row['name'] for row in cur.fetchall()}
+
+
+def _missing_statements(cur) -> List[str]:
+    existing = _existing_objects(cur)
+    return [ddl for name, ddl in SCHEMA_CHANGES if name not in existing]
+
+
+def ensure_schema() -> None:
+    """Применить недостающие SCHEMA_CHANGES в одной транзакции; если всё на месте - без DDL и блокировок"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            if not _missing_statements(cur):
+                logger.info("Database schema is up to date")
+                return
+            cur.execute('SELECT pg_advisory_xact_lock(%s)', (SCHEMA_LOCK_KEY,))
+            # Пока ждали блокировку, изменения мог применить другой процесс
+            missing = _missing_statements(cur)
+            for statement in missing:
+                cur.execute(statement)
+    logger.info("Database schema updated: %s change(s) applied", len(missing))
@@ -0,0 +1,594 @@
+"""
+Фоновые задачи парсинга (cron и админка).
+Задачи ставятся в очередь - таблицу scrape_jobs; воркеры (app/worker.py) забирают их
+с учетом лимитов по типам, сохраняют прогресс и итог. Состояния задачи:
+queued -> running -> completed | failed | source_unavailable.
+Прерванная остановкой процесса задача возвращается в очередь с прогрессом, брошенную
+(нет heartbeat) подбирает другой воркер; парсинг категории продолжается с checkpoint.
+"""
+from typing import Optional, Dict, Any, List, Set
+import asyncio
+import copy
+import logging
+import uuid
+from app.config import settings
+from app.logging_config import log_context
+from app.db import queries
+from app.utils.category_mapping import MAIN_CATEGORIES_WITH_SUBCATEGORIES
+from app.utils.circuit_breaker import HostUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+async def update_prices(
+    max_products: int,
+    time_budget_seconds: Optional[float] = None,
+    results: Optional[Dict[str, Any]] = None
+):
+    """
+    Обновление цен и размеров для товаров с source_url.
+    Товары берутся в аренду пачками из очереди lease_products_for_price_refresh (давность
+    проверки × частота изменения цены × популярность), поэтому несколько запусков на разных
+    процессах и нодах обновляют разные товары. Новые товары перестают браться после
+    max_products или по истечении бюджета времени (по умолчанию PRICE_REFRESH_TIME_BUDGET_SECONDS).
+    Товары разбирает пул из PRICE_REFRESH_WORKERS корутин; темп запросов к сайту задает
+    общий ограничитель хоста, поэтому время обновления определяется тем, что выдерживает сайт.
+    Результаты пишутся в БД пачками по PRICE_REFRESH_WRITE_BATCH.
+    results - словарь прогресса, который читает execute()
+    """
+    # Стек парсинга грузим при первом запуске задачи, а не при импорте API
+    from app.utils.poizon_parser import parse_poizon_prices
+    from app.utils import poizon_strategies
+    if results is None:
+        results = {}
+    results.update({
+        "planned": 0,
+        "processed": 0,
+        "updated": [],
+        "unchanged": 0,
+        "failed": [],
+        "budget_exhausted": False,
+        "status": "in_progress"
+    })
+    # Ожидающие записи: новые цены и товары, цены которых не изменились (только last_checked_at)
+    pending_updates: List[Dict[str, Any]] = []
+    checked_ids: List[Any] = []
+    # Аренда: владелец - этот запуск; арендованные, но еще не взятые воркерами товары;
+    # товары, аренду которых надо продлевать (в обработке или ждут записи)
+    lease_owner = new_job_id()
+    leased: List[Dict[str, Any]] = []
+    held: Set[Any] = set()
+    # Товары, которые не удалось обновить: их аренда не снимается в конце и истекает сама,
+    # так что ни этот, ни другие запуски не берут их раньше, чем через lease_seconds
+    failed_ids: Set[Any] = set()
+    lease_lock = asyncio.Lock()
+    lease_seconds = settings.price_refresh_lease_seconds
+    # Начало запуска по часам БД: с ним сравнивается last_checked_at, который пишет NOW() в БД
+    run_started = await asyncio.to_thread(queries.get_db_now)
+    no_more_due = False
+    
+    async def flush(force: bool = False) -> None:
+        # Пачка забирается без await, поэтому без блокировки: запись одной пачки
+        # не задерживает воркеры, которые тем временем набирают следующую
+        batch = settings.price_refresh_write_batch
+        if pending_updates and (force or len(pending_updates) >= batch):
+            rows = pending_updates[:]
+            pending_updates.clear()
+            try:
+                # psycopg2 блокирует, запись идет в потоке, пока воркеры продолжают разбор
+                await asyncio.to_thread(queries.update_product_prices, rows)
+                results["updated"].extend(
+                    {"product_id": row['id'], "title": row['title'], "new_price": row['price_cents']} for row in rows
+                )
+            except Exception as e:
+                logger.error("Failed to write %s price updates: %s", len(rows), e)
+                results["failed"].extend(
+                    {"product_id": row['id'], "title": row['title'], "error": "Failed to update in database"} for row in rows
+                )
+                failed_ids.update(row['id'] for row in rows)
+            held.difference_update(row['id'] for row in rows)
+        if checked_ids and (force or len(checked_ids) >= batch):
+            ids = checked_ids[:]
+            checked_ids.clear()
+            try:
+                await asyncio.to_thread(queries.mark_products_checked, ids)
+            except Exception as e:
+                logger.error("Failed to mark %s products as checked: %s", len(ids), e)
+            held.difference_update(ids)
+    
+    async def next_product() -> Optional[Dict[str, Any]]:
+        """Следующий товар; когда арендованные кончились - аренда новой пачки"""
+        nonlocal no_more_due
+        async with lease_lock:
+            if not leased and not no_more_due:
+                limit = min(settings.price_refresh_lease_batch, max_products - results["planned"])
+                batch = []
+                if limit > 0:
+                    batch = await asyncio.to_thread(
+                        queries.lease_products_for_price_refresh,
+                        lease_owner,
+                        limit,
+                        lease_seconds,
+                        run_started,
+                        settings.price_refresh_base_change_rate,
+                        settings.popularity_half_life_days * 86400
+                    )
+                # Неполная пачка: остальное арендовано другими запусками или уже проверено
+                if limit <= 0 or len(batch) < limit:
+                    no_more_due = True
+                results["planned"] += len(batch)
+                leased.extend(batch)
+                held.update(product['id'] for product in batch)
+            return leased.pop(0) if leased else None
+    
+    async def renew_leases() -> None:
+        """Продлевать аренду, пока товары обрабатываются (ожидание паузы сайта, долгий разбор)"""
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            try:
+                await asyncio.to_thread(queries.renew_product_leases, lease_owner, list(held), lease_seconds)
+            except Exception as e:
+                logger.warning("Failed to renew product leases: %s", e)
+    
+    async def refresh(idx: int, product: Dict[str, Any]) -> None:
+        logger.info("Updating product %s: %s...", idx, product['title'][:50])
+        try:
+            # Только размеры и цены: одна загрузка страницы, без изображений и Selenium.
+            # По хэшу ценовой части страницы неизменившийся товар не разбирается и не перезаписывается
+            parsed = await parse_poizon_prices(product['source_url'], product.get('price_hash'))
+        except HostUnavailable:
+            raise
+        except Exception as e:
+            results["failed"].append({
+                "product_id": product['id'],
+                "title": product['title'],
+                "error": str(e)
+            })
+            logger.error("Error updating %s: %s", product['source_url'], e)
+            # Аренда больше не продлевается и истечет сама (см. failed_ids)
+            held.discard(product['id'])
+            failed_ids.add(product['id'])
+            return
+        
+        if parsed and parsed.get('unchanged'):
+            results["unchanged"] += 1
+            checked_ids.append(product['id'])
+        elif parsed:
+            # Обновляем только цену и описание (размеры и цены)
+            pending_updates.append({
+                'id': product['id'],
+                'title': product['title'],
+                'category': product.get('category'),
+                'price_cents': parsed['price_cents'],
+                'description': parsed.get('description', ''),
+                'price_hash': parsed['price_hash']
+            })
+        else:
+            results["failed"].append({
+                "product_id": product['id'],
+                "title": product['title'],
+                "error": "Failed to parse product"
+            })
+            held.discard(product['id'])
+            failed_ids.add(product['id'])
+        await flush()
+    
+    try:
+        if time_budget_seconds is None:
+            time_budget_seconds = settings.price_refresh_time_budget_seconds
+        deadline = asyncio.get_running_loop().time() + time_budget_seconds
+        workers_count = max(1, min(settings.price_refresh_workers, max_products))
+        logger.info("Updating prices for up to %s products with %s workers...", max_products, workers_count)
+        
+        async def worker() -> None:
+            while results["status"] == "in_progress":
+                if asyncio.get_running_loop().time() >= deadline:
+                    # Остальные товары ниже в очереди: их возьмет следующий запуск
+                    if not results["budget_exhausted"]:
+                        logger.info("Time budget of %.0fs exhausted, stopping price update", time_budget_seconds)
+                        results["budget_exhausted"] = True
+                    return
+                product = await next_product()
+                if product is None:
+                    return
+                try:
+                    await refresh(results["processed"] + 1, product)
+                except HostUnavailable as e:
+                    # Сайт не отвечает дольше допустимой паузы: остальные товары обновит следующий запуск
+                    if results["status"] == "in_progress":
+                        logger.error("Stopping price update, source is unavailable: %s", e)
+                        results["status"] = "source_unavailable"
+                    return
+                results["processed"] += 1
+        
+        renewer = asyncio.create_task(renew_leases())
+        try:
+            await asyncio.gather(*(worker() for _ in range(workers_count)))
+        finally:
+            renewer.cancel()
+            await flush(force=True)
+            # Товары, до которых запуск не дошел, сразу доступны другим запускам;
+            # аренда необновленных истечет сама - повтор не раньше чем через lease_seconds
+            try:
+                await asyncio.to_thread(queries.release_product_leases, lease_owner, list(failed_ids))
+            except Exception as e:
+                logger.warning("Failed to release product leases (they expire in %.0fs): %s", lease_seconds, e)
+        
+        if not results["planned"]:
+            results["message"] = "Нет товаров для обновления"
+        if results["status"] == "in_progress":
+            results["status"] = "completed"
+        logger.info(
+            "✅ Price update completed: %s updated, %s unchanged, %s failed",
+            len(results['updated']), results['unchanged'], len(results['failed'])
+        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s", poizon_strategies.format_stats())
+        
+    except Exception as e:
+        results["status"] = "error"
+        results["error"] = str(e)
+        logger.error("Error updating prices: %s", e)
+
+
+async def _resolve_category(category_url: str, category: str) -> str:
+    """Подкатегория со страницы категории, если она относится к выбранной категории"""
+    from app.utils.poizon_category_parser import extract_category_name_from_page
+    category_to_use = category
+    
+    extracted_category = await extract_category_name_from_page(category_url)
+    if extracted_category:
+        logger.info("Extracted category from page: %s", extracted_category)
+        
+        if extracted_category in MAIN_CATEGORIES_WITH_SUBCATEGORIES.keys():
+            if category == extracted_category:
+                category_to_use = extracted_category
+        else:
+            for main_cat, subcats in MAIN_CATEGORIES_WITH_SUBCATEGORIES.items():
+                if extracted_category in subcats:
+                    if category == main_cat:
+                        category_to_use = extracted_category
+                        logger.info("Using extracted subcategory: %s", extracted_category)
+                    break
+    return category_to_use
+
+
+# Исход _import_product, когда страница загрузилась, но товар на ней не разобран
+PARSE_FAILED_ERROR = "Failed to parse product"
+
+
+async def _import_product(
+    url: str,
+    category: str,
+    season: Optional[str],
+    use_selenium: bool,
+    skip_size_guide: bool
+) -> Dict[str, Any]:
+    """
+    Добавить товар по ссылке, если его еще нет в БД. Возвращает исход для results:
+    created / already_exists или запись с error. HostUnavailable пробрасывается
+    """
+    from app.utils.poizon_parser import parse_poizon_product
+    
+    # Проверяем, существует ли уже товар с таким source_url
+    existing_product = await asyncio.to_thread(queries.get_product_by_source_url, url)
+    if existing_product:
+        logger.debug("⏭️ Product already exists, skipping: %.80s...", url)
+        return {
+            "url": url,
+            "product_id": existing_product['id'],
+            "title": existing_product['title'],
+            "status": "already_exists"
+        }
+    
+    parsed = await parse_poizon_product(url, use_selenium=use_selenium, skip_size_guide=skip_size_guide)
+    if not parsed:
+        return {"url": url, "error": PARSE_FAILED_ERROR}
+    
+    final_category = category
+    if parsed.get('extracted_category'):
+        extracted = parsed['extracted_category']
+        if extracted in MAIN_CATEGORIES_WITH_SUBCATEGORIES.get(category, []):
+            final_category = extracted
+            logger.info("Using extracted subcategory from product: %s", extracted)
+    
+    product = await asyncio.to_thread(queries.create_product, {
+        'category': final_category,
+        'season': season,
+        'title': parsed['title'],
+        'description': parsed.get('description', ''),
+        'price_cents': parsed['price_cents'],
+        'images_base64': parsed.get('images_base64', []),
+        'source_url': url
+    })
+    return {
+        "url": url,
+        "product_id": product['id'],
+        "title": product['title'],
+        "status": "created"
+    }
+
+
+async def parse_products(
+    urls: List[str],
+    category: str,
+    season: Optional[str],
+    results: Optional[Dict[str, Any]] = None
+):
+    """Парсинг списка товаров из админки (один товар или пакет): новые добавляются в БД"""
+    from app.utils import poizon_strategies
+    if results is None:
+        results = {}
+    results.update({
+        "planned": len(urls),
+        "processed": 0,
+        "success": [],
+        "failed": [],
+        "status": "in_progress"
+    })
+    
+    for idx, url in enumerate(urls, 1):
+        try:
+            logger.info("Parsing product %s/%s: %s...", idx, len(urls), url[:80])
+            outcome = await _import_product(url, category, season, use_selenium=True, skip_size_guide=False)
+            results["failed" if "error" in outcome else "success"].append(outcome)
+        except HostUnavailable as e:
+            # Остальные ссылки не пробуем: каждая ждала бы конца паузы circuit breaker'а
+            results["failed"].append({"url": url, "error": str(e)})
+            logger.error("Stopping product parsing, source is unavailable: %s", e)
+            results["status"] = "source_unavailable"
+            break
+        except Exception as e:
+            results["failed"].append({"url": url, "error": str(e)})
+            logger.error("Error parsing %s: %s", url, e)
+        results["processed"] = idx
+    
+    if results["status"] == "in_progress":
+        results["status"] = "completed"
+    logger.info("✅ Product parsing completed: %s success, %s failed", len(results['success']), len(results['failed']))
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("%s", poizon_strategies.format_stats())
+
+
+async def parse_category(
+    category_url: str,
+    category: str,
+    season: Optional[str],
+    max_products: int,
+    use_selenium: bool,
+    skip_size_guide: bool = True,
+    results: Optional[Dict[str, Any]] = None,
+    checkpoint: Optional[Dict[str, Any]] = None
+):
+    """
+    Парсинг категории: собирает ссылки на товары и добавляет новые в БД.
+    checkpoint - состояние для возобновления: выбранная категория, состояние обхода страниц
+    и номер следующей ссылки; с ним перезапущенная задача не повторяет сделанное
+    """
+    from app.utils import poizon_strategies
+    from app.utils.poizon_category_parser import extract_product_links_from_category
+    if results is None:
+        results = {}
+    if checkpoint is None:
+        checkpoint = {}
+    if not results:
+        results.update({
+            "total_links_found": 0,
+            "planned": 0,
+            "processed": 0,
+            "success": [],
+            "failed": []
+        })
+    results["status"] = "in_progress"
+    
+    try:
+        category_to_use = checkpoint.get('category')
+        if category_to_use is None:
+            category_to_use = await _resolve_category(category_url, category)
+            checkpoint['category'] = category_to_use
+        
+        logger.info("Using category: %s", category_to_use)
+        
+        # Шаг 1: Собираем все ссылки на товары из категории
+        logger.info("Extracting product links from category: %s", category_url)
+        product_links = await extract_product_links_from_category(
+            category_url, checkpoint.setdefault('frontier', {})
+        )
+        
+        results["total_links_found"] = len(product_links)
+        logger.info("Found %s product links", len(product_links))
+        
+        if not product_links:
+            results["status"] = "completed"
+            results["message"] = "Не найдено товаров в категории"
+            return
+        
+        # Ограничиваем количество
+        product_links = product_links[:max_products]
+        results["planned"] = len(product_links)
+        
+        # Шаг 2: Парсим каждый товар
+        start = checkpoint.get('next_link', 0)
+        if start:
+            logger.info("Resuming from product %s/%s", start + 1, len(product_links))
+        logger.info("Parsing %s products...", len(product_links) - start)
+        
+        for idx, url in enumerate(product_links[start:], start + 1):
+            # Исход предыдущей ссылки уже в results: checkpoint сдвигается вместе с ним
+            results["processed"] = checkpoint['next_link'] = idx - 1
+            try:
+                logger.info("Parsing product %s/%s: %s...", idx, len(product_links), url[:80])
+                outcome = await _import_product(url, category_to_use, season, use_selenium, skip_size_guide)
+                results["failed" if "error" in outcome else "success"].append(outcome)
+            except HostUnavailable as e:
+                logger.error("Stopping category parsing, source is unavailable: %s", e)
+                results["status"] = "source_unavailable"
+                break
+            except Exception as e:
+                results["failed"].append({
+                    "url": url,
+                    "error": str(e)
+                })
+                logger.error("Error parsing %s: %s", url, e)
+        else:
+            results["processed"] = checkpoint['next_link'] = len(product_links)
+        
+        if results["status"] == "in_progress":
+            results["status"] = "completed"
+        logger.info("✅ Category parsing completed: %s success, %s failed", len(results['success']), len(results['failed']))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s", poizon_strategies.format_stats())
+        
+    except HostUnavailable as e:
+        # Сайт недоступен уже при определении категории или сборе ссылок
+        results["status"] = "source_unavailable"
+        results["error"] = str(e)
+        logger.error("Stopping category parsing, source is unavailable: %s", e)
+    except Exception as e:
+        results["status"] = "error"
+        results["error"] = str(e)
+        logger.error("Error parsing category: %s", e)
+
+
+JOB_HANDLERS = {
+    'update_prices': update_prices,
+    'parse_category': parse_category,
+    'parse_products': parse_products,
+}
+
+
+# Как часто выполняющаяся задача сохраняет прогресс в scrape_jobs (это же ее heartbeat)
+PROGRESS_SAVE_SECONDS = 5.0
+# Итоговое состояние задачи по results["status"] обработчика
+FINAL_STATES = {
+    'completed': 'completed',
+    'source_unavailable': 'source_unavailable',
+    'error': 'failed',
+}
+# Состояния scrape_jobs, после которых задача больше не выполняется
+FINAL_JOB_STATES = frozenset({'completed', 'failed', 'source_unavailable'})
+# Задачи, которые после перезапуска продолжаются с checkpoint, а не начинаются заново
+RESUMABLE_JOBS = frozenset({'parse_category'})
+
+
+def submit(job_type: str, params: Dict[str, Any]) -> str:
+    """Поставить задачу в очередь scrape_jobs, вернуть ее id (по нему - статус и записи в логах)"""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job type: {job_type}')
+    job_id = new_job_id()
+    queries.enqueue_scrape_job(job_id, job_type, params)
+    logger.info("Job %s (%s) queued", job_type, job_id)
+    return job_id
+
+
+async def wait_for_job(job_id: str, timeout: float, poll_seconds: float = 1.0) -> Optional[Dict[str, Any]]:
+    """Дождаться итогового состояния задачи (опрос scrape_jobs в потоке); None, если не дождались за timeout"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        job = await asyncio.to_thread(queries.get_scrape_job, job_id)
+        if job is not None and job['state'] in FINAL_JOB_STATES:
+            return job
+        if loop.time() >= deadline:
+            return None
+        await asyncio.sleep(poll_seconds)
+
+
+def new_job_id() -> str:
+    """Короткий идентификатор задачи: по нему в логах находятся все записи одного запуска"""
+    return uuid.uuid4().hex[:12]
+
+
+def get_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Задача из scrape_jobs со временем выполнения и скоростью (товаров в минуту)"""
+    job = queries.get_scrape_job(job_id)
+    if not job:
+        return None
+    # Для задачи в очереди времени выполнения еще нет (started_at пуст)
+    elapsed = float(job['elapsed_seconds']) if job['elapsed_seconds'] is not None else None
+    processed = job['counters'].get('processed', 0)
+    job['elapsed_seconds'] = round(elapsed, 1) if elapsed is not None else None
+    job['items_per_minute'] = round(processed * 60 / elapsed, 2) if elapsed else None
+    return job
+
+
+def job_counters(results: Dict[str, Any]) -> Dict[str, int]:
+    """Счетчики задачи: числа из results и длины списков исходов"""
+    counters = {}
+    for key, value in results.items():
+        if isinstance(value, list):
+            counters[key] = len(value)
+        elif isinstance(value, int) and not isinstance(value, bool):
+            counters[key] = value
+    return counters
+
+
+def _snapshot(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Копия results для записи в потоке, пока обработчик продолжает дописывать списки"""
+    return {key: list(value) if isinstance(value, list) else value for key, value in results.items()}
+
+
+async def execute(job: Dict[str, Any]) -> None:
+    """
+    Выполнить задачу, полученную claim_scrape_job: раз в PROGRESS_SAVE_SECONDS сохранять
+    прогресс и checkpoint, в конце записать итоговое состояние. Прерванная остановкой
+    процесса задача сохраняет прогресс и возвращается в очередь
+    """
+    job_id, job_type, worker = job['id'], job['type'], job['worker']
+    params = job.get('params') or {}
+    resumable = job_type in RESUMABLE_JOBS
+    # Возобновляемая задача продолжает с сохраненными исходами и checkpoint, остальные - с нуля
+    results: Dict[str, Any] = dict(job.get('results') or {}) if resumable else {}
+    checkpoint: Dict[str, Any] = dict(job.get('checkpoint') or {})
+    
+    def state() -> tuple:
+        snapshot = _snapshot(results)
+        return job_counters(snapshot), snapshot, copy.deepcopy(checkpoint) if resumable else None
+    
+    with log_context(job_id=job_id):
+        handler = JOB_HANDLERS.get(job_type)
+        if handler is None:
+            logger.warning("Unknown job type: %s", job_type)
+            await asyncio.to_thread(
+                queries.finish_scrape_job, job_id, worker, 'failed', {}, {}, f'Unknown job type: {job_type}'
+            )
+            return
+        if checkpoint:
+            logger.info("Resuming job %s (attempt %s) from checkpoint", job_type, job['attempts'])
+        else:
+            logger.info("Starting job %s with params %s", job_type, params)
+        kwargs = {'checkpoint': checkpoint} if resumable else {}
+        task = asyncio.create_task(handler(**params, results=results, **kwargs))
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=PROGRESS_SAVE_SECONDS)
+                if done:
+                    break
+                try:
+                    owned = await asyncio.to_thread(queries.save_scrape_job_progress, job_id, worker, *state())
+                except Exception as e:
+                    logger.warning("Failed to save job progress: %s", e)
+                    continue
+                if not owned:
+                    # Heartbeat не доходил дольше JOB_STALE_SECONDS, задачу продолжил другой воркер
+                    logger.error("Job %s was taken over by another worker, stopping", job_type)
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    return
+        except asyncio.CancelledError:
+            # Остановка процесса: обработчик дописывает накопленное (finally), прогресс уходит в БД
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await asyncio.to_thread(queries.requeue_scrape_job, job_id, worker, *state())
+            logger.warning("Job %s interrupted, progress saved and job returned to queue", job_type)
+            raise
+        
+        error = task.exception()
+        if error is not None:
+            logger.error("Job %s failed: %s", job_type, error, exc_info=error)
+            final_state, message = 'failed', str(error)
+        else:
+            final_state, message = FINAL_STATES.get(results.get('status'), 'completed'), results.get('error')
+        counters, snapshot, _ = state()
+        await asyncio.to_thread(queries.finish_scrape_job, job_id, worker, final_state, counters, snapshot, message)
+        logger.info("Job %s finished: %s", job_type, final_state)
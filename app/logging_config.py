@@ -0,0 +1,110 @@
+"""
+Настройка логирования процессов API, воркера и пула разбора.
+Записи уходят в очередь (ContextQueueHandler) неотформатированными: форматирование
+(в том числе traceback) и вывод в stdout выполняет отдельный поток QueueListener,
+поэтому горячий путь парсинга не тратит время ни на форматирование, ни на запись в поток.
+Сообщения форматируются лениво (logger.debug("... %s", value)): при уровне выше DEBUG
+отладочные записи отбрасываются до форматирования.
+К каждой записи добавляются job_id и url текущей задачи и страницы (contextvars),
+поэтому лог одного разбора находится grep'ом по "job=" или "url=".
+"""
+import atexit
+import contextlib
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Any, Dict, Iterator, Optional
+from app.config import settings
+
+
+job_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('job_id', default=None)
+url_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('url', default=None)
+
+_CONTEXT_VARS = {'job_id': job_id_var, 'url': url_var}
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s [job=%(job_id)s url=%(url)s] %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextlib.contextmanager
+def log_context(**values: Optional[str]) -> Iterator[None]:
+    """Добавить job_id/url ко всем записям внутри блока"""
+    tokens = [(_CONTEXT_VARS[name], _CONTEXT_VARS[name].set(value)) for name, value in values.items()]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def current_context() -> Dict[str, Optional[str]]:
+    """Контекст логов для передачи в другой поток или процесс"""
+    return {name: var.get() for name, var in _CONTEXT_VARS.items() if var.get() is not None}
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладет в очередь копию записи с job_id/url из contextvars (они видны только в потоке вызова).
+    Стандартный prepare() форматирует запись здесь же; форматирование оставляем обработчику listener'а.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        for name, var in _CONTEXT_VARS.items():
+            if not hasattr(record, name):
+                setattr(record, name, var.get() or '-')
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись (LOG_FORMAT=json)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'job_id': getattr(record, 'job_id', '-'),
+            'url': getattr(record, 'url', '-'),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def setup_logging() -> None:
+    """
+    Настроить логгер "app" (повторный вызов ничего не делает).
+    Вызывается при старте API и воркера и в каждом процессе пула разбора.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    logger = logging.getLogger('app')
+    logger.setLevel(settings.log_level.upper())
+    logger.propagate = False
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = ContextQueueHandler(records)
+    logger.handlers = [handler]
+
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Дописать записи из очереди и остановить поток вывода (при завершении процесса)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
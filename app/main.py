@@ -1,11 +1,32 @@
+import asyncio
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.config import settings
 from app.routes import products, me, admin, cron
+from app.db import queries
+from app.db.catalog_snapshot import catalog_snapshot
+from app.db.product_views import product_views
+from app.db.change_feed import ChangeFeed
+from app.db.schema import ensure_schema
+from app.logging_config import setup_logging, stop_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Telegram Shop API")
 
+# Изменения товаров из других воркеров/нод применяются к снимку каталога точечно
+product_changes_feed = ChangeFeed(
+    queries.PRODUCT_CHANGES_CHANNEL,
+    catalog_snapshot.apply_notifications,
+    on_reconnect=catalog_snapshot.refresh_soon
+)
+# При server_role=all задачи парсинга из scrape_jobs выполняет сам процесс API;
+# воркер и пулы парсинга импортируются только в этом случае (см. startup)
+job_worker = None
+
 # CORS configuration
 cors_origins = []
 if settings.cors_origins:
@@ -29,6 +50,40 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def startup():
+    """Дополнения схемы БД, затем загрузка снимка каталога в фоне, чтобы не задерживать старт, и воркер задач"""
+    global job_worker
+    try:
+        await asyncio.to_thread(ensure_schema)
+    except Exception as e:
+        logger.error("Failed to update database schema: %s", e)
+    if settings.catalog_snapshot_enabled:
+        catalog_snapshot.start(settings.catalog_snapshot_refresh_seconds)
+        product_changes_feed.start()
+    product_views.start(settings.product_views_flush_seconds)
+    if settings.server_role == 'all':
+        from app.worker import JobWorker
+        job_worker = JobWorker()
+        job_worker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if job_worker is not None:
+        await job_worker.stop()
+        # Пулы парсинга создают только задачи воркера
+        from app.utils.executors import shutdown_executors
+        shutdown_executors()
+    await product_changes_feed.stop()
+    await catalog_snapshot.stop()
+    await product_views.stop()
+    # Клиент создается только при парсинге, импорт откладываем до завершения
+    from app.utils import poizon_client
+    await poizon_client.close_client()
+    stop_logging()
+
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
@@ -45,7 +100,7 @@ app.include_router(cron.router, prefix="/cron", tags=["cron"])
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Глобальный обработчик ошибок"""
-    print(f"Unhandled error: {exc}")
+    logger.error("Unhandled error: %s", exc, exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={"error": {"code": "SERVER_ERROR", "message": "Internal server error"}}
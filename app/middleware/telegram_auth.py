@@ -1,9 +1,12 @@
+import logging
 from fastapi import HTTPException, Header, Request
 from typing import Optional
 from app.config import settings
 from app.utils.telegram_auth import verify_init_data, extract_user_from_init_data
 from app.db import queries
 
+logger = logging.getLogger(__name__)
+
 
 async def get_current_user(
     x_telegram_init_data: Optional[str] = Header(None, alias="x-telegram-init-data")
@@ -40,7 +43,7 @@ async def get_current_user(
             'last_name': telegram_user.get('last_name')
         })
     except Exception as e:
-        print(f'Error upserting user: {e}')
+        logger.error("Error upserting user: %s", e)
     
     return {
         'tgid': tgid,
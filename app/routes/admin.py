@@ -1,12 +1,15 @@
+import asyncio
+import logging
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List
-import asyncio
 from app.middleware.telegram_auth import get_current_user, require_admin
 from app.db import queries
-from app.utils.poizon_parser import parse_poizon_product
-from app.utils.poizon_category_parser import extract_product_links_from_category, extract_category_name_from_page
-from app.utils.category_mapping import MAIN_CATEGORIES_WITH_SUBCATEGORIES
+from app.db.catalog_snapshot import catalog_snapshot
+from app.config import settings
+from app import jobs
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -50,6 +53,7 @@ async def create_product(
     user = await require_admin(current_user)
     
     product = queries.create_product(product_data.dict(exclude_none=True))
+    catalog_snapshot.refresh_soon()
     return product
 
 
@@ -64,6 +68,7 @@ async def update_product(
     
     updates = product_data.dict(exclude_none=True)
     product = queries.update_product(product_id, updates)
+    catalog_snapshot.refresh_soon()
     
     if not product:
         raise HTTPException(
@@ -83,6 +88,7 @@ async def delete_product(
     user = await require_admin(current_user)
     
     success = queries.delete_product(product_id)
+    catalog_snapshot.remove(product_id)
     if not success:
         raise HTTPException(
             status_code=404,
@@ -134,45 +140,52 @@ async def parse_poizon(
     request: ParsePoizonRequest,
     current_user: dict = Depends(get_current_user)
 ):
-    """Парсить товар с thepoizon.ru (только админ)"""
+    """
+    Парсить товар с thepoizon.ru (только админ)
+    Парсинг идет в воркере задач, а не в процессе API; запрос ждет итог задачи
+    (не дольше ADMIN_PARSE_WAIT_SECONDS) и отвечает в прежнем формате: товар или ошибка
+    """
     user = await require_admin(current_user)
     
-    # Парсим товар
-    try:
-        parsed_data = await parse_poizon_product(request.url)
-        if not parsed_data:
-            raise HTTPException(
-                status_code=400,
-                detail={"error": {"code": "PARSE_ERROR", "message": "Не удалось распарсить товар. Проверьте URL и убедитесь, что страница доступна."}}
-            )
-    except Exception as e:
-        error_message = str(e)
+    job_id = jobs.submit('parse_products', {
+        'urls': [request.url],
+        'category': request.category,
+        'season': request.season
+    })
+    job = await jobs.wait_for_job(job_id, settings.admin_parse_wait_seconds)
+    if job is None:
+        raise HTTPException(
+            status_code=504,
+            detail={"error": {"code": "PARSE_TIMEOUT", "message": f"Парсинг еще идет, статус: GET /admin/jobs/{job_id}"}}
+        )
+    
+    results = job['results'] or {}
+    failed = results.get('failed') or []
+    error_message = failed[0].get('error') if failed else job['error']
+    if error_message == jobs.PARSE_FAILED_ERROR:
+        error_message = None
+    if job['state'] == 'source_unavailable':
+        raise HTTPException(
+            status_code=503,
+            detail={"error": {"code": "SOURCE_UNAVAILABLE", "message": f"Сайт временно недоступен: {error_message}"}}
+        )
+    outcome = (results.get('success') or [None])[0]
+    product = None
+    if outcome is not None:
+        product = await asyncio.to_thread(queries.get_product_by_source_url, request.url)
+    if product is None:
         raise HTTPException(
             status_code=400,
-            detail={"error": {"code": "PARSE_ERROR", "message": error_message}}
+            detail={"error": {"code": "PARSE_ERROR", "message": error_message or "Не удалось распарсить товар. Проверьте URL и убедитесь, что страница доступна."}}
         )
     
-    # Проверяем, существует ли уже товар с таким source_url
-    existing_product = queries.get_product_by_source_url(request.url)
-    if existing_product:
+    if outcome['status'] == 'already_exists':
         return {
             "success": True,
-            "product": existing_product,
+            "product": product,
             "message": "Product already exists, not creating duplicate"
         }
-    
-    # Создаем товар в БД
-    product_data = {
-        'category': request.category,
-        'season': request.season,
-        'title': parsed_data['title'],
-        'description': parsed_data.get('description', ''),
-        'price_cents': parsed_data['price_cents'],
-        'images_base64': parsed_data.get('images_base64', []),
-        'source_url': request.url  # Сохраняем оригинальный URL
-    }
-    
-    product = queries.create_product(product_data)
+    catalog_snapshot.refresh_soon()
     return {
         "success": True,
         "product": product,
@@ -185,62 +198,15 @@ async def parse_poizon_batch(
     request: ParsePoizonBatchRequest,
     current_user: dict = Depends(get_current_user)
 ):
-    """Массовый парсинг товаров с POIZON (только админ)"""
+    """Массовый парсинг товаров с POIZON (только админ), в воркере задач"""
     user = await require_admin(current_user)
     
-    results = {
-        "success": [],
-        "failed": [],
-        "total": len(request.urls)
-    }
-    
-    for url in request.urls:
-        try:
-            # Проверяем, существует ли уже товар с таким source_url
-            existing_product = queries.get_product_by_source_url(url)
-            if existing_product:
-                results["success"].append({
-                    "url": url,
-                    "product_id": existing_product['id'],
-                    "title": existing_product['title'],
-                    "status": "already_exists"
-                })
-                continue
-            
-            parsed = await parse_poizon_product(url)
-            if parsed:
-                product_data = {
-                    'category': request.category,
-                    'season': request.season,
-                    'title': parsed['title'],
-                    'description': parsed.get('description', ''),
-                    'price_cents': parsed['price_cents'],
-                    'images_base64': parsed.get('images_base64', []),
-                    'source_url': url  # Сохраняем оригинальный URL
-                }
-                product = queries.create_product(product_data)
-                results["success"].append({
-                    "url": url,
-                    "product_id": product['id'],
-                    "title": product['title'],
-                    "status": "created"
-                })
-            else:
-                results["failed"].append({
-                    "url": url,
-                    "error": "Failed to parse product"
-                })
-        except Exception as e:
-            results["failed"].append({
-                "url": url,
-                "error": str(e)
-            })
-        
-        # Небольшая задержка между запросами
-        if len(results["success"]) + len(results["failed"]) < len(request.urls):
-            await asyncio.sleep(1)
-    
-    return results
+    job_id = jobs.submit('parse_products', {
+        'urls': request.urls,
+        'category': request.category,
+        'season': request.season
+    })
+    return {"status": "started", "job_id": job_id, "total": len(request.urls)}
 
 
 class ParseCategoryRequest(BaseModel):
@@ -271,122 +237,33 @@ async def parse_category(
 ):
     """
     Автоматический парсинг категории - собирает все товары из категории и добавляет в БД
-    Аналогично reads_files() из примера
+    Аналогично reads_files() из примера. Выполняется в воркере задач (см. app/jobs.py)
     """
     user = await require_admin(current_user)
     
-    results = {
-        "total_links_found": 0,
-        "success": [],
-        "failed": [],
-        "status": "in_progress"
-    }
-    
-    try:
-        category_to_use = request.category
-        
-        extracted_category = await extract_category_name_from_page(request.category_url)
-        if extracted_category:
-            print(f"Extracted category from page: {extracted_category}")
-            
-            if extracted_category in MAIN_CATEGORIES_WITH_SUBCATEGORIES.keys():
-                if request.category == extracted_category:
-                    category_to_use = extracted_category
-            else:
-                for main_cat, subcats in MAIN_CATEGORIES_WITH_SUBCATEGORIES.items():
-                    if extracted_category in subcats:
-                        if request.category == main_cat:
-                            category_to_use = extracted_category
-                            print(f"Using extracted subcategory: {extracted_category}")
-                        break
-        
-        print(f"Using category: {category_to_use}")
-        
-        # Шаг 1: Собираем все ссылки на товары из категории
-        print(f"Extracting product links from category: {request.category_url}")
-        product_links = await extract_product_links_from_category(request.category_url)
-        
-        results["total_links_found"] = len(product_links)
-        print(f"Found {len(product_links)} product links")
-        
-        if not product_links:
-            return {
-                **results,
-                "status": "completed",
-                "message": "Не найдено товаров в категории"
-            }
-        
-        # Ограничиваем количество
-        product_links = product_links[:request.max_products]
-        
-        # Шаг 2: Парсим каждый товар
-        print(f"Parsing {len(product_links)} products...")
-        
-        for idx, url in enumerate(product_links, 1):
-            try:
-                print(f"Parsing product {idx}/{len(product_links)}: {url[:80]}...")
-                
-                # Проверяем, существует ли уже товар с таким source_url
-                existing_product = queries.get_product_by_source_url(url)
-                if existing_product:
-                    print(f"  ⏭️ Product already exists, skipping: {url[:80]}...")
-                    results["success"].append({
-                        "url": url,
-                        "product_id": existing_product['id'],
-                        "title": existing_product['title'],
-                        "status": "already_exists"
-                    })
-                    continue
-                
-                parsed = await parse_poizon_product(url)
-                
-                if parsed:
-                    final_category = category_to_use
-                    if parsed.get('extracted_category'):
-                        extracted = parsed['extracted_category']
-                        if extracted in MAIN_CATEGORIES_WITH_SUBCATEGORIES.get(category_to_use, []):
-                            final_category = extracted
-                            print(f"Using extracted subcategory from product: {extracted}")
-                    
-                    product_data = {
-                        'category': final_category,
-                        'season': request.season,
-                        'title': parsed['title'],
-                        'description': parsed.get('description', ''),
-                        'price_cents': parsed['price_cents'],
-                        'images_base64': parsed.get('images_base64', []),
-                        'source_url': url
-                    }
-                    
-                    product = queries.create_product(product_data)
-                    results["success"].append({
-                        "url": url,
-                        "product_id": product['id'],
-                        "title": product['title'],
-                        "status": "created"
-                    })
-                else:
-                    results["failed"].append({
-                        "url": url,
-                        "error": "Failed to parse product"
-                    })
-            
-            except Exception as e:
-                results["failed"].append({
-                    "url": url,
-                    "error": str(e)
-                })
-                print(f"Error parsing {url}: {e}")
-            
-            # Задержка между запросами (чтобы не нагружать сайт)
-            if idx < len(product_links):
-                await asyncio.sleep(2)
-        
-        results["status"] = "completed"
-        
-    except Exception as e:
-        results["status"] = "error"
-        results["error"] = str(e)
-        print(f"Error parsing category: {e}")
+    job_id = jobs.submit('parse_category', {
+        'category_url': request.category_url,
+        'category': request.category,
+        'season': request.season,
+        'max_products': request.max_products,
+        'use_selenium': True,
+        'skip_size_guide': False
+    })
+    return {"status": "started", "job_id": job_id, "category_url": request.category_url}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Состояние задачи парсинга (только админ): состояние, счетчики, исходы по товарам"""
+    user = await require_admin(current_user)
     
-    return results
+    job = jobs.get_status(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": {"code": "NOT_FOUND", "message": "Job not found"}}
+        )
+    return job
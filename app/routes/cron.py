@@ -1,132 +1,69 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Header
 from pydantic import BaseModel, Field, validator
 from typing import Optional
-import asyncio
 import os
-from app.db import queries
-from app.utils.poizon_parser import parse_poizon_product
-from app.utils.poizon_category_parser import extract_product_links_from_category, extract_category_name_from_page
-from app.utils.category_mapping import MAIN_CATEGORIES_WITH_SUBCATEGORIES
+from app import jobs
+from app.config import settings
 
 router = APIRouter()
 
 
+def _check_token(token: str) -> None:
+    """Cron-запросы авторизуются токеном из переменной окружения CRON_TOKEN"""
+    cron_token = os.getenv('CRON_TOKEN', '')
+    
+    if not cron_token or token != cron_token:
+        raise HTTPException(
+            status_code=401,
+            detail={"error": {"code": "UNAUTHORIZED", "message": "Invalid token"}}
+        )
+
+
 class UpdatePricesRequest(BaseModel):
     token: str = Field(..., description="Токен для авторизации cron-запроса")
     max_products: Optional[int] = Field(100, ge=1, le=1000, description="Максимальное количество товаров для обновления")
-
-
-async def _update_prices_background(max_products: int):
-    """Фоновая задача для обновления цен"""
-    results = {
-        "total_products": 0,
-        "updated": [],
-        "failed": [],
-        "status": "in_progress"
-    }
-    
-    try:
-        # Получаем все товары с source_url
-        products = queries.get_all_products_with_source_url()
-        results["total_products"] = len(products)
-        
-        if not products:
-            results["status"] = "completed"
-            results["message"] = "Нет товаров для обновления"
-            return
-        
-        # Ограничиваем количество
-        products = products[:max_products]
-        
-        print(f"Updating prices for {len(products)} products...")
-        
-        for idx, product in enumerate(products, 1):
-            try:
-                print(f"Updating product {idx}/{len(products)}: {product['title'][:50]}...")
-                source_url = product['source_url']
-                
-                # Парсим товар заново (без Selenium для скорости)
-                parsed = await parse_poizon_product(source_url, use_selenium=False, skip_size_guide=True)
-                
-                if parsed:
-                    # Обновляем только цену и описание (размеры и цены)
-                    updates = {
-                        'price_cents': parsed['price_cents'],
-                        'description': parsed.get('description', '')
-                    }
-                    
-                    updated_product = queries.update_product(product['id'], updates)
-                    
-                    if updated_product:
-                        results["updated"].append({
-                            "product_id": product['id'],
-                            "title": product['title'],
-                            "new_price": parsed['price_cents']
-                        })
-                    else:
-                        results["failed"].append({
-                            "product_id": product['id'],
-                            "title": product['title'],
-                            "error": "Failed to update in database"
-                        })
-                else:
-                    results["failed"].append({
-                        "product_id": product['id'],
-                        "title": product['title'],
-                        "error": "Failed to parse product"
-                    })
-            
-            except Exception as e:
-                results["failed"].append({
-                    "product_id": product['id'],
-                    "title": product['title'],
-                    "error": str(e)
-                })
-                print(f"Error updating {product['source_url']}: {e}")
-            
-            # Уменьшенная задержка между запросами (1 секунда вместо 2)
-            if idx < len(products):
-                await asyncio.sleep(1)
-        
-        results["status"] = "completed"
-        print(f"✅ Price update completed: {len(results['updated'])} updated, {len(results['failed'])} failed")
-        
-    except Exception as e:
-        results["status"] = "error"
-        results["error"] = str(e)
-        print(f"Error updating prices: {e}")
+    time_budget_seconds: Optional[float] = Field(
+        None, ge=60, le=6 * 3600,
+        description="Бюджет времени на обновление (по умолчанию PRICE_REFRESH_TIME_BUDGET_SECONDS)"
+    )
+    parallel_jobs: Optional[int] = Field(
+        None, ge=1, le=32,
+        description="Сколько задач обновления запустить параллельно (по умолчанию PRICE_REFRESH_PARALLEL_JOBS)"
+    )
 
 
 @router.post("/update-prices")
-async def update_prices(
-    request: UpdatePricesRequest,
-    background_tasks: BackgroundTasks
-):
+async def update_prices(request: UpdatePricesRequest):
     """
-    Обновление цен и размеров для всех товаров с source_url
+    Обновление цен и размеров товаров с source_url: в пределах max_products и бюджета времени
+    сначала те, чьи цены вероятнее всего изменились с последней проверки.
+    parallel_jobs задач делят max_products и берут товары в аренду непересекающимися пачками,
+    так что их выполняют свободные воркеры на любых процессах и нодах
     Используется для cron-задач (раз в сутки)
     Требует токен из переменной окружения CRON_TOKEN
-    Запускает обновление в фоне, чтобы не превышать таймауты n8n
+    Ставит задачу в очередь и сразу отвечает, чтобы не превышать таймауты n8n;
+    ход выполнения - GET /cron/jobs/{job_id}
     """
-    cron_token = os.getenv('CRON_TOKEN', '')
+    _check_token(request.token)
     
-    if not cron_token or request.token != cron_token:
-        raise HTTPException(
-            status_code=401,
-            detail={"error": {"code": "UNAUTHORIZED", "message": "Invalid token"}}
-        )
-    
-    # Запускаем обновление в фоне
-    background_tasks.add_task(
-        _update_prices_background,
-        request.max_products
-    )
+    # Каждой задаче хотя бы один товар; остаток деления - первым задачам, в сумме ровно max_products
+    parallel_jobs = min(request.parallel_jobs or settings.price_refresh_parallel_jobs, request.max_products)
+    per_job, remainder = divmod(request.max_products, parallel_jobs)
+    job_ids = [
+        jobs.submit('update_prices', {
+            'max_products': per_job + (1 if i < remainder else 0),
+            'time_budget_seconds': request.time_budget_seconds
+        })
+        for i in range(parallel_jobs)
+    ]
     
     # Сразу возвращаем ответ, чтобы n8n не ждал
     return {
         "status": "started",
         "message": "Обновление цен запущено в фоне",
-        "max_products": request.max_products
+        "max_products": request.max_products,
+        "job_id": job_ids[0],
+        "job_ids": job_ids
     }
 
 
@@ -153,157 +90,24 @@ class ParseCategoryRequest(BaseModel):
         return v
 
 
-async def _parse_category_background(
-    category_url: str,
-    category: str,
-    season: Optional[str],
-    max_products: int,
-    use_selenium: bool
-):
-    """Фоновая задача для парсинга категории"""
-    results = {
-        "total_links_found": 0,
-        "success": [],
-        "failed": [],
-        "status": "in_progress"
-    }
-    
-    try:
-        category_to_use = category
-        
-        extracted_category = await extract_category_name_from_page(category_url)
-        if extracted_category:
-            print(f"Extracted category from page: {extracted_category}")
-            
-            if extracted_category in MAIN_CATEGORIES_WITH_SUBCATEGORIES.keys():
-                if category == extracted_category:
-                    category_to_use = extracted_category
-            else:
-                for main_cat, subcats in MAIN_CATEGORIES_WITH_SUBCATEGORIES.items():
-                    if extracted_category in subcats:
-                        if category == main_cat:
-                            category_to_use = extracted_category
-                            print(f"Using extracted subcategory: {extracted_category}")
-                        break
-        
-        print(f"Using category: {category_to_use}")
-        
-        # Шаг 1: Собираем все ссылки на товары из категории
-        print(f"Extracting product links from category: {category_url}")
-        product_links = await extract_product_links_from_category(category_url)
-        
-        results["total_links_found"] = len(product_links)
-        print(f"Found {len(product_links)} product links")
-        
-        if not product_links:
-            results["status"] = "completed"
-            results["message"] = "Не найдено товаров в категории"
-            return
-        
-        # Ограничиваем количество
-        product_links = product_links[:max_products]
-        
-        # Шаг 2: Парсим каждый товар
-        print(f"Parsing {len(product_links)} products...")
-        
-        for idx, url in enumerate(product_links, 1):
-            try:
-                print(f"Parsing product {idx}/{len(product_links)}: {url[:80]}...")
-                
-                # Проверяем, существует ли уже товар с таким source_url
-                existing_product = queries.get_product_by_source_url(url)
-                if existing_product:
-                    print(f"  ⏭️ Product already exists, skipping: {url[:80]}...")
-                    results["success"].append({
-                        "url": url,
-                        "product_id": existing_product['id'],
-                        "title": existing_product['title'],
-                        "status": "already_exists"
-                    })
-                    continue
-                
-                parsed = await parse_poizon_product(url, use_selenium=use_selenium, skip_size_guide=True)
-                
-                if parsed:
-                    final_category = category_to_use
-                    if parsed.get('extracted_category'):
-                        extracted = parsed['extracted_category']
-                        if extracted in MAIN_CATEGORIES_WITH_SUBCATEGORIES.get(category_to_use, []):
-                            final_category = extracted
-                            print(f"Using extracted subcategory from product: {extracted}")
-                    
-                    product_data = {
-                        'category': final_category,
-                        'season': season,
-                        'title': parsed['title'],
-                        'description': parsed.get('description', ''),
-                        'price_cents': parsed['price_cents'],
-                        'images_base64': parsed.get('images_base64', []),
-                        'source_url': url
-                    }
-                    
-                    product = queries.create_product(product_data)
-                    results["success"].append({
-                        "url": url,
-                        "product_id": product['id'],
-                        "title": product['title'],
-                        "status": "created"
-                    })
-                else:
-                    results["failed"].append({
-                        "url": url,
-                        "error": "Failed to parse product"
-                    })
-            
-            except Exception as e:
-                results["failed"].append({
-                    "url": url,
-                    "error": str(e)
-                })
-                print(f"Error parsing {url}: {e}")
-            
-            # Уменьшенная задержка между запросами (1 секунда вместо 2)
-            if idx < len(product_links):
-                await asyncio.sleep(1)
-        
-        results["status"] = "completed"
-        print(f"✅ Category parsing completed: {len(results['success'])} success, {len(results['failed'])} failed")
-        
-    except Exception as e:
-        results["status"] = "error"
-        results["error"] = str(e)
-        print(f"Error parsing category: {e}")
-
-
 @router.post("/parse-category")
-async def parse_category_cron(
-    request: ParseCategoryRequest,
-    background_tasks: BackgroundTasks
-):
+async def parse_category_cron(request: ParseCategoryRequest):
     """
     Автоматический парсинг категории через cron
     Используется для автоматического парсинга категорий (например, раз в день)
     Требует токен из переменной окружения CRON_TOKEN
-    Запускает парсинг в фоне, чтобы не превышать таймауты n8n
+    Ставит задачу в очередь и сразу отвечает, чтобы не превышать таймауты n8n;
+    ход выполнения - GET /cron/jobs/{job_id}
     """
+    _check_token(request.token)
     
-    cron_token = os.getenv('CRON_TOKEN', '')
-    
-    if not cron_token or request.token != cron_token:
-        raise HTTPException(
-            status_code=401,
-            detail={"error": {"code": "UNAUTHORIZED", "message": "Invalid token"}}
-        )
-    
-    # Запускаем парсинг в фоне
-    background_tasks.add_task(
-        _parse_category_background,
-        request.category_url,
-        request.category,
-        request.season,
-        request.max_products,
-        request.use_selenium
-    )
+    job_id = jobs.submit('parse_category', {
+        'category_url': request.category_url,
+        'category': request.category,
+        'season': request.season,
+        'max_products': request.max_products,
+        'use_selenium': request.use_selenium
+    })
     
     # Сразу возвращаем ответ, чтобы n8n не ждал
     return {
@@ -311,6 +115,28 @@ async def parse_category_cron(
         "message": "Парсинг категории запущен в фоне",
         "category_url": request.category_url,
         "max_products": request.max_products,
-        "use_selenium": request.use_selenium
+        "use_selenium": request.use_selenium,
+        "job_id": job_id
     }
 
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    x_cron_token: str = Header(..., alias="x-cron-token", description="Токен для авторизации cron-запроса")
+):
+    """
+    Состояние задачи парсинга: queued, running, completed, failed или source_unavailable,
+    счетчики, исходы по товарам, время выполнения и скорость (товаров в минуту).
+    Токен передается в заголовке X-Cron-Token, а не в query string: URL попадает в логи
+    """
+    _check_token(x_cron_token)
+    
+    job = jobs.get_status(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": {"code": "NOT_FOUND", "message": "Job not found"}}
+        )
+    
+    return job
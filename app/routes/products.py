@@ -1,10 +1,36 @@
 from fastapi import APIRouter, Query, HTTPException, Depends
-from typing import Optional
+from typing import Optional, List
+import uuid
 from app.middleware.telegram_auth import get_current_user
 from app.db import queries
+from app.db.catalog_snapshot import catalog_snapshot
+from app.db.product_views import product_views
 
 router = APIRouter()
 
+# Максимум id в одном запросе ?ids=... (избранное, корзина)
+MAX_PRODUCT_IDS = 300
+
+
+def _parse_product_ids(ids: str) -> List[str]:
+    """
+    id из ?ids=... в каноническом виде UUID (как их отдает Postgres и хранит снимок каталога),
+    без повторов и в порядке запроса; некорректный id - 400, а не ошибка приведения типа в SQL
+    """
+    product_ids = []
+    for raw_id in ids.split(','):
+        raw_id = raw_id.strip()
+        if not raw_id:
+            continue
+        try:
+            product_ids.append(str(uuid.UUID(raw_id)))
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail={"error": {"code": "INVALID_ID", "message": f"Invalid product id: {raw_id[:64]}"}}
+            )
+    return list(dict.fromkeys(product_ids))
+
 
 @router.get("")
 async def get_products(
@@ -13,11 +39,26 @@ async def get_products(
     q: Optional[str] = Query(None),
     size: Optional[str] = Query(None),
     brand: Optional[str] = Query(None),
-    limit: Optional[int] = Query(None),
-    offset: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=0),
+    offset: Optional[int] = Query(None, ge=0),
+    ids: Optional[str] = Query(None, description="Список id через запятую; остальные фильтры при этом не применяются"),
     current_user: dict = Depends(get_current_user)
 ):
     """Получить список товаров"""
+    if ids is not None:
+        product_ids = _parse_product_ids(ids)
+        if len(product_ids) > MAX_PRODUCT_IDS:
+            raise HTTPException(
+                status_code=400,
+                detail={"error": {"code": "TOO_MANY_IDS", "message": f"Maximum {MAX_PRODUCT_IDS} ids per request"}}
+            )
+        if catalog_snapshot.loaded:
+            return catalog_snapshot.get_many(product_ids)
+        return queries.get_products_by_ids(product_ids)
+    
+    # Пока снимок каталога не загружен, отвечаем из Postgres
+    if catalog_snapshot.loaded:
+        return catalog_snapshot.query(category=category, season=season, q=q, size=size, brand=brand, limit=limit, offset=offset)
     products = queries.get_products(category=category, season=season, q=q, size=size, brand=brand, limit=limit, offset=offset)
     return products
 
@@ -35,4 +76,6 @@ async def get_product(
             detail={"error": {"code": "NOT_FOUND", "message": "Product not found"}}
         )
     
+    # Просмотр карточки - сигнал популярности для очереди обновления цен
+    product_views.record(product_id)
     return product
@@ -0,0 +1,129 @@
+"""
+Circuit breaker для хостов Poizon.
+После POIZON_CIRCUIT_FAILURE_THRESHOLD временных отказов подряд (таймауты, сетевые ошибки,
+429/5xx после всех повторов и между ними) цепь размыкается: запросы к хосту не уходят,
+а ждут, то есть все задачи парсинга встают на паузу. По истечении паузы цепь полуоткрыта -
+проходит один пробный запрос. Успех замыкает цепь и отпускает ожидающих, отказ снова
+размыкает ее на вдвое больший срок. Кто ждет дольше POIZON_CIRCUIT_MAX_WAIT_SECONDS,
+получает HostUnavailable.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class HostUnavailable(Exception):
+    """Хост недоступен: цепь разомкнута дольше, чем можно ждать"""
+
+
+class CircuitBreaker:
+    def __init__(self, host: str, failure_threshold: int, open_seconds: float, max_open_seconds: float):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        self._open_for = open_seconds
+        self._probe_in_flight = False
+        self._cond = asyncio.Condition()
+
+    async def before_request(self, max_wait: float) -> None:
+        """Дождаться, когда к хосту можно обращаться (или стать пробным запросом)"""
+        deadline = time.monotonic() + max_wait
+        async with self._cond:
+            while True:
+                if self.state == CLOSED:
+                    return
+                now = time.monotonic()
+                if self.state == OPEN and now >= self.opened_until:
+                    self.state = HALF_OPEN
+                    self._probe_in_flight = False
+                if self.state == HALF_OPEN and not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    logger.info("Circuit for %s half-open, sending probe request", self.host)
+                    return
+                if now >= deadline:
+                    raise HostUnavailable(f"{self.host} is unavailable (circuit {self.state})")
+                wait = deadline - now
+                if self.state == OPEN:
+                    wait = min(wait, self.opened_until - now)
+                try:
+                    await asyncio.wait_for(self._cond.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def record_success(self) -> None:
+        async with self._cond:
+            if self.state != CLOSED:
+                logger.info("Circuit for %s closed, host is responding again", self.host)
+                self._cond.notify_all()
+            self.state = CLOSED
+            self.failures = 0
+            self._open_for = self.open_seconds
+            self._probe_in_flight = False
+
+    async def record_failure(self) -> None:
+        async with self._cond:
+            if self.state == HALF_OPEN:
+                # Пробный запрос не прошел: пауза вдвое длиннее
+                self._open_for = min(self._open_for * 2, self.max_open_seconds)
+                self._open()
+                return
+            if self.state == OPEN:
+                return
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._open()
+
+    async def release_probe(self) -> None:
+        """Пробный запрос завершился без ответа хоста (отмена, ошибка разбора): пустить следующий"""
+        async with self._cond:
+            if self.state == HALF_OPEN and self._probe_in_flight:
+                self._probe_in_flight = False
+                self._cond.notify_all()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_until = time.monotonic() + self._open_for
+        self._probe_in_flight = False
+        # Ожидающие пересчитывают срок ожидания по новому opened_until
+        self._cond.notify_all()
+        logger.error(
+            "Circuit for %s opened after %s failures, pausing requests for %.0fs",
+            self.host, self.failures, self._open_for
+        )
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def for_url(url: str) -> CircuitBreaker:
+    """Circuit breaker хоста url (общий для всех задач процесса)"""
+    host = urlsplit(url).hostname or ''
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(
+            host,
+            failure_threshold=settings.poizon_circuit_failure_threshold,
+            open_seconds=settings.poizon_circuit_open_seconds,
+            max_open_seconds=settings.poizon_circuit_max_open_seconds
+        )
+    return breaker
+
+
+def reset() -> None:
+    """Забыть состояние хостов (при закрытии клиента: примитивы привязаны к event loop)"""
+    _breakers.clear()
+
@@ -0,0 +1,90 @@
+"""
+Пулы для блокирующей работы парсинга, чтобы она не останавливала event loop.
+Selenium (time.sleep и синхронные вызовы WebDriver) выполняется в отдельном
+пуле потоков ограниченного размера с ограниченной очередью, разбор HTML
+(BeautifulSoup, регулярные выражения) - в пуле процессов.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Callable, Any, Dict
+from app.config import settings
+from app.logging_config import log_context, current_context, setup_logging
+
+
+class SeleniumQueueFull(Exception):
+    """Все потоки Selenium заняты и очередь заполнена"""
+
+
+_selenium_pool: Optional[ThreadPoolExecutor] = None
+# Задачи в пуле: выполняются + ждут в очереди. Меняется только из потока event loop
+_selenium_pending = 0
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _call_with_log_context(context: Dict[str, Optional[str]], fn: Callable[..., Any], *args: Any) -> Any:
+    # Поток и процесс пула не видят contextvars вызывающего: job_id/url передаются явно
+    with log_context(**context):
+        return fn(*args)
+
+
+def _get_selenium_pool() -> ThreadPoolExecutor:
+    global _selenium_pool
+    if _selenium_pool is None:
+        _selenium_pool = ThreadPoolExecutor(
+            max_workers=settings.selenium_pool_size,
+            thread_name_prefix='selenium'
+        )
+    return _selenium_pool
+
+
+async def run_selenium(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Выполнить синхронную Selenium-функцию в пуле и дождаться результата.
+    Если пул и очередь заполнены, сразу выбрасывает SeleniumQueueFull.
+    """
+    global _selenium_pending
+    capacity = settings.selenium_pool_size + settings.selenium_queue_size
+    if _selenium_pending >= capacity:
+        raise SeleniumQueueFull(f"Selenium queue is full ({_selenium_pending} tasks)")
+    _selenium_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_selenium_pool(), _call_with_log_context, current_context(), fn, *args)
+    finally:
+        _selenium_pending -= 1
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    global _cpu_pool
+    if _cpu_pool is None:
+        # spawn, а не fork: процесс уже держит потоки (event loop, пулы), fork их не копирует
+        _cpu_pool = ProcessPoolExecutor(
+            max_workers=settings.parse_process_pool_size,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=setup_logging
+        )
+    return _cpu_pool
+
+
+async def run_cpu(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Выполнить CPU-функцию в пуле процессов. fn и аргументы должны сериализоваться pickle
+    (функция уровня модуля). При PARSE_PROCESS_POOL_SIZE=0 выполняется в потоке.
+    """
+    loop = asyncio.get_running_loop()
+    context = current_context()
+    if settings.parse_process_pool_size <= 0:
+        return await loop.run_in_executor(None, _call_with_log_context, context, fn, *args)
+    return await loop.run_in_executor(_get_cpu_pool(), _call_with_log_context, context, fn, *args)
+
+
+def shutdown_executors() -> None:
+    """Остановить пулы (при завершении процесса); ждущие задачи отменяются"""
+    global _selenium_pool, _cpu_pool
+    if _selenium_pool is not None:
+        _selenium_pool.shutdown(wait=False, cancel_futures=True)
+        _selenium_pool = None
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = None
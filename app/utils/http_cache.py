@@ -0,0 +1,191 @@
+"""
+Дисковый кэш страниц Poizon с условной перепроверкой.
+Тело страницы хранится сжатым (zlib) вместе с ETag/Last-Modified; при следующей загрузке
+клиент отправляет If-None-Match/If-Modified-Since, и на ответ 304 страница берется с диска:
+неизменившаяся страница стоит одного обмена заголовками.
+Размер каталога ограничен, первыми удаляются давно не использованные записи (LRU по mtime).
+Каталог можно разделять между процессами: запись атомарна (os.replace), чужое удаление
+записи просто дает промах.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+ENTRY_SUFFIX = '.entry'
+COMPRESS_LEVEL = 6
+# Индекс процесса не видит записей других процессов: время от времени он строится заново
+REINDEX_EVERY_PUTS = 500
+# Параметры, которые не меняют содержимое страницы
+IGNORED_QUERY_PREFIXES = ('utm_',)
+
+
+class CachedPage(NamedTuple):
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: str
+    # False - сохранено только начало страницы (до конца __NEXT_DATA__)
+    complete: bool
+    body: bytes
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def canonical_url(url: str) -> str:
+    """Ключ кэша: схема и хост в нижнем регистре, без фрагмента и utm-меток, параметры по порядку"""
+    parts = urlsplit(url)
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.startswith(IGNORED_QUERY_PREFIXES)
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', urlencode(query), ''))
+
+
+class HttpCache:
+    """Записи - файлы <blake2b(url)>.entry: строка JSON с метаданными, затем тело в zlib"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Имя файла -> размер, от давно использованных к недавним; строится при первом обращении
+        self._index: Optional['OrderedDict[str, int]'] = None
+        self._total = 0
+        self._puts = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _ensure_index(self) -> 'OrderedDict[str, int]':
+        if self._index is None:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.name.endswith(ENTRY_SUFFIX):
+                        try:
+                            stat = item.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((stat.st_mtime, item.name, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((name, size) for _, name, size in entries)
+            self._total = sum(self._index.values())
+        return self._index
+
+    @staticmethod
+    def _name(url: str) -> str:
+        return hashlib.blake2b(canonical_url(url).encode('utf-8'), digest_size=16).hexdigest() + ENTRY_SUFFIX
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        name = self._name(url)
+        path = self._path(name)
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            meta_raw, _, compressed = raw.partition(b'\n')
+            meta = json.loads(meta_raw)
+            body = zlib.decompress(compressed)
+            # mtime - время последнего использования, по нему вытесняют и другие процессы
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error) as e:
+            logger.warning("Dropping unreadable HTTP cache entry %s: %s", name, e)
+            self._remove(name)
+            return None
+        if meta.get('url') != canonical_url(url):
+            return None
+        with self._lock:
+            index = self._ensure_index()
+            if name in index:
+                index.move_to_end(name)
+        return CachedPage(
+            url=meta['url'],
+            etag=meta.get('etag'),
+            last_modified=meta.get('last_modified'),
+            content_type=meta.get('content_type', ''),
+            complete=bool(meta.get('complete', True)),
+            body=body
+        )
+
+    def put(self, url: str, headers: Dict[str, str], body: bytes, complete: bool) -> bool:
+        """Сохранить ответ 200. Без ETag и Last-Modified перепроверить нечем - не сохраняется"""
+        etag = headers.get('etag')
+        last_modified = headers.get('last-modified')
+        if not etag and not last_modified:
+            return False
+        meta = {
+            'url': canonical_url(url),
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': headers.get('content-type', ''),
+            'complete': complete,
+        }
+        data = json.dumps(meta).encode('utf-8') + b'\n' + zlib.compress(body, COMPRESS_LEVEL)
+        if len(data) > self.max_bytes:
+            return False
+        name = self._name(url)
+        with self._lock:
+            self._puts += 1
+            if self._puts % REINDEX_EVERY_PUTS == 0:
+                self._index = None
+            index = self._ensure_index()
+            tmp_path = self._path(f'{name}.{os.getpid()}.{threading.get_ident()}.tmp')
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(name))
+            except OSError as e:
+                logger.warning("HTTP cache write failed for %s: %s", url, e)
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                return False
+            self._total += len(data) - index.pop(name, 0)
+            index[name] = len(data)
+            while self._total > self.max_bytes and index:
+                old_name, old_size = index.popitem(last=False)
+                self._total -= old_size
+                try:
+                    os.unlink(self._path(old_name))
+                except FileNotFoundError:
+                    pass
+        return True
+
+    def _remove(self, name: str) -> None:
+        with self._lock:
+            if self._index is not None and name in self._index:
+                self._total -= self._index.pop(name)
+        try:
+            os.unlink(self._path(name))
+        except FileNotFoundError:
+            pass
+
+
+_cache: Optional[HttpCache] = None
+
+
+def get_cache() -> Optional[HttpCache]:
+    """Кэш процесса или None, если POIZON_HTTP_CACHE_DIR пуст"""
+    global _cache
+    if _cache is None and settings.poizon_http_cache_dir:
+        _cache = HttpCache(settings.poizon_http_cache_dir, settings.poizon_http_cache_max_bytes)
+    return _cache
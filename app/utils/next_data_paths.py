@@ -0,0 +1,81 @@
+"""
+Кэш путей к данным внутри __NEXT_DATA__ по отпечатку схемы страницы.
+Страницы одной сборки Next.js устроены одинаково: после того как цепочка стратегий
+один раз нашла данные товара и список SKU, их пути запоминаются, и следующие страницы
+с тем же отпечатком берут данные сразу по пути, без перебора ключей и обхода массивов.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+
+Path = Tuple[Union[str, int], ...]
+
+# Сколько разных схем помнить (сборки сайта меняются, старые вытесняются)
+MAX_FINGERPRINTS = 256
+# Глубже данные товара в __NEXT_DATA__ не лежат, дальше не ищем
+MAX_PATH_DEPTH = 8
+
+_lock = threading.Lock()
+_paths: 'OrderedDict[str, Dict[str, Path]]' = OrderedDict()
+
+
+def fingerprint(next_data: Dict[str, Any]) -> str:
+    """Отпечаток схемы: сборка Next.js, маршрут страницы и набор ключей pageProps"""
+    page_props = (next_data.get('props') or {}).get('pageProps')
+    keys = sorted(page_props.keys()) if isinstance(page_props, dict) else []
+    raw = '|'.join([str(next_data.get('buildId', '')), str(next_data.get('page', '')), ','.join(keys)])
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def resolve(data: Any, path: Path) -> Any:
+    """Значение по пути (ключи словарей и индексы списков) или None"""
+    for step in path:
+        if isinstance(step, int):
+            if not isinstance(data, list) or step >= len(data):
+                return None
+        elif not isinstance(data, dict) or step not in data:
+            return None
+        data = data[step]
+    return data
+
+
+def find_path(root: Any, target: Any) -> Optional[Path]:
+    """Путь от root до объекта target (сравнение по идентичности), в ширину - кратчайший"""
+    queue = [(root, ())]
+    for node, path in queue:
+        if node is target:
+            return path
+        if len(path) >= MAX_PATH_DEPTH:
+            continue
+        if isinstance(node, dict):
+            queue.extend((value, path + (key,)) for key, value in node.items() if isinstance(value, (dict, list)))
+        elif isinstance(node, list):
+            queue.extend((value, path + (idx,)) for idx, value in enumerate(node) if isinstance(value, (dict, list)))
+    return None
+
+
+def lookup(key: str, field: str) -> Optional[Path]:
+    with _lock:
+        paths = _paths.get(key)
+        if paths is None:
+            return None
+        _paths.move_to_end(key)
+        return paths.get(field)
+
+
+def remember(key: str, field: str, path: Path) -> None:
+    with _lock:
+        _paths.setdefault(key, {})[field] = path
+        _paths.move_to_end(key)
+        while len(_paths) > MAX_FINGERPRINTS:
+            _paths.popitem(last=False)
+
+
+def forget(key: str, field: str) -> None:
+    """Путь больше не подходит (схема изменилась при том же отпечатке)"""
+    with _lock:
+        paths = _paths.get(key)
+        if paths is not None:
+            paths.pop(field, None)
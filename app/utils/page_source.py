@@ -0,0 +1,107 @@
+"""
+Быстрый доступ к данным страницы Poizon без построения полного DOM.
+JSON из <script id="__NEXT_DATA__"> вырезается прямо из байтов и декодируется orjson
+(если установлен), BeautifulSoup (lxml) строится лениво - только когда он нужен
+запасной стратегии.
+"""
+import logging
+import json
+from typing import Optional, Tuple, Union, Any, Dict
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+NEXT_DATA_ID = b'__NEXT_DATA__'
+SCRIPT_END = b'</script>'
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """json.loads через orjson, если он установлен"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def find_next_data(content: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Границы JSON внутри <script id="__NEXT_DATA__">...</script>.
+    None, если тега нет или закрывающий </script> еще не встретился (потоковая загрузка).
+    """
+    marker = content.find(NEXT_DATA_ID)
+    while marker != -1:
+        tag_start = content.rfind(b'<script', 0, marker)
+        tag_end = content.find(b'>', marker)
+        # Маркер должен быть атрибутом тега <script>, а не упоминанием в тексте скрипта
+        if tag_start != -1 and tag_end != -1 and b'>' not in content[tag_start:marker]:
+            body_end = content.find(SCRIPT_END, tag_end)
+            if body_end == -1:
+                return None
+            return tag_end + 1, body_end
+        marker = content.find(NEXT_DATA_ID, marker + len(NEXT_DATA_ID))
+    return None
+
+
+class PageSource:
+    """HTML страницы: байты, лениво декодированный текст, __NEXT_DATA__ и DOM"""
+
+    def __init__(self, content: Union[bytes, str], encoding: str = 'utf-8'):
+        if isinstance(content, str):
+            self._text: Optional[str] = content
+            content = content.encode('utf-8')
+        else:
+            self._text = None
+        self.content = content
+        self.encoding = encoding
+        self._soup: Optional[BeautifulSoup] = None
+        self._next_data: Optional[Dict[str, Any]] = None
+        self._next_data_parsed = False
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.content.decode(self.encoding, errors='replace')
+        return self._text
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        """Полный DOM (lxml), строится при первом обращении"""
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.text, 'lxml')
+        return self._soup
+
+    @property
+    def has_soup(self) -> bool:
+        return self._soup is not None
+
+    @property
+    def next_data(self) -> Optional[Dict[str, Any]]:
+        """Декодированный __NEXT_DATA__ или None"""
+        if not self._next_data_parsed:
+            self._next_data_parsed = True
+            bounds = find_next_data(self.content)
+            if bounds:
+                try:
+                    self._next_data = json_loads(self.content[bounds[0]:bounds[1]])
+                except ValueError as e:
+                    logger.error("❌ Error parsing __NEXT_DATA__: %s", e)
+        return self._next_data
+
+    def fragment_soup(self, marker: bytes, window: int = 8192) -> Optional[BeautifulSoup]:
+        """
+        DOM небольшого фрагмента, начинающегося с тега, который содержит marker.
+        Для одиночных блоков (хлебные крошки), когда полный DOM не нужен.
+        """
+        if self._soup is not None:
+            return self._soup
+        pos = self.content.find(marker)
+        if pos == -1:
+            return None
+        start = self.content.rfind(b'<', 0, pos)
+        fragment = self.content[start:pos + window]
+        return BeautifulSoup(fragment.decode(self.encoding, errors='replace'), 'lxml')
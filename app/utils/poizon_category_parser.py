@@ -1,156 +1,169 @@
+import logging
 import httpx
-from bs4 import BeautifulSoup
-from typing import List, Set, Optional
+from typing import List, Set, Optional, Dict, Any
 import re
-import asyncio
-import json
 from app.utils.category_mapping import MAIN_CATEGORIES_WITH_SUBCATEGORIES
+from app.utils import poizon_client
+from app.utils.circuit_breaker import HostUnavailable
+from app.utils.page_source import PageSource
 
-async def extract_product_links_from_category(category_url: str) -> List[str]:
+logger = logging.getLogger(__name__)
+
+async def extract_product_links_from_category(
+    category_url: str,
+    frontier: Optional[Dict[str, Any]] = None
+) -> List[str]:
     """
     Извлекает все ссылки на товары из страницы категории
     Аналогично check_links_categories из примера
+    frontier - состояние обхода для возобновления после перезапуска: следующая страница
+    и собранные ссылки (обновляется перед каждой страницей, done - обход завершен)
     """
-    product_links = set()
+    if frontier is None:
+        frontier = {}
+    if frontier.get('done'):
+        return list(frontier['links'])
+    # dict вместо set: после возобновления ссылки идут в том же порядке
+    product_links = dict.fromkeys(frontier.get('links', []))
     
-    base_domain = 'https://thepoizon.ru'
-    if 'thepoizon.ru' not in category_url:
-        base_domain = 'https://www.poizon.com'
+    base_domain = poizon_client.base_domain(category_url)
     
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8',
-            'Referer': f'{base_domain}/',
-        }
-        
-        page = 1
-        max_pages = 50  # Ограничение для безопасности
+    page = frontier.get('page', 1)
+    max_pages = 50  # Ограничение для безопасности
+    
+    while page <= max_pages:
+        frontier['page'] = page
+        frontier['links'] = list(product_links)
+        # Формируем URL с пагинацией
+        if '?' in category_url:
+            page_url = f"{category_url}&page={page}"
+        else:
+            page_url = f"{category_url}?page={page}"
         
-        while page <= max_pages:
-            # Формируем URL с пагинацией
-            if '?' in category_url:
-                page_url = f"{category_url}&page={page}"
-            else:
-                page_url = f"{category_url}?page={page}"
+        try:
+            logger.info("Fetching category page %s: %s", page, page_url)
+            response = await poizon_client.fetch(page_url)
+            response.raise_for_status()
             
-            try:
-                print(f"Fetching category page {page}: {page_url}")
-                response = await client.get(page_url, headers=headers)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Ищем ссылки на товары в __NEXT_DATA__
-                next_data_script = soup.find('script', id='__NEXT_DATA__')
-                found_links = False
-                
-                if next_data_script:
-                    try:
-                        next_data = json.loads(next_data_script.string)
-                        props = next_data.get('props', {})
-                        page_props = props.get('pageProps', {})
-                        
-                        # Ищем список товаров
-                        products = (page_props.get('products') or 
-                                  page_props.get('goodsList') or
-                                  page_props.get('items') or
-                                  page_props.get('productList'))
-                        
-                        if products and isinstance(products, list):
-                            for product in products:
-                                product_url = (product.get('url') or 
-                                             product.get('link') or
-                                             product.get('href') or
-                                             product.get('productUrl'))
-                                
-                                if product_url:
-                                    # Нормализуем URL
-                                    if product_url.startswith('/'):
-                                        product_url = base_domain + product_url
-                                    elif not product_url.startswith('http'):
-                                        continue
-                                    
-                                    product_links.add(product_url)
-                                    found_links = True
-                    except Exception as e:
-                        print(f"Error parsing __NEXT_DATA__: {e}")
-                
-                # Если не нашли в __NEXT_DATA__, ищем в HTML
-                if not found_links:
-                    # Селекторы для ссылок на товары (аналогично примеру)
-                    link_selectors = [
-                        'div.GoodsList_goodsList__hPoCW > a',
-                        'a[href*="/product/"]',
-                        '.goods-item a',
-                        '.product-item a',
-                        '[class*="goods"] a[href*="product"]',
-                        '[class*="product"] a[href*="product"]'
-                    ]
+            # __NEXT_DATA__ вырезается из HTML напрямую, DOM строится только для запасных селекторов
+            source = PageSource(response.content)
+            
+            # Ищем ссылки на товары в __NEXT_DATA__
+            next_data = source.next_data
+            found_links = False
+            
+            if isinstance(next_data, dict):
+                try:
+                    props = next_data.get('props', {})
+                    page_props = props.get('pageProps', {})
+                    
+                    # Ищем список товаров
+                    products = (page_props.get('products') or 
+                              page_props.get('goodsList') or
+                              page_props.get('items') or
+                              page_props.get('productList'))
                     
-                    for selector in link_selectors:
-                        links = soup.select(selector)
-                        for link in links:
-                            href = link.get('href')
-                            if href and '/product/' in href:
-                                if href.startswith('/'):
-                                    href = base_domain + href
-                                elif not href.startswith('http'):
+                    if products and isinstance(products, list):
+                        for product in products:
+                            product_url = (product.get('url') or 
+                                         product.get('link') or
+                                         product.get('href') or
+                                         product.get('productUrl'))
+                            
+                            if product_url:
+                                # Нормализуем URL
+                                if product_url.startswith('/'):
+                                    product_url = base_domain + product_url
+                                elif not product_url.startswith('http'):
                                     continue
                                 
-                                product_links.add(href)
+                                product_links[product_url] = None
                                 found_links = True
-                        
-                        if found_links:
-                            break
-                
-                # Проверяем, есть ли следующая страница
-                # Ищем кнопку "следующая" или пагинацию
-                has_next_page = False
-                
-                # Проверяем в __NEXT_DATA__
-                if next_data_script:
-                    try:
-                        next_data = json.loads(next_data_script.string)
-                        props = next_data.get('props', {})
-                        page_props = props.get('pageProps', {})
-                        
-                        pagination = page_props.get('pagination') or page_props.get('pageInfo')
-                        if pagination:
-                            current = pagination.get('current', page)
-                            total = pagination.get('total', pagination.get('totalPages'))
-                            if total and current < total:
-                                has_next_page = True
-                    except:
-                        pass
-                
-                # Проверяем в HTML
-                if not has_next_page:
-                    next_button = soup.select_one('li.ant-pagination-next:not([aria-disabled="true"])')
-                    if next_button:
-                        has_next_page = True
-                
-                if not found_links or not has_next_page:
-                    print(f"No more pages or products found. Total links collected: {len(product_links)}")
-                    break
-                
-                page += 1
-                await asyncio.sleep(1)  # Задержка между запросами
+                except Exception as e:
+                    logger.error("Error parsing __NEXT_DATA__: %s", e)
+            
+            # Если не нашли в __NEXT_DATA__, ищем в HTML
+            if not found_links:
+                # Селекторы для ссылок на товары (аналогично примеру)
+                link_selectors = [
+                    'div.GoodsList_goodsList__hPoCW > a',
+                    'a[href*="/product/"]',
+                    '.goods-item a',
+                    '.product-item a',
+                    '[class*="goods"] a[href*="product"]',
+                    '[class*="product"] a[href*="product"]'
+                ]
                 
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    print(f"Page {page} not found, stopping pagination")
-                    break
-                else:
-                    print(f"HTTP error on page {page}: {e.response.status_code}")
-                    page += 1
-                    continue
-            except Exception as e:
-                print(f"Error fetching page {page}: {e}")
+                for selector in link_selectors:
+                    links = source.soup.select(selector)
+                    for link in links:
+                        href = link.get('href')
+                        if href and '/product/' in href:
+                            if href.startswith('/'):
+                                href = base_domain + href
+                            elif not href.startswith('http'):
+                                continue
+                            
+                            product_links[href] = None
+                            found_links = True
+                    
+                    if found_links:
+                        break
+            
+            # Проверяем, есть ли следующая страница
+            # Ищем кнопку "следующая" или пагинацию
+            has_next_page = False
+            
+            # Проверяем в __NEXT_DATA__
+            if isinstance(next_data, dict):
+                try:
+                    props = next_data.get('props', {})
+                    page_props = props.get('pageProps', {})
+                    
+                    pagination = page_props.get('pagination') or page_props.get('pageInfo')
+                    if pagination:
+                        current = pagination.get('current', page)
+                        total = pagination.get('total', pagination.get('totalPages'))
+                        if total and current < total:
+                            has_next_page = True
+                except:
+                    pass
+            
+            # Проверяем в HTML
+            if not has_next_page:
+                next_button = source.soup.select_one('li.ant-pagination-next:not([aria-disabled="true"])')
+                if next_button:
+                    has_next_page = True
+            
+            if not found_links or not has_next_page:
+                logger.info("No more pages or products found. Total links collected: %s", len(product_links))
+                break
+            
+            page += 1
+            
+        except HostUnavailable:
+            raise
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.info("Page %s not found, stopping pagination", page)
+                break
+            elif poizon_client.is_transient(e):
+                # fetch уже повторил запрос: сайт отказывает устойчиво, следующие страницы не пробуем
+                logger.error("Page %s still failing after retries (HTTP %s), stopping pagination", page, e.response.status_code)
+                break
+            else:
+                logger.warning("HTTP error on page %s: %s", page, e.response.status_code)
                 page += 1
                 continue
-    
+        except Exception as e:
+            if poizon_client.is_transient(e):
+                logger.error("Page %s still failing after retries (%s), stopping pagination", page, e)
+                break
+            logger.error("Error fetching page %s: %s", page, e)
+            page += 1
+            continue
+
+    frontier.update(page=page, links=list(product_links), done=True)
     return list(product_links)
 
 async def extract_category_name_from_page(category_url: str) -> Optional[str]:
@@ -158,10 +171,6 @@ async def extract_category_name_from_page(category_url: str) -> Optional[str]:
     Извлекает название категории/подкатегории из страницы категории
     Возвращает название, если оно соответствует одной из наших категорий/подкатегорий
     """
-    base_domain = 'https://thepoizon.ru'
-    if 'thepoizon.ru' not in category_url:
-        base_domain = 'https://www.poizon.com'
-    
     category_mapping = {
         'sneakers': 'Кроссовки',
         'basketball': 'Баскетбол',
@@ -181,83 +190,76 @@ async def extract_category_name_from_page(category_url: str) -> Optional[str]:
             if rus_name in MAIN_CATEGORIES_WITH_SUBCATEGORIES:
                 return rus_name
     
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8',
-            'Referer': f'{base_domain}/',
-        }
+    try:
+        response = await poizon_client.fetch(category_url)
+        response.raise_for_status()
         
-        try:
-            response = await client.get(category_url, headers=headers)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            category_name = None
-            
-            next_data_script = soup.find('script', id='__NEXT_DATA__')
-            if next_data_script:
-                try:
-                    next_data = json.loads(next_data_script.string)
-                    props = next_data.get('props', {})
-                    page_props = props.get('pageProps', {})
-                    
-                    category_name = (page_props.get('categoryName') or 
-                                   page_props.get('category') or
-                                   page_props.get('title'))
-                    
-                    if isinstance(category_name, dict):
-                        category_name = category_name.get('name') or category_name.get('title')
-                    
-                    if not category_name:
-                        category_info = page_props.get('categoryInfo') or page_props.get('categoryData')
-                        if isinstance(category_info, dict):
-                            category_name = category_info.get('name') or category_info.get('title')
-                except Exception as e:
-                    print(f"Error parsing __NEXT_DATA__ for category: {e}")
-            
-            if not category_name:
-                nav_items = soup.select('nav a, div[class*="nav"] a, div[class*="Nav"] a')
-                for nav_item in nav_items:
-                    text = nav_item.get_text(strip=True)
-                    if text:
-                        all_categories = set(MAIN_CATEGORIES_WITH_SUBCATEGORIES.keys())
-                        for subcats in MAIN_CATEGORIES_WITH_SUBCATEGORIES.values():
-                            all_categories.update(subcats)
-                        for cat in all_categories:
-                            if cat.lower() == text.lower() or text.lower() in cat.lower():
-                                category_name = cat
-                                break
-                    if category_name:
-                        break
-            
-            if not category_name:
-                breadcrumb = soup.select_one('div.BreadCrumb_breadcrumb__Iy_yk')
-                if breadcrumb:
-                    links = breadcrumb.select('a span')
-                    if len(links) >= 3:
-                        category_name = links[2].get_text(strip=True)
-            
-            if not category_name:
-                title_tag = soup.select_one('h1, div[class*="title"], div[class*="Title"]')
-                if title_tag:
-                    category_name = title_tag.get_text(strip=True)
-            
-            if category_name:
-                category_name = category_name.strip()
+        source = PageSource(response.content)
+        
+        category_name = None
+        
+        next_data = source.next_data
+        if isinstance(next_data, dict):
+            try:
+                props = next_data.get('props', {})
+                page_props = props.get('pageProps', {})
                 
-                all_categories = set(MAIN_CATEGORIES_WITH_SUBCATEGORIES.keys())
-                for subcats in MAIN_CATEGORIES_WITH_SUBCATEGORIES.values():
-                    all_categories.update(subcats)
+                category_name = (page_props.get('categoryName') or 
+                               page_props.get('category') or
+                               page_props.get('title'))
                 
-                for cat in all_categories:
-                    if cat.lower() == category_name.lower() or category_name.lower() in cat.lower() or cat.lower() in category_name.lower():
-                        return cat
+                if isinstance(category_name, dict):
+                    category_name = category_name.get('name') or category_name.get('title')
+                
+                if not category_name:
+                    category_info = page_props.get('categoryInfo') or page_props.get('categoryData')
+                    if isinstance(category_info, dict):
+                        category_name = category_info.get('name') or category_info.get('title')
+            except Exception as e:
+                logger.error("Error parsing __NEXT_DATA__ for category: %s", e)
+        
+        if not category_name:
+            nav_items = source.soup.select('nav a, div[class*="nav"] a, div[class*="Nav"] a')
+            for nav_item in nav_items:
+                text = nav_item.get_text(strip=True)
+                if text:
+                    all_categories = set(MAIN_CATEGORIES_WITH_SUBCATEGORIES.keys())
+                    for subcats in MAIN_CATEGORIES_WITH_SUBCATEGORIES.values():
+                        all_categories.update(subcats)
+                    for cat in all_categories:
+                        if cat.lower() == text.lower() or text.lower() in cat.lower():
+                            category_name = cat
+                            break
+                if category_name:
+                    break
+        
+        if not category_name:
+            breadcrumb = source.soup.select_one('div.BreadCrumb_breadcrumb__Iy_yk')
+            if breadcrumb:
+                links = breadcrumb.select('a span')
+                if len(links) >= 3:
+                    category_name = links[2].get_text(strip=True)
+        
+        if not category_name:
+            title_tag = source.soup.select_one('h1, div[class*="title"], div[class*="Title"]')
+            if title_tag:
+                category_name = title_tag.get_text(strip=True)
+        
+        if category_name:
+            category_name = category_name.strip()
             
-        except Exception as e:
-            print(f"Error extracting category name: {e}")
+            all_categories = set(MAIN_CATEGORIES_WITH_SUBCATEGORIES.keys())
+            for subcats in MAIN_CATEGORIES_WITH_SUBCATEGORIES.values():
+                all_categories.update(subcats)
+            
+            for cat in all_categories:
+                if cat.lower() == category_name.lower() or category_name.lower() in cat.lower() or cat.lower() in category_name.lower():
+                    return cat
+        
+    except HostUnavailable:
+        raise
+    except Exception as e:
+        logger.error("Error extracting category name: %s", e)
     
     return None
 
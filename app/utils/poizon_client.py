@@ -0,0 +1,270 @@
+"""
+Общий HTTP-клиент для всех запросов к Poizon: страницы товаров, страницы категорий, изображения.
+Один httpx.AsyncClient на процесс - keep-alive между товарами, общие cookies,
+HTTP/2 (если установлен пакет h2) и единые профили заголовков.
+Темп и число одновременных запросов к каждому хосту задает app/utils/rate_limiter.py.
+Временные ошибки (таймауты, сетевые ошибки, 429/5xx) повторяются с экспоненциальной паузой
+со случайным разбросом; при устойчивых отказах хоста app/utils/circuit_breaker.py
+приостанавливает все запросы к нему.
+Страницы (профиль page) проходят через дисковый кэш app/utils/http_cache.py.
+"""
+import asyncio
+import importlib.util
+import logging
+import random
+import httpx
+from typing import Optional, Dict, Tuple, Callable, Awaitable, TypeVar
+from app.config import settings
+from app.utils import http_cache, rate_limiter, circuit_breaker
+from app.utils.page_source import NEXT_DATA_ID, SCRIPT_END, find_next_data
+
+logger = logging.getLogger(__name__)
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Профили заголовков по типу запроса; Referer добавляется в headers_for
+HEADER_PROFILES: Dict[str, Dict[str, str]] = {
+    'page': {
+        'User-Agent': USER_AGENT,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+        'Cache-Control': 'no-cache',
+        'Pragma': 'no-cache',
+    },
+    'image': {
+        'User-Agent': USER_AGENT,
+        'Accept': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
+    },
+}
+
+COOKIE_DOMAINS = ('thepoizon.ru', 'www.poizon.com')
+
+# Временные отказы: запрос повторяется, отказ засчитывается circuit breaker'у хоста.
+# Остальные ошибки (404, 403, ...) не повторяются - повтор дал бы тот же ответ
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_EXCEPTIONS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+T = TypeVar('T')
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def base_domain(url: str) -> str:
+    """Базовый домен сайта для Referer и относительных ссылок"""
+    if 'thepoizon.ru' in url:
+        return 'https://thepoizon.ru'
+    elif 'poizon.com' in url:
+        return 'https://www.poizon.com'
+    return 'https://thepoizon.ru'
+
+
+def headers_for(url: str, profile: str = 'page') -> Dict[str, str]:
+    """Заголовки профиля с Referer сайта, к которому относится url"""
+    headers = dict(HEADER_PROFILES[profile])
+    headers['Referer'] = f'{base_domain(url)}/'
+    return headers
+
+
+def _consent_cookies() -> httpx.Cookies:
+    """Cookies из POIZON_COOKIES ("name=value; name2=value2") для обоих доменов"""
+    cookies = httpx.Cookies()
+    if settings.poizon_cookies:
+        for part in settings.poizon_cookies.split(';'):
+            name, sep, value = part.strip().partition('=')
+            if sep and name:
+                for domain in COOKIE_DOMAINS:
+                    cookies.set(name, value, domain=domain)
+    return cookies
+
+
+def get_client() -> httpx.AsyncClient:
+    """Клиент процесса (создается при первом обращении)"""
+    global _client
+    if _client is None or _client.is_closed:
+        http2 = settings.poizon_http2 and importlib.util.find_spec('h2') is not None
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            follow_redirects=True,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.poizon_max_connections,
+                max_keepalive_connections=settings.poizon_max_connections,
+                keepalive_expiry=60.0
+            ),
+            cookies=_consent_cookies()
+        )
+        logger.info("Poizon HTTP client created (http2=%s, max_connections=%s)", http2, settings.poizon_max_connections)
+    return _client
+
+
+async def _cached_page(url: str) -> Optional[http_cache.CachedPage]:
+    cache = http_cache.get_cache()
+    if cache is None:
+        return None
+    # Чтение и распаковка файла - в потоке, чтобы не задерживать event loop
+    return await asyncio.to_thread(cache.get, url)
+
+
+async def _store_page(url: str, response: httpx.Response, body: bytes, complete: bool) -> None:
+    cache = http_cache.get_cache()
+    if cache is not None and response.status_code == 200:
+        await asyncio.to_thread(cache.put, url, response.headers, body, complete)
+
+
+def _revalidated(response: httpx.Response, cached: http_cache.CachedPage) -> httpx.Response:
+    """Ответ 200 с телом из кэша вместо 304: вызывающий код не отличает его от загрузки"""
+    logger.debug("Not modified, serving %s from HTTP cache", cached.url)
+    headers = {'content-type': cached.content_type}
+    headers.update((key, value) for key, value in response.headers.items() if key in ('etag', 'last-modified', 'date'))
+    return httpx.Response(200, headers=headers, content=cached.body, request=response.request)
+
+
+def is_transient(error: BaseException) -> bool:
+    """Ошибка временная: хост не ответил или ответил 429/5xx"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUSES
+    return isinstance(error, RETRY_EXCEPTIONS)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Пауза перед повтором attempt (с 1): экспонента, случайно в пределах ее второй половины"""
+    ceiling = min(settings.poizon_retry_max_delay, settings.poizon_retry_base_delay * 2 ** (attempt - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+async def _with_retries(url: str, send: Callable[[], Awaitable[T]]) -> T:
+    """
+    Выполнить send с повторами временных отказов. send выбрасывает httpx.HTTPStatusError
+    для ответа 429/5xx. После последней попытки выбрасывается последняя ошибка.
+    Перед каждой попыткой запрос ждет, пока circuit breaker хоста его пропустит.
+    """
+    breaker = circuit_breaker.for_url(url)
+    attempts = max(1, settings.poizon_retry_attempts)
+    for attempt in range(1, attempts + 1):
+        await breaker.before_request(settings.poizon_circuit_max_wait_seconds)
+        try:
+            result = await send()
+        except Exception as e:
+            if not is_transient(e):
+                if isinstance(e, httpx.HTTPStatusError):
+                    # Хост ответил (404 и т.п.) - он доступен
+                    await breaker.record_success()
+                else:
+                    await breaker.release_probe()
+                raise
+            await breaker.record_failure()
+            if attempt == attempts:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(
+                "Transient error for %s (%s), retry %s/%s in %.1fs",
+                url, _describe(e), attempt, attempts - 1, delay
+            )
+            await asyncio.sleep(delay)
+        except BaseException:
+            # Отмена задачи посреди пробного запроса не должна оставить цепь без пробы
+            await asyncio.shield(breaker.release_probe())
+            raise
+        else:
+            await breaker.record_success()
+            return result
+    raise AssertionError('unreachable')
+
+
+def _describe(error: BaseException) -> str:
+    if isinstance(error, httpx.HTTPStatusError):
+        return f'HTTP {error.response.status_code}'
+    return type(error).__name__
+
+
+def _raise_transient_status(response: httpx.Response) -> None:
+    if response.status_code in RETRY_STATUSES:
+        raise httpx.HTTPStatusError(
+            f'HTTP {response.status_code} for {response.url}', request=response.request, response=response
+        )
+
+
+async def fetch(url: str, profile: str = 'page', timeout: Optional[float] = None) -> httpx.Response:
+    """
+    GET через общий клиент с заголовками профиля, ограничением на хост и повторами.
+    Страница, сохраненная в кэше целиком, запрашивается условно; на 304 возвращается ее копия.
+    429/5xx после всех повторов выбрасывает httpx.HTTPStatusError, остальные статусы
+    возвращаются как есть (проверяет вызывающий через raise_for_status()).
+    """
+    headers = headers_for(url, profile)
+    cached = await _cached_page(url) if profile == 'page' else None
+    if cached is not None and cached.complete:
+        headers.update(cached.conditional_headers())
+    else:
+        cached = None
+    kwargs = {'timeout': timeout} if timeout is not None else {}
+
+    async def send() -> httpx.Response:
+        async with rate_limiter.for_url(url).request() as limiter:
+            response = await get_client().get(url, headers=headers, **kwargs)
+            limiter.observe(response)
+        _raise_transient_status(response)
+        return response
+
+    response = await _with_retries(url, send)
+    if cached is not None and response.status_code == 304:
+        return _revalidated(response, cached)
+    if profile == 'page':
+        await _store_page(url, response, response.content, True)
+    return response
+
+
+async def fetch_until_next_data(url: str) -> Tuple[httpx.Response, bytes, bool]:
+    """
+    Потоковая загрузка страницы, которая прекращается, как только пришел закрывающий
+    </script> блока __NEXT_DATA__ (остаток страницы не скачивается).
+    Возвращает (ответ, полученные байты, complete); complete=False - тело прочитано не до конца.
+    Ошибочный статус выбрасывает httpx.HTTPStatusError, как response.raise_for_status().
+    Страница из кэша (целиком или только начало) запрашивается условно, на 304 тело берется с диска.
+    Обрыв соединения посреди тела повторяется так же, как ошибка до ответа.
+    """
+    headers = headers_for(url, 'page')
+    cached = await _cached_page(url)
+    if cached is not None:
+        headers.update(cached.conditional_headers())
+
+    async def send() -> Tuple[httpx.Response, bytes, bool]:
+        buffer = bytearray()
+        marker_at = -1
+        complete = True
+        async with rate_limiter.for_url(url).request() as limiter:
+            async with get_client().stream('GET', url, headers=headers) as response:
+                limiter.observe(response)
+                if cached is not None and response.status_code == 304:
+                    return _revalidated(response, cached), cached.body, cached.complete
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    start = len(buffer)
+                    buffer += chunk
+                    if marker_at == -1:
+                        marker_at = buffer.find(NEXT_DATA_ID, max(0, start - len(NEXT_DATA_ID)))
+                    # Полный поиск границ - только когда после маркера пришел какой-то </script>
+                    if marker_at != -1 and buffer.find(SCRIPT_END, max(marker_at, start - len(SCRIPT_END))) != -1:
+                        if find_next_data(buffer) is not None:
+                            complete = False
+                            break
+                    if len(buffer) >= settings.poizon_max_page_bytes:
+                        logger.warning("Page %s exceeds %s bytes, truncating", url[:80], settings.poizon_max_page_bytes)
+                        complete = False
+                        break
+        body = bytes(buffer)
+        await _store_page(url, response, body, complete)
+        return response, body, complete
+
+    return await _with_retries(url, send)
+
+
+async def close_client() -> None:
+    """Закрыть клиент процесса (при завершении API или воркера)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    rate_limiter.reset()
+    circuit_breaker.reset()
@@ -1,20 +1,32 @@
+import logging
 import httpx
 from bs4 import BeautifulSoup
 import base64
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Union
 import re
+import hashlib
+import json
+import html as html_lib
 import asyncio
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from fake_useragent import UserAgent
 import time
+from app.utils.executors import run_selenium, run_cpu, SeleniumQueueFull
+from app.utils import poizon_client
+from app.utils.page_source import PageSource, orjson
+from app.utils import poizon_strategies, next_data_paths
+from app.utils.poizon_strategies import PageContext, strategy, run_chain
+from app.utils.circuit_breaker import HostUnavailable
+from app.config import settings
+from app.logging_config import log_context
+
+logger = logging.getLogger(__name__)
 
 def _create_selenium_driver():
     """Создает и настраивает Selenium WebDriver"""
+    # Selenium и fake_useragent импортируем только при первом использовании,
+    # чтобы процессы API не тянули их при старте
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from fake_useragent import UserAgent
     try:
         ua = UserAgent()
         options = Options()
@@ -32,16 +44,17 @@ def _create_selenium_driver():
         driver.set_page_load_timeout(30)
         return driver
     except Exception as e:
-        print(f"Error creating Selenium driver: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error creating Selenium driver: %s", e, exc_info=True)
         return None
 
 def _parse_sizes_prices_with_selenium(url: str) -> list:
     """Парсит размеры и цены используя Selenium (как в gitpars.py)"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
     driver = None
     try:
-        print(f"  🚀 Using Selenium to parse sizes and prices from {url}")
+        logger.debug("🚀 Using Selenium to parse sizes and prices from %s", url)
         driver = _create_selenium_driver()
         if not driver:
             return []
@@ -77,10 +90,10 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
         try:
             WebDriverWait(driver, 15).until(
                 EC.visibility_of_any_elements_located((By.CSS_SELECTOR, 'div.SkuPanel_value__BAJ1p, [class*="SkuPanel_value"], [class*="SkuPanel"]')))
-            print(f"    ✅ Found SkuPanel elements, waiting a bit more...")
+            logger.debug("✅ Found SkuPanel elements, waiting a bit more...")
             time.sleep(3)
         except:
-            print(f"    ⚠️ Size elements not found, trying alternative approach...")
+            logger.warning("⚠️ Size elements not found, trying alternative approach...")
             time.sleep(3)
         
         # Пробуем найти размеры и цены разными способами
@@ -88,7 +101,7 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
         try:
             size_buttons = driver.find_elements(By.CSS_SELECTOR, 'div.SkuPanel_tabItem__MuUkW')
             if size_buttons:
-                print(f"    Found {len(size_buttons)} size tab(s), parsing each tab...")
+                logger.debug("Found %s size tab(s), parsing each tab...", len(size_buttons))
                 
                 # Парсим каждую вкладку
                 for tab_idx, tab_button in enumerate(size_buttons):
@@ -121,20 +134,20 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                                         price_cents = int(price_num * 100)
                                         
                                         sizes_prices.append({'size': size, 'price': price_cents})
-                                        print(f"      ✅ Tab {tab_idx+1}: {size} -> {price_cents} копеек ({price_num} ₽)")
+                                        logger.debug("✅ Tab %s: %s -> %s копеек (%s ₽)", tab_idx + 1, size, price_cents, price_num)
                                     except Exception as e:
-                                        print(f"      ⚠️ Error parsing price '{price_text}' (cleaned: '{price_text_clean}') for size {size}: {e}")
+                                        logger.warning("⚠️ Error parsing price '%s' (cleaned: '%s') for size %s: %s", price_text, price_text_clean, size, e)
                     except Exception as e:
-                        print(f"      ⚠️ Error parsing tab {tab_idx+1}: {e}")
+                        logger.warning("⚠️ Error parsing tab %s: %s", tab_idx + 1, e)
                         continue
                 
                 if sizes_prices:
                     return sizes_prices
         except Exception as e:
-            print(f"    ⚠️ Error checking tabs: {e}")
+            logger.warning("⚠️ Error checking tabs: %s", e)
         
         # Способ 2: Пробуем найти все размеры и цены напрямую (универсальный подход)
-        print(f"    Trying universal approach - finding all size and price elements...")
+        logger.debug("Trying universal approach - finding all size and price elements...")
         try:
             # Пробуем разные селекторы для размеров
             size_selectors = [
@@ -158,26 +171,28 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
             for size_sel in size_selectors:
                 size_elements = driver.find_elements(By.CSS_SELECTOR, size_sel)
                 if size_elements:
-                    print(f"    Found {len(size_elements)} size elements with selector: {size_sel}")
+                    logger.debug("Found %s size elements with selector: %s", len(size_elements), size_sel)
                     # Выводим первые несколько размеров для отладки
-                    for i, elem in enumerate(size_elements[:3]):
-                        print(f"      Size {i+1}: {elem.get_attribute('textContent').strip()[:50]}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        for i, elem in enumerate(size_elements[:3]):
+                            logger.debug("Size %s: %s", i + 1, elem.get_attribute('textContent').strip()[:50])
                     break
             
             for price_sel in price_selectors:
                 price_elements = driver.find_elements(By.CSS_SELECTOR, price_sel)
                 if price_elements:
-                    print(f"    Found {len(price_elements)} price elements with selector: {price_sel}")
+                    logger.debug("Found %s price elements with selector: %s", len(price_elements), price_sel)
                     # Выводим первые несколько цен для отладки
-                    for i, elem in enumerate(price_elements[:3]):
-                        print(f"      Price {i+1}: {elem.get_attribute('textContent').strip()[:50]}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        for i, elem in enumerate(price_elements[:3]):
+                            logger.debug("Price %s: %s", i + 1, elem.get_attribute('textContent').strip()[:50])
                     break
             
             # Если нашли элементы, парсим попарно
             if size_elements and price_elements:
                 # Пробуем найти пары, даже если количество не совпадает
                 min_len = min(len(size_elements), len(price_elements))
-                print(f"    Processing {min_len} size-price pairs (sizes: {len(size_elements)}, prices: {len(price_elements)})...")
+                logger.debug("Processing %s size-price pairs (sizes: %s, prices: %s)...", min_len, len(size_elements), len(price_elements))
                 
                 for i in range(min_len):
                     try:
@@ -204,11 +219,11 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                                 price_cents = int(price_num * 100)
                                 
                                 sizes_prices.append({'size': size, 'price': price_cents})
-                                print(f"      ✅ {size} -> {price_cents} копеек ({price_num} ₽)")
+                                logger.debug("✅ %s -> %s копеек (%s ₽)", size, price_cents, price_num)
                             except Exception as e:
-                                print(f"      ⚠️ Error parsing price '{price_text}' (cleaned: '{price_text_clean}') for size {size}: {e}")
+                                logger.warning("⚠️ Error parsing price '%s' (cleaned: '%s') for size %s: %s", price_text, price_text_clean, size, e)
                     except Exception as e:
-                        print(f"      ⚠️ Error processing element {i}: {e}")
+                        logger.warning("⚠️ Error processing element %s: %s", i, e)
                         continue
                 
                 if sizes_prices:
@@ -216,14 +231,14 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
             
             # Если не нашли пары, пробуем найти в контейнерах или родительских элементах
             if not sizes_prices:
-                print(f"    Trying container-based approach...")
+                logger.debug("Trying container-based approach...")
                 # Ищем все элементы с классами, содержащими "SkuPanel"
                 all_sku_elements = driver.find_elements(By.CSS_SELECTOR, '[class*="SkuPanel"]')
-                print(f"    Found {len(all_sku_elements)} elements with SkuPanel class")
+                logger.debug("Found %s elements with SkuPanel class", len(all_sku_elements))
                 
                 # Ищем контейнеры с размерами и ценами
                 containers = driver.find_elements(By.CSS_SELECTOR, '[class*="SkuPanel"][class*="group"], div[class*="size"][class*="item"], div[class*="SkuPanel"]')
-                print(f"    Found {len(containers)} potential containers")
+                logger.debug("Found %s potential containers", len(containers))
                 
                 for container in containers:
                     try:
@@ -257,19 +272,17 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                                     price_num = float(price_text_clean)
                                     price_cents = int(price_num * 100)
                                     sizes_prices.append({'size': size, 'price': price_cents})
-                                    print(f"      ✅ Container: {size} -> {price_cents} копеек ({price_num} ₽)")
+                                    logger.debug("✅ Container: %s -> %s копеек (%s ₽)", size, price_cents, price_num)
                                 except Exception as e:
-                                    print(f"      ⚠️ Error parsing container price '{price_text}': {e}")
+                                    logger.warning("⚠️ Error parsing container price '%s': %s", price_text, e)
                     except Exception as e:
                         continue
         except Exception as e:
-            print(f"    ⚠️ Error in universal approach: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("⚠️ Error in universal approach: %s", e, exc_info=True)
         
         # Способ 3: Стандартный подход с проверкой количества меню (как в gitpars.py)
         if not sizes_prices:
-            print(f"    Trying standard approach with menu count check...")
+            logger.debug("Trying standard approach with menu count check...")
             try:
                 # Увеличиваем время ожидания и прокручиваем страницу
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight/3);")
@@ -280,7 +293,7 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                     check_count_menu = WebDriverWait(driver, 10).until(
                         EC.visibility_of_all_elements_located((By.CSS_SELECTOR, 'div.SkuPanel_label__Vbp8t>span:nth-child(1)')))
                     menu_count = len(check_count_menu)
-                    print(f"    ✅ Found {menu_count} menu(s) using WebDriverWait")
+                    logger.debug("✅ Found %s menu(s) using WebDriverWait", menu_count)
                 except:
                     # Если не нашли с WebDriverWait, пробуем обычный поиск
                     check_count_menu = driver.find_elements(By.CSS_SELECTOR, 'div.SkuPanel_label__Vbp8t>span:nth-child(1)')
@@ -289,7 +302,7 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                     if not check_count_menu:
                         check_count_menu = driver.find_elements(By.CSS_SELECTOR, '[class*="SkuPanel"] [class*="label"]')
                     menu_count = len(check_count_menu)
-                    print(f"    Found {menu_count} menu(s) using fallback search")
+                    logger.debug("Found %s menu(s) using fallback search", menu_count)
                 
                 if menu_count == 1 or menu_count == 0:
                     # Одно меню или не нашли меню: размеры и цены в nth-child(1)
@@ -299,7 +312,7 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                             EC.visibility_of_all_elements_located((By.CSS_SELECTOR, 'div.SkuPanel_group__egmoX:nth-child(1) div.SkuPanel_value__BAJ1p')))
                         price_elements = WebDriverWait(driver, 10).until(
                             EC.visibility_of_all_elements_located((By.CSS_SELECTOR, 'div.SkuPanel_group__egmoX:nth-child(1) div.SkuPanel_price__KCs7G')))
-                        print(f"    ✅ Found {len(size_elements)} size elements and {len(price_elements)} price elements using WebDriverWait")
+                        logger.debug("✅ Found %s size elements and %s price elements using WebDriverWait", len(size_elements), len(price_elements))
                     except:
                         # Если не нашли с WebDriverWait, пробуем обычный поиск
                         size_elements = driver.find_elements(By.CSS_SELECTOR, 'div.SkuPanel_group__egmoX:nth-child(1) div.SkuPanel_value__BAJ1p')
@@ -311,13 +324,13 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                         if not price_elements:
                             price_elements = driver.find_elements(By.CSS_SELECTOR, '[class*="SkuPanel_group"] [class*="SkuPanel_price"], [class*="SkuPanel_price"]')
                         
-                        print(f"    Found {len(size_elements)} size elements, {len(price_elements)} price elements")
+                        logger.debug("Found %s size elements, %s price elements", len(size_elements), len(price_elements))
                     
                     # Если все еще не нашли, пробуем найти все элементы с размерами и ценами
                     if not size_elements or not price_elements:
                         # Ищем все элементы, которые могут содержать размеры
                         all_elements = driver.find_elements(By.CSS_SELECTOR, '[class*="SkuPanel"]')
-                        print(f"    Found {len(all_elements)} total SkuPanel elements, trying to extract sizes and prices...")
+                        logger.debug("Found %s total SkuPanel elements, trying to extract sizes and prices...", len(all_elements))
                         
                         # Пробуем найти размеры и цены в любых элементах
                         for elem in all_elements:
@@ -335,7 +348,7 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                                         price_num = float(price_text)
                                         price_cents = int(price_num * 100)
                                         sizes_prices.append({'size': size, 'price': price_cents})
-                                        print(f"      ✅ Extracted: {size} -> {price_cents} копеек ({price_num} ₽)")
+                                        logger.debug("✅ Extracted: %s -> %s копеек (%s ₽)", size, price_cents, price_num)
                                     except:
                                         pass
                             except:
@@ -358,11 +371,11 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                                         price_num = float(price_text_clean)
                                         price_cents = int(price_num * 100)
                                         sizes_prices.append({'size': size, 'price': price_cents})
-                                        print(f"      ✅ {size} -> {price_cents} копеек ({price_num} ₽)")
+                                        logger.debug("✅ %s -> %s копеек (%s ₽)", size, price_cents, price_num)
                                     except Exception as e:
-                                        print(f"      ⚠️ Error parsing {size} -> {price_text} (cleaned: '{price_text_clean}'): {e}")
+                                        logger.warning("⚠️ Error parsing %s -> %s (cleaned: '%s'): %s", size, price_text, price_text_clean, e)
                             except Exception as e:
-                                print(f"      ⚠️ Error processing size-price pair: {e}")
+                                logger.warning("⚠️ Error processing size-price pair: %s", e)
                                 continue
                 elif menu_count == 2:
                     # Два меню (цвет): размеры и цены в nth-child(2)
@@ -391,20 +404,18 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                                             price_num = float(price_text_clean)
                                             price_cents = int(price_num * 100)
                                             sizes_prices.append({'size': size, 'price': price_cents})
-                                            print(f"      ✅ {size} -> {price_cents} копеек ({price_num} ₽)")
+                                            logger.debug("✅ %s -> %s копеек (%s ₽)", size, price_cents, price_num)
                                         except Exception as e:
-                                            print(f"      ⚠️ Error parsing {size} -> {price_text}: {e}")
+                                            logger.warning("⚠️ Error parsing %s -> %s: %s", size, price_text, e)
                                             pass
                         except:
                             continue
             except Exception as e:
-                print(f"    ⚠️ Error in standard approach: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.warning("⚠️ Error in standard approach: %s", e, exc_info=True)
         
         # Если не нашли размеры и цены обычными способами, пробуем через JavaScript
         if not sizes_prices:
-            print(f"    Trying JavaScript-based approach...")
+            logger.debug("Trying JavaScript-based approach...")
             try:
                 # Используем JavaScript для поиска элементов на странице - более агрессивный подход
                 js_code = """
@@ -531,11 +542,11 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                                     price_num = float(price_text_clean)
                                     price_cents = int(price_num * 100)
                                     sizes_prices.append({'size': size, 'price': price_cents})
-                                    print(f"      ✅ JS Pair: {size} -> {price_cents} копеек ({price_num} ₽)")
+                                    logger.debug("✅ JS Pair: %s -> %s копеек (%s ₽)", size, price_cents, price_num)
                                 except Exception as e:
-                                    print(f"      ⚠️ Error parsing JS pair price '{price_text}': {e}")
+                                    logger.warning("⚠️ Error parsing JS pair price '%s': %s", price_text, e)
                         except Exception as e:
-                            print(f"      ⚠️ Error processing JS pair: {e}")
+                            logger.warning("⚠️ Error processing JS pair: %s", e)
                             continue
                 
                 # Если не нашли пары, пробуем сопоставить размеры и цены по индексу
@@ -543,7 +554,7 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                     js_sizes = result.get('sizes', [])
                     js_prices = result.get('prices', [])
                     
-                    print(f"    JavaScript found {len(js_sizes)} sizes and {len(js_prices)} prices")
+                    logger.debug("JavaScript found %s sizes and %s prices", len(js_sizes), len(js_prices))
                     
                     if js_sizes and js_prices:
                         min_len = min(len(js_sizes), len(js_prices))
@@ -566,24 +577,20 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
                                         price_num = float(price_text_clean)
                                         price_cents = int(price_num * 100)
                                         sizes_prices.append({'size': size, 'price': price_cents})
-                                        print(f"      ✅ JS: {size} -> {price_cents} копеек ({price_num} ₽)")
+                                        logger.debug("✅ JS: %s -> %s копеек (%s ₽)", size, price_cents, price_num)
                                     except Exception as e:
-                                        print(f"      ⚠️ Error parsing JS price '{price_text}': {e}")
+                                        logger.warning("⚠️ Error parsing JS price '%s': %s", price_text, e)
                             except Exception as e:
-                                print(f"      ⚠️ Error processing JS element {i}: {e}")
+                                logger.warning("⚠️ Error processing JS element %s: %s", i, e)
                                 continue
             except Exception as e:
-                print(f"    ⚠️ Error in JavaScript approach: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.warning("⚠️ Error in JavaScript approach: %s", e, exc_info=True)
         
-        print(f"  ✅ Selenium found {len(sizes_prices)} size-price pairs")
+        logger.debug("✅ Selenium found %s size-price pairs", len(sizes_prices))
         return sizes_prices
         
     except Exception as e:
-        print(f"  ❌ Error using Selenium: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("❌ Error using Selenium: %s", e, exc_info=True)
         return []
     finally:
         if driver:
@@ -592,119 +599,171 @@ def _parse_sizes_prices_with_selenium(url: str) -> list:
             except:
                 pass
 
-def _extract_sizes_prices_from_html(soup: BeautifulSoup, html_text: str, response_text: str = None) -> list:
-    """Агрессивно извлекает размеры и цены из HTML-текста через регулярные выражения"""
-    sizes_prices = []
-    try:
-        # Получаем весь текст страницы
-        page_text = soup.get_text() if soup else html_text
-        
-        # Также пробуем искать в исходном HTML (может содержать больше информации)
-        html_text_to_search = response_text if response_text else html_text
-        
-        # Паттерн для поиска пар "размер (eu) цена ₽" или "размер цена ₽"
-        # Примеры: "34,5 (35,5) 17 830 ₽", "41,5 (42,5) 8 412 ₽", "36 4 543 P", "40 4 531 P"
-        patterns = [
-            # Паттерн 1: размер с EU в скобках, затем цена с пробелами
-            re.compile(r'(\d+[,.]?\d*)\s*\(\d+[,.]?\d*\)\s*(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE),
-            # Паттерн 2: просто размер, затем цена с пробелами (формат "36 4 543 P")
-            re.compile(r'(\d+[,.]?\d*)\s+(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE),
-            # Паттерн 3: размер и цена без пробелов в цене (формат "36 4543 ₽")
-            re.compile(r'(\d+[,.]?\d*)\s+(\d{4,6})\s*[₽РP]', re.IGNORECASE),
-            # Паттерн 4: размер и цена в формате "36: 4 543 ₽" или "36 - 4 543 ₽"
-            re.compile(r'(\d+[,.]?\d*)\s*[:-]\s*(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE),
-            # Паттерн 5: размер и цена в формате "36\n4 543 ₽" (на разных строках)
-            re.compile(r'(\d+[,.]?\d*)\s*\n\s*(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE | re.MULTILINE),
-        ]
-        
-        # Пробуем искать в HTML-тексте тоже (может содержать больше информации)
-        texts_to_search = [page_text]
-        if html_text_to_search and html_text_to_search != page_text:
-            texts_to_search.append(html_text_to_search)
-        
-        found_pairs = {}
-        
-        for pattern in patterns:
-            for text in texts_to_search:
-                matches = pattern.finditer(text)
-                for match in matches:
-                    try:
-                        size_text = match.group(1).strip()
-                        price_text = match.group(2).strip()
-                        
-                        # Нормализуем размер (заменяем точку на запятую)
-                        size = size_text.replace('.', ',')
-                        
-                        # Очищаем цену от пробелов
-                        price_clean = price_text.replace(' ', '').replace(',', '').replace('\xa0', '')
-                        
-                        # Проверяем, что размер в разумном диапазоне (для обуви)
-                        try:
-                            size_num = float(size.replace(',', '.'))
-                            if size_num < 15 or size_num > 60:  # Неразумный размер для обуви
-                                continue
-                        except:
-                            continue
-                        
-                        # Парсим цену
-                        try:
-                            price_num = float(price_clean)
-                            if price_num < 100 or price_num > 100000:  # Неразумная цена
-                                continue
-                            
-                            price_cents = int(price_num * 100)
-                            
-                            # Сохраняем пару, если еще не было такого размера или цена другая
-                            if size not in found_pairs or found_pairs[size]['price'] != price_cents:
-                                found_pairs[size] = {
-                                    'size': size,
-                                    'price': price_cents
-                                }
-                        except Exception as e:
-                            continue
-                    except Exception as e:
-                        continue
-        
-        # Преобразуем в список
-        sizes_prices = list(found_pairs.values())
-        
-        if sizes_prices:
-            print(f"    ✅ Found {len(sizes_prices)} size-price pairs in HTML text")
-            for item in sizes_prices[:5]:  # Показываем первые 5
-                print(f"      {item['size']} -> {item['price']} копеек ({item['price']/100} ₽)")
-        
-    except Exception as e:
-        print(f"    ⚠️ Error extracting sizes/prices from HTML: {e}")
-        import traceback
-        traceback.print_exc()
+# Пары "размер [(EU)] цена ₽", например "34,5 (35,5) 17 830 ₽", "36 4 543 P", "36: 4 543 ₽".
+# Порядок шаблонов - часть результата: каждый шаблон делит текст на совпадения по-своему,
+# а при повторе размера побеждает совпадение более позднего шаблона
+_SIZE_PRICE_PATTERNS = (
+    # Размер с EU в скобках, затем цена с пробелами
+    re.compile(r'(\d+[,.]?\d*)\s*\(\d+[,.]?\d*\)\s*(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE),
+    # Размер, затем цена с пробелами ("36 4 543 P")
+    re.compile(r'(\d+[,.]?\d*)\s+(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE),
+    # Цена без пробелов ("36 4543 ₽")
+    re.compile(r'(\d+[,.]?\d*)\s+(\d{4,6})\s*[₽РP]', re.IGNORECASE),
+    # Через двоеточие или дефис ("36: 4 543 ₽", "36 - 4 543 ₽")
+    re.compile(r'(\d+[,.]?\d*)\s*[:-]\s*(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE),
+    # На разных строках ("36\n4 543 ₽")
+    re.compile(r'(\d+[,.]?\d*)\s*\n\s*(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE),
+)
+# Совпадение любого шаблона состоит только из цифр, пробельных символов, ",.():-" и знака
+# валюты и оканчивается на "цифра [пробелы] валюта". Шаблоны запускаются только по отрезкам
+# из таких символов вокруг этих окончаний - результат тот же, что по всему тексту
+_SIZE_PRICE_ANCHOR_RE = re.compile(r'\d\s*[₽РP]', re.IGNORECASE)
+_SIZE_PRICE_RUN_RE = re.compile(r'[\d\s,.():\-₽РP]+', re.IGNORECASE)
+_SIZE_PRICE_RUN_CHAR_RE = re.compile(r'[\d\s,.():\-₽РP]', re.IGNORECASE)
+# Разметка, которой нет в soup.get_text(): комментарии, содержимое script/style/template,
+# <!DOCTYPE>, <?...?>, <![CDATA[...]]> и сами теги. Тег начинается с "<" и буквы (или "</"
+# и буквы), как в HTML-токенизаторе: "1 < 2" в тексте остается текстом; значения атрибутов
+# в кавычках могут содержать ">"
+_TAG_BODY = r'''(?:[^>"']|"[^"]*"|'[^']*')*>'''
+_NON_TEXT_MARKUP_RE = re.compile(
+    r'<!--.*?(?:-->|\Z)'
+    r'|<(script|style|template)\b' + _TAG_BODY + r'.*?(?:</\1\s*>|\Z)'
+    r'|<[!?][^>]*>'
+    r'|</?[a-z][^\s/>]*' + _TAG_BODY,
+    re.IGNORECASE | re.DOTALL
+)
+
+# Ограничения входа: сверх этого на странице только скрипты и разметка, новых пар там нет
+MAX_SIZE_PRICE_SCAN_CHARS = 2_000_000
+MAX_SIZE_PRICE_PAIRS = 200
+
+
+def _size_price_candidates(text: str) -> str:
+    """Отрезки text, в которых возможны пары размер/цена, через \\x00 (его нет ни в одном шаблоне)"""
+    runs = []
+    run_end = 0
+    for anchor in _SIZE_PRICE_ANCHOR_RE.finditer(text):
+        if anchor.start() < run_end:
+            continue
+        start = anchor.start()
+        while start > run_end and _SIZE_PRICE_RUN_CHAR_RE.match(text, start - 1):
+            start -= 1
+        run_end = _SIZE_PRICE_RUN_RE.match(text, anchor.start()).end()
+        runs.append(text[start:run_end])
+    return '\x00'.join(runs)
+
+
+def _html_page_text(html_text: str) -> str:
+    """Текст страницы, как soup.get_text(), без построения DOM"""
+    return html_lib.unescape(_NON_TEXT_MARKUP_RE.sub('', html_text))
+
+
+def _extract_sizes_prices_from_html(html_text: str, page_text: Optional[str] = None) -> list:
+    """
+    Агрессивно извлекает размеры и цены из HTML регулярными выражениями
+    по тексту страницы и по исходному HTML. page_text (текст без разметки) по умолчанию
+    получается без построения DOM, см. _html_page_text.
+    """
+    html_text = html_text[:MAX_SIZE_PRICE_SCAN_CHARS]
+    if page_text is None:
+        page_text = _html_page_text(html_text)
+    page_text = page_text[:MAX_SIZE_PRICE_SCAN_CHARS]
+    texts_to_search = [_size_price_candidates(page_text)]
+    if html_text != page_text:
+        texts_to_search.append(_size_price_candidates(html_text))
+    
+    # Размер -> цена в копейках; при повторе размера побеждает последнее совпадение
+    # (шаблоны по порядку, в каждом - текст страницы, затем HTML)
+    found_pairs: Dict[str, int] = {}
+    for pattern in _SIZE_PRICE_PATTERNS:
+        for text in texts_to_search:
+            for match in pattern.finditer(text):
+                size = match.group(1).replace('.', ',')
+                # Проверяем, что размер в разумном диапазоне (для обуви)
+                try:
+                    size_num = float(size.replace(',', '.'))
+                except ValueError:
+                    continue
+                if size_num < 15 or size_num > 60:
+                    continue
+                
+                # Из цены убираются только пробелы и запятые: цена, разорванная переводом
+                # строки или табуляцией, не разбирается и отбрасывается
+                try:
+                    price_num = float(match.group(2).replace(' ', '').replace(',', '').replace('\xa0', ''))
+                except ValueError:
+                    continue
+                if price_num < 100 or price_num > 100000:
+                    continue
+                
+                if size not in found_pairs and len(found_pairs) >= MAX_SIZE_PRICE_PAIRS:
+                    continue
+                found_pairs[size] = int(price_num * 100)
     
+    sizes_prices = [{'size': size, 'price': price} for size, price in found_pairs.items()]
+    if sizes_prices:
+        logger.debug("✅ Found %s size-price pairs in HTML text", len(sizes_prices))
+        for item in sizes_prices[:5]:  # Показываем первые 5
+            logger.debug("%s -> %s копеек (%s ₽)", item['size'], item['price'], item['price'] / 100)
     return sizes_prices
 
 
-async def download_image_to_base64(url: str, client: httpx.AsyncClient) -> Optional[str]:
-    """Скачивает изображение и конвертирует в base64"""
+async def download_image_to_base64(url: str) -> Optional[str]:
+    """Скачивает изображение через общий клиент и конвертирует в base64"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Referer': 'https://thepoizon.ru/'
-        }
-        response = await client.get(url, headers=headers, timeout=10.0)
+        response = await poizon_client.fetch(url, profile='image', timeout=10.0)
         if response.status_code == 200:
             img_base64 = base64.b64encode(response.content).decode('utf-8')
             # Определяем тип изображения
             content_type = response.headers.get('content-type', 'image/jpeg')
             return f"data:{content_type};base64,{img_base64}"
     except Exception as e:
-        print(f"Error downloading image {url}: {e}")
+        logger.warning("Error downloading image %s: %s", url, e)
     return None
 
+
+# Общий для процесса лимит одновременных скачиваний изображений (создается в event loop)
+_image_slots: Optional[asyncio.Semaphore] = None
+
+
+async def download_images(image_urls: List[str]) -> List[str]:
+    """
+    Скачивает изображения параллельно (с лимитами на товар и на процесс) и с таймаутом
+    на каждое. Порядок сохраняется, неудачные пропускаются.
+    """
+    global _image_slots
+    if _image_slots is None:
+        _image_slots = asyncio.Semaphore(settings.image_download_global_concurrency)
+    product_slots = asyncio.Semaphore(settings.image_download_concurrency)
+    
+    async def download(idx: int, img_url: str) -> Optional[str]:
+        async with product_slots, _image_slots:
+            try:
+                img_base64 = await asyncio.wait_for(
+                    download_image_to_base64(img_url),
+                    timeout=settings.image_download_timeout
+                )
+            except asyncio.TimeoutError:
+                logger.debug("Image %s timed out after %.0fs: %.80s...", idx, settings.image_download_timeout, img_url)
+                return None
+        if not img_base64:
+            logger.debug("Failed to download image %s", idx)
+        return img_base64
+    
+    results = await asyncio.gather(*(download(idx, img_url) for idx, img_url in enumerate(image_urls, 1)))
+    return [img for img in results if img]
+
+
 def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
     """
     Парсит гайд размеров через Selenium (открывает модальное окно и извлекает таблицу)
     Возвращает словарь с колонками: EU, RU, UK, US_Женские, US_Мужские
     """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
     try:
-        print(f"  📏 Trying to parse size guide...")
+        logger.debug("📏 Trying to parse size guide...")
         
         # Ищем кнопку "Гайд размера" или "Гайд по размерам"
         size_guide_selectors = [
@@ -727,19 +786,19 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                     elements = driver.find_elements(By.XPATH, xpath)
                     if elements:
                         size_guide_button = elements[0]
-                        print(f"    ✅ Found size guide button via XPath: {text}")
+                        logger.debug("✅ Found size guide button via XPath: %s", text)
                         break
                 else:
                     elements = driver.find_elements(By.CSS_SELECTOR, selector)
                     if elements:
                         size_guide_button = elements[0]
-                        print(f"    ✅ Found size guide button via CSS: {selector}")
+                        logger.debug("✅ Found size guide button via CSS: %s", selector)
                         break
             except:
                 continue
         
         if not size_guide_button:
-            print(f"    ⚠️ Size guide button not found")
+            logger.warning("⚠️ Size guide button not found")
             return None
         
         # Прокручиваем к кнопке и кликаем
@@ -755,7 +814,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
             if tag_name == 'a' and href:
                 # Если это ссылка, переходим по ней
                 is_link = True
-                print(f"    ℹ️ Size guide button is a link, navigating to: {href}")
+                logger.debug("ℹ️ Size guide button is a link, navigating to: %s", href)
                 driver.get(href)
                 time.sleep(5)  # Ждем загрузки страницы
                 # Теперь ищем таблицу на этой странице
@@ -766,10 +825,10 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                 except:
                     # Если не получилось, используем JavaScript
                     driver.execute_script("arguments[0].click();", size_guide_button)
-                print(f"    ✅ Clicked size guide button")
+                logger.debug("✅ Clicked size guide button")
                 time.sleep(5)  # Увеличиваем время ожидания после клика
         except Exception as e:
-            print(f"    ⚠️ Error clicking size guide button: {e}")
+            logger.warning("⚠️ Error clicking size guide button: %s", e)
             return None
         
         # Сначала ждем появления модального окна (любого) - увеличиваем время ожидания
@@ -795,7 +854,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                         WebDriverWait(driver, 12).until(
                             EC.presence_of_element_located((by, selector))
                         )
-                        print(f"    ✅ Modal window appeared (found via: {selector})")
+                        logger.debug("✅ Modal window appeared (found via: %s)", selector)
                         modal_appeared = True
                         time.sleep(4)  # Увеличиваем время на полную загрузку контента
                         break
@@ -803,7 +862,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                         continue
                 
                 if not modal_appeared:
-                    print(f"    ⚠️ Modal window not found after waiting, but continuing to search for table...")
+                    logger.warning("⚠️ Modal window not found after waiting, but continuing to search for table...")
                     # Пробуем еще раз с большим временем ожидания
                     try:
                         # Пробуем найти модальное окно через JavaScript
@@ -814,17 +873,17 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                                    document.querySelector('[class*="Modal"]') !== null;
                         """)
                         if modal_exists:
-                            print(f"    ✅ Modal window found via JavaScript")
+                            logger.debug("✅ Modal window found via JavaScript")
                             modal_appeared = True
                             time.sleep(4)
                     except:
                         pass
                     time.sleep(4)  # Даем еще немного времени
             except Exception as e:
-                print(f"    ⚠️ Error waiting for modal: {e}")
+                logger.warning("⚠️ Error waiting for modal: %s", e)
                 time.sleep(3)
         else:
-            print(f"    ℹ️ Navigated to size guide page, searching for table directly...")
+            logger.debug("ℹ️ Navigated to size guide page, searching for table directly...")
             time.sleep(3)  # Ждем загрузки страницы
         
         # Ждем появления модального окна с таблицей (пробуем разные селекторы)
@@ -849,7 +908,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                 WebDriverWait(driver, 5).until(
                     EC.presence_of_element_located((By.CSS_SELECTOR, selector))
                 )
-                print(f"    ✅ Size guide modal opened (found via: {selector})")
+                logger.debug("✅ Size guide modal opened (found via: %s)", selector)
                 modal_found = True
                 time.sleep(1)
                 break
@@ -857,28 +916,28 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                 continue
         
         if not modal_found:
-            print(f"    ⚠️ Size guide modal not found after trying {len(modal_selectors)} selectors")
+            logger.warning("⚠️ Size guide modal not found after trying %s selectors", len(modal_selectors))
             # Пробуем найти любую таблицу на странице
             try:
                 all_tables = driver.find_elements(By.CSS_SELECTOR, 'table')
                 if all_tables:
-                    print(f"    ℹ️ Found {len(all_tables)} table(s) on page, checking for size guide content...")
+                    logger.debug("ℹ️ Found %s table(s) on page, checking for size guide content...", len(all_tables))
                     # Проверяем, есть ли в таблицах ключевые слова размеров
                     for table in all_tables:
                         table_text = table.get_attribute('textContent') or ''
                         if any(keyword in table_text for keyword in ['EU', 'RU', 'UK', 'US', 'Женские', 'Мужские', 'JP', 'KR']):
-                            print(f"    ✅ Found size guide table with keywords")
+                            logger.debug("✅ Found size guide table with keywords")
                             modal_found = True
                             break
                     if not modal_found:
-                        print(f"    ℹ️ Using first table as fallback")
+                        logger.debug("ℹ️ Using first table as fallback")
                         modal_found = True
                 else:
                     # Пробуем найти таблицу внутри модального окна через XPath
                     try:
                         tables_in_modal = driver.find_elements(By.XPATH, '//div[contains(@class, "modal")]//table | //div[contains(@class, "Modal")]//table | //div[contains(@class, "ant-modal")]//table')
                         if tables_in_modal:
-                            print(f"    ℹ️ Found {len(tables_in_modal)} table(s) in modal via XPath")
+                            logger.debug("ℹ️ Found %s table(s) in modal via XPath", len(tables_in_modal))
                             modal_found = True
                     except:
                         pass
@@ -888,7 +947,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                         try:
                             all_tables_xpath = driver.find_elements(By.XPATH, '//table')
                             if all_tables_xpath:
-                                print(f"    ℹ️ Found {len(all_tables_xpath)} table(s) via XPath, using first one")
+                                logger.debug("ℹ️ Found %s table(s) via XPath, using first one", len(all_tables_xpath))
                                 modal_found = True
                         except:
                             pass
@@ -896,7 +955,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                         if not modal_found:
                             return None
             except Exception as e:
-                print(f"    ⚠️ Error searching for tables: {e}")
+                logger.warning("⚠️ Error searching for tables: %s", e)
                 return None
         
         # Даем дополнительное время на загрузку контента внутри модального окна
@@ -917,11 +976,11 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                 driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight;", modal_elem)
                 time.sleep(2)
         except Exception as e:
-            print(f"    ⚠️ Error scrolling modal: {e}")
+            logger.warning("⚠️ Error scrolling modal: %s", e)
         
         # Пробуем найти таблицу через JavaScript
         try:
-            print(f"    ℹ️ Trying to find table via JavaScript...")
+            logger.debug("ℹ️ Trying to find table via JavaScript...")
             table_found_js = driver.execute_script("""
                 // Ищем все таблицы в модальном окне
                 var modal = document.querySelector('.ant-modal') || document.querySelector('[class*="modal"]');
@@ -943,7 +1002,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                 return null;
             """)
             if table_found_js:
-                print(f"    ✅ Found table via JavaScript!")
+                logger.debug("✅ Found table via JavaScript!")
                 # Парсим HTML таблицы напрямую через BeautifulSoup
                 from bs4 import BeautifulSoup
                 js_soup = BeautifulSoup(table_found_js, 'html.parser')
@@ -994,15 +1053,13 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                                         rows_data.append(row_data)
                         
                         if headers and rows_data:
-                            print(f"    ✅ Parsed {len(rows_data)} rows from JavaScript table")
+                            logger.debug("✅ Parsed %s rows from JavaScript table", len(rows_data))
                             return {
                                 'headers': headers,
                                 'rows': rows_data
                             }
                     except Exception as e:
-                        print(f"    ⚠️ Error parsing JavaScript table HTML: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        logger.warning("⚠️ Error parsing JavaScript table HTML: %s", e, exc_info=True)
                 
                 # Если не получилось распарсить HTML, пробуем найти через Selenium
                 tables = driver.find_elements(By.XPATH, '//table')
@@ -1011,14 +1068,12 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                         t_text = t.get_attribute('textContent') or ''
                         if any(keyword in t_text for keyword in ['EU', 'RU', 'UK', 'US', 'Женские', 'Мужские', 'JP', 'KR']):
                             table = t
-                            print(f"    ✅ Matched table found via JavaScript + Selenium")
+                            logger.debug("✅ Matched table found via JavaScript + Selenium")
                             break
                     except:
                         continue
         except Exception as e:
-            print(f"    ⚠️ Error finding table via JavaScript: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("⚠️ Error finding table via JavaScript: %s", e, exc_info=True)
         
         # Ищем таблицу с размерами (используем все найденные таблицы, если модальное окно не найдено)
         table_selectors = [
@@ -1051,7 +1106,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                 
                 tables = driver.find_elements(By.CSS_SELECTOR, selector)
                 if tables:
-                    print(f"    ℹ️ Found {len(tables)} table(s) via: {selector}")
+                    logger.debug("ℹ️ Found %s table(s) via: %s", len(tables), selector)
                     # Если найдено несколько таблиц, берем ту, которая содержит заголовки размеров
                     for t in tables:
                         try:
@@ -1059,43 +1114,43 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                             # Проверяем наличие ключевых слов размеров
                             if any(keyword in table_text for keyword in ['EU', 'RU', 'UK', 'US', 'Женские', 'Мужские', 'JP', 'KR', 'Соответствие', 'стопе', 'длине']):
                                 table = t
-                                print(f"    ✅ Found size guide table via: {selector} (contains size keywords)")
+                                logger.debug("✅ Found size guide table via: %s (contains size keywords)", selector)
                                 break
                         except:
                             continue
                     if not table:
                         # Если не нашли по ключевым словам, берем первую таблицу
                         table = tables[0]
-                        print(f"    ✅ Found size guide table via: {selector} (using first table)")
+                        logger.debug("✅ Found size guide table via: %s (using first table)", selector)
                     break
             except Exception as e:
-                print(f"    ⚠️ Error with selector {selector}: {e}")
+                logger.warning("⚠️ Error with selector %s: %s", selector, e)
                 continue
         
         # Если не нашли через CSS селекторы, пробуем XPath
         if not table:
             try:
-                print(f"    ℹ️ Trying XPath search for table...")
+                logger.debug("ℹ️ Trying XPath search for table...")
                 # Ищем таблицу внутри модального окна
                 tables_xpath = driver.find_elements(By.XPATH, '//div[contains(@class, "ant-modal")]//table | //div[contains(@class, "modal")]//table | //table')
                 if tables_xpath:
-                    print(f"    ℹ️ Found {len(tables_xpath)} table(s) via XPath")
+                    logger.debug("ℹ️ Found %s table(s) via XPath", len(tables_xpath))
                     for t in tables_xpath:
                         table_text = t.get_attribute('textContent') or ''
                         if any(keyword in table_text for keyword in ['EU', 'RU', 'UK', 'US', 'Женские', 'Мужские', 'JP', 'KR', 'Соответствие', 'стопе']):
                             table = t
-                            print(f"    ✅ Found size guide table via XPath (contains size keywords)")
+                            logger.debug("✅ Found size guide table via XPath (contains size keywords)")
                             break
                     if not table:
                         table = tables_xpath[0]
-                        print(f"    ✅ Found size guide table via XPath (using first table)")
+                        logger.debug("✅ Found size guide table via XPath (using first table)")
             except Exception as e:
-                print(f"    ⚠️ Error finding table via XPath: {e}")
+                logger.warning("⚠️ Error finding table via XPath: %s", e)
         
         # Если все еще не нашли, пробуем найти через поиск по тексту
         if not table:
             try:
-                print(f"    ℹ️ Trying text-based search for table...")
+                logger.debug("ℹ️ Trying text-based search for table...")
                 # Ищем элемент, содержащий текст "EU" или "RU"
                 elements_with_eu = driver.find_elements(By.XPATH, '//*[contains(text(), "EU") or contains(text(), "RU")]')
                 if elements_with_eu:
@@ -1106,26 +1161,26 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                             parent_table = elem.find_element(By.XPATH, './ancestor::table')
                             if parent_table:
                                 table = parent_table
-                                print(f"    ✅ Found size guide table via text search")
+                                logger.debug("✅ Found size guide table via text search")
                                 break
                         except:
                             continue
             except Exception as e:
-                print(f"    ⚠️ Error in text-based search: {e}")
+                logger.warning("⚠️ Error in text-based search: %s", e)
         
         if not table:
-            print(f"    ⚠️ Size guide table not found")
+            logger.warning("⚠️ Size guide table not found")
             # Попробуем сделать скриншот для отладки
             try:
                 driver.save_screenshot('/tmp/size_guide_debug.png')
-                print(f"    ℹ️ Saved debug screenshot to /tmp/size_guide_debug.png")
+                logger.debug("ℹ️ Saved debug screenshot to /tmp/size_guide_debug.png")
             except:
                 pass
             return None
         
         # Парсим таблицу
         try:
-            print(f"    📋 Starting to parse table...")
+            logger.debug("📋 Starting to parse table...")
             
             # Получаем заголовки - пробуем разные способы
             headers = []
@@ -1138,7 +1193,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                         text = header.get_attribute('textContent').strip()
                         if text:
                             headers.append(text)
-                    print(f"    📋 Found headers via thead: {headers}")
+                    logger.debug("📋 Found headers via thead: %s", headers)
             except:
                 pass
             
@@ -1151,7 +1206,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                             text = header.get_attribute('textContent').strip()
                             if text:
                                 headers.append(text)
-                        print(f"    📋 Found headers via first row: {headers}")
+                        logger.debug("📋 Found headers via first row: %s", headers)
                 except:
                     pass
             
@@ -1164,7 +1219,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                             text = header.get_attribute('textContent').strip()
                             if text and text not in headers:
                                 headers.append(text)
-                        print(f"    📋 Found headers via XPath: {headers}")
+                        logger.debug("📋 Found headers via XPath: %s", headers)
                 except:
                     pass
             
@@ -1194,12 +1249,12 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                                 text = cell.get_attribute('textContent').strip()
                                 if text and text not in headers:
                                     headers.append(text)
-                            print(f"    📋 Found headers via keyword search: {headers}")
+                            logger.debug("📋 Found headers via keyword search: %s", headers)
                 except Exception as e:
-                    print(f"    ⚠️ Error in keyword search for headers: {e}")
+                    logger.warning("⚠️ Error in keyword search for headers: %s", e)
             
             if not headers or len(headers) < 2:
-                print(f"    ⚠️ Not enough headers found (found: {headers})")
+                logger.warning("⚠️ Not enough headers found (found: %s)", headers)
                 # Попробуем взять все уникальные тексты из первой строки
                 try:
                     all_first_row_texts = []
@@ -1210,12 +1265,12 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                             all_first_row_texts.append(text)
                     if all_first_row_texts:
                         headers = all_first_row_texts[:10]  # Берем первые 10
-                        print(f"    📋 Found headers via all texts: {headers}")
+                        logger.debug("📋 Found headers via all texts: %s", headers)
                 except:
                     pass
             
             if not headers or len(headers) < 2:
-                print(f"    ⚠️ Still not enough headers, returning None")
+                logger.warning("⚠️ Still not enough headers, returning None")
                 return None
             
             # Получаем строки данных
@@ -1229,7 +1284,7 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
             except:
                 rows = table.find_elements(By.XPATH, './/tr')
             
-            print(f"    📋 Found {len(rows)} rows in table")
+            logger.debug("📋 Found %s rows in table", len(rows))
             
             size_guide_data = []
             for row_idx, row in enumerate(rows):
@@ -1255,1868 +1310,2059 @@ def _parse_size_guide_with_selenium(driver) -> Optional[Dict[str, Any]]:
                             if row_data:
                                 size_guide_data.append(row_data)
                 except Exception as e:
-                    print(f"    ⚠️ Error parsing row {row_idx}: {e}")
+                    logger.warning("⚠️ Error parsing row %s: %s", row_idx, e)
                     continue
             
             if size_guide_data:
-                print(f"    ✅ Parsed {len(size_guide_data)} size guide rows")
+                logger.debug("✅ Parsed %s size guide rows", len(size_guide_data))
                 return {
                     'headers': headers,
                     'rows': size_guide_data
                 }
             else:
-                print(f"    ⚠️ No data rows found in table (parsed {len(rows)} rows but no valid data)")
+                logger.warning("⚠️ No data rows found in table (parsed %s rows but no valid data)", len(rows))
                 return None
                 
         except Exception as e:
-            print(f"    ⚠️ Error parsing size guide table: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("⚠️ Error parsing size guide table: %s", e, exc_info=True)
             return None
         
     except Exception as e:
-        print(f"  ⚠️ Error in _parse_size_guide_with_selenium: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.warning("⚠️ Error in _parse_size_guide_with_selenium: %s", e, exc_info=True)
         return None
 
 
-async def parse_poizon_product(url: str, use_selenium: bool = True, skip_size_guide: bool = False) -> Optional[Dict[str, Any]]:
-    try:
-        # Проверяем, что URL валидный
-        if not url or not url.startswith('http'):
-            raise Exception("Некорректный URL. URL должен начинаться с http:// или https://")
-        
-        # Определяем базовый домен для referer
-        if 'thepoizon.ru' in url:
-            base_domain = 'https://thepoizon.ru'
-        elif 'poizon.com' in url:
-            base_domain = 'https://www.poizon.com'
-        else:
-            base_domain = 'https://thepoizon.ru'
-        
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            # Заголовки для имитации браузера
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Referer': f'{base_domain}/',
-                'Cache-Control': 'no-cache',
-                'Pragma': 'no-cache',
-            }
-            
-            print(f"Fetching thepoizon.ru URL: {url}")
-            response = await client.get(url, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            
-            # Проверяем, что получили HTML
-            content_type = response.headers.get('content-type', '')
-            if 'text/html' not in content_type:
-                raise Exception(f"Получен не HTML-контент (content-type: {content_type}). Проверьте URL товара.")
-            
-            print(f"Received HTML, length: {len(response.text)}")
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Парсинг данных из __NEXT_DATA__ (Next.js хранит все данные в JSON)
-            title = None
-            price = None
-            images = []
-            description = ""
-            sizes_prices = []
-            next_data = None
-            
-            # Ищем __NEXT_DATA__ скрипт (там все данные товара)
-            next_data_script = soup.find('script', id='__NEXT_DATA__')
-            if next_data_script:
-                try:
-                    import json
-                    next_data = json.loads(next_data_script.string)
-                    print("✅ Found __NEXT_DATA__ script with product data")
-                    print(f"  __NEXT_DATA__ keys: {list(next_data.keys())[:10]}")
-                except Exception as e:
-                    print(f"❌ Error parsing __NEXT_DATA__: {e}")
-                    import traceback
-                    traceback.print_exc()
-            else:
-                print("⚠️ __NEXT_DATA__ script not found in HTML!")
-            
-            # Если нашли __NEXT_DATA__, используем данные оттуда
-            if next_data:
-                try:
-                    # Извлекаем данные из структуры Next.js
-                    props = next_data.get('props', {})
-                    page_props = props.get('pageProps', {})
-                    
-                    # Ищем данные товара в разных местах структуры (более глубокий поиск)
-                    # В логах видно, что в pageProps есть 'goodsDetail' - это и есть данные товара!
-                    product_data = (page_props.get('goodsDetail') or 
-                                  page_props.get('productData') or 
-                                  page_props.get('product') or
-                                  page_props.get('initialState', {}).get('product') if isinstance(page_props.get('initialState'), dict) else None or
-                                  page_props.get('data', {}).get('product') if isinstance(page_props.get('data'), dict) else None or
-                                  page_props.get('data', {}).get('productData') if isinstance(page_props.get('data'), dict) else None)
+def _images_to_download(found_urls: List[str]) -> List[str]:
+    """Отбор найденных в HTML изображений: без AI-изображений и первого (обычно подошва/стопа)"""
+    logger.debug("Total found %s image URLs before downloading", len(found_urls))
+    # Фильтруем изображения: убираем AI-изображения, пропускаем первое (только если изображений больше 1)
+    images_to_download = []
+    ai_images = []
+    
+    # Сначала фильтруем AI-изображения
+    filtered_urls = []
+    for img_url in found_urls:
+        img_url_lower = img_url.lower()
+        if 'ai/generate' in img_url_lower or 'ai_generate' in img_url_lower:
+            ai_images.append(img_url)
+            logger.debug("⏭️ Skipping AI image: %.80s...", img_url)
+            continue
+        filtered_urls.append(img_url)
+    
+    # Если после фильтрации осталось только одно изображение, не пропускаем его
+    if len(filtered_urls) == 1:
+        images_to_download = filtered_urls
+        logger.debug("ℹ️ Only 1 image found, not skipping it")
+    else:
+        # Пропускаем первое изображение только если изображений больше 1
+        for idx, img_url in enumerate(filtered_urls):
+            if idx == 0:
+                logger.debug("⏭️ Skipping first image: %.80s...", img_url)
+                continue
+            images_to_download.append(img_url)
+            if len(images_to_download) >= 10:
+                break
+    
+    # Если реальных изображений мало, добавляем AI-изображения в конец
+    if len(images_to_download) < 5 and ai_images:
+        logger.warning("⚠️ Only %s real images found, adding %s AI images...", len(images_to_download), len(ai_images))
+        for ai_img in ai_images[:5]:
+            if len(images_to_download) >= 10:
+                break
+            images_to_download.append(ai_img)
+    return images_to_download
+
+
+@strategy('images', 'next_data')
+def _images_from_next_data(ctx: PageContext) -> Optional[List[str]]:
+    """Изображения из данных товара в __NEXT_DATA__ (надежнее найденных в HTML)"""
+    product_data = ctx.product_data
+    if not product_data:
+        return None
+    images = []
+    base_domain = ctx.base_domain
+    # Приоритет: detailImageList (основные фото товара в правильном порядке)
+    images_data = product_data.get('detailImageList')
+    if not images_data:
+        # Fallback на другие источники
+        images_data = (product_data.get('images') or 
+                     product_data.get('imageList') or
+                     product_data.get('imageUrls') or
+                     product_data.get('spuImages') or
+                     product_data.get('mainImages') or
+                     product_data.get('detailImages') or
+                     product_data.get('goodsImages') or
+                     product_data.get('goodsImageList'))
+    # sizeImageList - это изображения размеров, не товара, пропускаем
+    
+    logger.debug("images_data type: %s", type(images_data))
+    if isinstance(images_data, list):
+        logger.debug("images_data list length: %s", len(images_data))
+        if len(images_data) > 0:
+            logger.debug("First image item type: %s, value: %.100s", type(images_data[0]), images_data[0])
+            if isinstance(images_data[0], dict):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("First image item keys: %s", list(images_data[0].keys())[:10])
+
+    if images_data:
+        if isinstance(images_data, list):
+            logger.debug("📸 Found %s images in detailImageList, processing in order...", len(images_data))
+            # Сортируем по полю 'sort' или 'genericTypeSort' если оно есть, чтобы сохранить правильный порядок
+            if all(isinstance(img, dict) for img in images_data):
+                # Пробуем сортировать по 'sort', если нет - по 'genericTypeSort'
+                if all('sort' in img for img in images_data):
+                    images_data = sorted(images_data, key=lambda x: x.get('sort', 0))
+                    logger.debug("📸 Sorted images by 'sort' field")
+                elif all('genericTypeSort' in img for img in images_data):
+                    images_data = sorted(images_data, key=lambda x: x.get('genericTypeSort', 0))
+                    logger.debug("📸 Sorted images by 'genericTypeSort' field")
+            # Берем все изображения в порядке из detailImageList (это правильный порядок с сайта)
+            for idx, img in enumerate(images_data):
+                if idx >= 10:  # Максимум 10 изображений
+                    break
+                
+                img_url = None
+                if isinstance(img, str):
+                    img_url = img
+                elif isinstance(img, dict):
+                    # detailImageList содержит объекты с ключом 'url' (видно в логах: ['imageId', 'sort', 'genericType', 'genericTypeSort', 'url', 'imgType', 'burialImgType'])
+                    # Сортируем по полю 'sort' если оно есть, чтобы сохранить правильный порядок
+                    img_url = (img.get('url') or 
+                              img.get('src') or 
+                              img.get('imageUrl') or 
+                              img.get('originUrl') or
+                              img.get('image') or
+                              img.get('originalUrl') or
+                              img.get('largeUrl') or
+                              img.get('imgUrl'))
+                
+                if img_url:
+                    # Пропускаем AI-изображения
+                    img_url_lower = img_url.lower()
+                    if 'ai/generate' in img_url_lower or 'ai_generate' in img_url_lower:
+                        logger.debug("⏭️ Skipping AI-generated image %s: %.80s...", idx + 1, img_url)
+                        continue
                     
-                    # Также пробуем поискать в dehydratedState (часто используется в Next.js)
-                    dehydrated_state = page_props.get('dehydratedState', {})
-                    if not product_data and dehydrated_state:
-                        queries = dehydrated_state.get('queries', [])
-                        for query in queries:
-                            state_data = query.get('state', {}).get('data', {})
-                            if state_data:
-                                # Пробуем разные варианты
-                                product_data = (state_data.get('goodsDetail') or
-                                              state_data.get('product') or 
-                                              state_data.get('productData') or
-                                              state_data.get('data', {}).get('product') if isinstance(state_data.get('data'), dict) else None or
-                                              state_data.get('data', {}).get('goodsDetail') if isinstance(state_data.get('data'), dict) else None)
-                                if product_data:
-                                    print("  Found product_data in dehydratedState.queries")
-                                    break
+                    if isinstance(img, dict):
+                        generic_type = str(img.get('genericType', '')).upper()
+                        if generic_type == 'WASH_INTRO_INFO_ALL' or 'WASH_INTRO_INFO' in generic_type:
+                            logger.debug("⏭️ Skipping wash instruction image %s (genericType=%s): %.80s...", idx + 1, img.get('genericType'), img_url)
+                            continue
+                        if generic_type == 'DETAIL_ALL' or 'DETAIL' in generic_type:
+                            logger.debug("⏭️ Skipping detail section image %s (genericType=%s): %.80s...", idx + 1, img.get('genericType'), img_url)
+                            continue
                     
-                    # Если все еще не нашли, пробуем взять goodsDetail напрямую из pageProps
-                    if not product_data and 'goodsDetail' in page_props:
-                        goods_detail = page_props['goodsDetail']
-                        if goods_detail and isinstance(goods_detail, dict):
-                            product_data = goods_detail
-                            print(f"  ✅ Using goodsDetail from pageProps as product_data, keys: {list(product_data.keys())[:30]}")
+                    # Нормализуем URL
+                    if img_url.startswith('//'):
+                        img_url = 'https:' + img_url
+                    elif img_url.startswith('/'):
+                        img_url = base_domain + img_url
                     
-                    if product_data:
-                        print(f"✅ Found product_data in __NEXT_DATA__")
-                        print(f"  product_data type: {type(product_data)}")
-                        if isinstance(product_data, dict):
-                            print(f"  product_data keys (first 30): {list(product_data.keys())[:30]}")
-                        
-                        # Название
-                        if isinstance(product_data, dict):
-                            title = (product_data.get('title') or 
-                                   product_data.get('name') or
-                                   product_data.get('productName') or
-                                   product_data.get('spuName') or
-                                   product_data.get('goodsName') or
-                                   product_data.get('goodsNameEn'))
-                        
-                            # Изображения (сохраняем как URL, потом скачаем)
-                            # Приоритет: detailImageList (основные фото товара в правильном порядке)
-                            images_data = product_data.get('detailImageList')
-                            if not images_data:
-                                # Fallback на другие источники
-                                images_data = (product_data.get('images') or 
-                                             product_data.get('imageList') or
-                                             product_data.get('imageUrls') or
-                                             product_data.get('spuImages') or
-                                             product_data.get('mainImages') or
-                                             product_data.get('detailImages') or
-                                             product_data.get('goodsImages') or
-                                             product_data.get('goodsImageList'))
-                            # sizeImageList - это изображения размеров, не товара, пропускаем
-                            
-                            print(f"  DEBUG: images_data type: {type(images_data)}")
-                            if isinstance(images_data, list):
-                                print(f"  DEBUG: images_data list length: {len(images_data)}")
-                                if len(images_data) > 0:
-                                    print(f"  DEBUG: First image item type: {type(images_data[0])}, value: {str(images_data[0])[:100]}")
-                                    if isinstance(images_data[0], dict):
-                                        print(f"  DEBUG: First image item keys: {list(images_data[0].keys())[:10]}")
-                        
-                        if images_data:
-                            if isinstance(images_data, list):
-                                print(f"  📸 Found {len(images_data)} images in detailImageList, processing in order...")
-                                # Сортируем по полю 'sort' или 'genericTypeSort' если оно есть, чтобы сохранить правильный порядок
-                                if all(isinstance(img, dict) for img in images_data):
-                                    # Пробуем сортировать по 'sort', если нет - по 'genericTypeSort'
-                                    if all('sort' in img for img in images_data):
-                                        images_data = sorted(images_data, key=lambda x: x.get('sort', 0))
-                                        print(f"  📸 Sorted images by 'sort' field")
-                                    elif all('genericTypeSort' in img for img in images_data):
-                                        images_data = sorted(images_data, key=lambda x: x.get('genericTypeSort', 0))
-                                        print(f"  📸 Sorted images by 'genericTypeSort' field")
-                                # Берем все изображения в порядке из detailImageList (это правильный порядок с сайта)
-                                for idx, img in enumerate(images_data):
-                                    if idx >= 10:  # Максимум 10 изображений
-                                        break
-                                    
-                                    img_url = None
-                                    if isinstance(img, str):
-                                        img_url = img
-                                    elif isinstance(img, dict):
-                                        # detailImageList содержит объекты с ключом 'url' (видно в логах: ['imageId', 'sort', 'genericType', 'genericTypeSort', 'url', 'imgType', 'burialImgType'])
-                                        # Сортируем по полю 'sort' если оно есть, чтобы сохранить правильный порядок
-                                        img_url = (img.get('url') or 
-                                                  img.get('src') or 
-                                                  img.get('imageUrl') or 
-                                                  img.get('originUrl') or
-                                                  img.get('image') or
-                                                  img.get('originalUrl') or
-                                                  img.get('largeUrl') or
-                                                  img.get('imgUrl'))
-                                    
-                                    if img_url:
-                                        # Пропускаем AI-изображения
-                                        img_url_lower = img_url.lower()
-                                        if 'ai/generate' in img_url_lower or 'ai_generate' in img_url_lower:
-                                            print(f"  ⏭️ Skipping AI-generated image {idx+1}: {img_url[:80]}...")
-                                            continue
-                                        
-                                        if isinstance(img, dict):
-                                            generic_type = str(img.get('genericType', '')).upper()
-                                            if generic_type == 'WASH_INTRO_INFO_ALL' or 'WASH_INTRO_INFO' in generic_type:
-                                                print(f"  ⏭️ Skipping wash instruction image {idx+1} (genericType={img.get('genericType')}): {img_url[:80]}...")
-                                                continue
-                                            if generic_type == 'DETAIL_ALL' or 'DETAIL' in generic_type:
-                                                print(f"  ⏭️ Skipping detail section image {idx+1} (genericType={img.get('genericType')}): {img_url[:80]}...")
-                                                continue
-                                        
-                                        # Нормализуем URL
-                                        if img_url.startswith('//'):
-                                            img_url = 'https:' + img_url
-                                        elif img_url.startswith('/'):
-                                            img_url = base_domain + img_url
-                                        
-                                        if img_url.startswith('http') and img_url not in images:
-                                            images.append(img_url)  # Пока сохраняем как URL
-                                            print(f"    ✅ Added image {idx+1} from __NEXT_DATA__: {img_url[:80]}...")
-                            elif isinstance(images_data, str):
-                                # Если одно изображение, тоже пропускаем
-                                pass
-                        
-                        print(f"Found {len(images)} image URLs from __NEXT_DATA__")
-                        
-                        # SKU данные (размеры и цены) - более глубокий поиск
-                        # Пробуем разные пути в структуре данных
-                        skus = None
-                        
-                        # Сначала ищем напрямую
-                        for key in ['skus', 'skuList', 'skuInfos', 'skuData', 'priceList', 'sizeList', 
-                                   'sizePriceList', 'sizes', 'sizeInfos', 'goodsSkuList', 'skuInfosList',
-                                   'skuListData', 'sizePriceData', 'variants', 'variations']:
-                            if key in product_data:
-                                skus = product_data[key]
-                                print(f"  Found SKUs in product_data['{key}']")
-                                break
-                        
-                        # Если не нашли напрямую, пробуем поискать глубже во вложенных структурах
-                        if not skus:
-                            print("  SKUs not found directly, searching in nested structures...")
-                            nested_keys = ['data', 'goodsDetail', 'detail', 'goods', 'productInfo', 'spuInfo', 'goodsInfo']
-                            for nested_key in nested_keys:
-                                nested_data = product_data.get(nested_key)
-                                if isinstance(nested_data, dict):
-                                    for key in ['skus', 'skuList', 'skuInfos', 'sizeList', 'skuData']:
-                                        if key in nested_data:
-                                            skus = nested_data[key]
-                                            print(f"  Found SKUs in product_data['{nested_key}']['{key}']")
-                                            break
-                                    if skus:
-                                        break
-                        
-                        # Также пробуем поискать в массивах внутри product_data
-                        if not skus:
-                            print("  Searching in arrays within product_data...")
-                            for key, value in product_data.items():
-                                if isinstance(value, list) and len(value) > 0:
-                                    first_item = value[0]
-                                    if isinstance(first_item, dict):
-                                        has_size = any(k in first_item for k in ['size', 'sizeName', 'specValue', 'sizeValue', 'sizeText'])
-                                        has_price = any(k in first_item for k in ['price', 'salePrice', 'currentPrice', 'priceValue'])
-                                        if has_size and has_price:
-                                            skus = value
-                                            print(f"  Found SKUs in array: product_data['{key}']")
-                                            break
-                        
-                        # Также пробуем поискать размеры и цены в priceInfo из pageProps
-                        if not skus and 'priceInfo' in page_props:
-                            price_info = page_props['priceInfo']
-                            print(f"  Found priceInfo in pageProps, type: {type(price_info)}")
-                            if isinstance(price_info, dict):
-                                print(f"    priceInfo keys: {list(price_info.keys())[:20]}")
-                                # Пробуем найти список размеров с ценами
-                                for key in ['skuList', 'skus', 'sizePriceList', 'sizeList', 'prices']:
-                                    if key in price_info:
-                                        candidate = price_info[key]
-                                        if isinstance(candidate, list) and len(candidate) > 0:
-                                            skus = candidate
-                                            print(f"  ✅ Found SKUs in priceInfo['{key}']")
-                                            break
-                            elif isinstance(price_info, list) and len(price_info) > 0:
-                                # Если priceInfo сам является массивом
-                                first_item = price_info[0]
-                                if isinstance(first_item, dict):
-                                    has_size = any(k in first_item for k in ['size', 'sizeName', 'specValue'])
-                                    has_price = any(k in first_item for k in ['price', 'salePrice', 'currentPrice'])
-                                    if has_size and has_price:
-                                        skus = price_info
-                                        print(f"  ✅ Using priceInfo list as SKUs")
-                        
-                        # Пробуем найти в __NEXT_DATA__ через другой путь - через queries/dehydratedState
-                        if not skus and dehydrated_state:
-                            print("  Searching in dehydratedState queries...")
-                            queries = dehydrated_state.get('queries', [])
-                            for query in queries:
-                                state_data = query.get('state', {}).get('data', {})
-                                if isinstance(state_data, dict):
-                                    # Ищем SKU данные в разных местах
-                                    for path in [
-                                        lambda d: d.get('skuList'),
-                                        lambda d: d.get('skus'),
-                                        lambda d: d.get('data', {}).get('skuList'),
-                                        lambda d: d.get('data', {}).get('skus'),
-                                        lambda d: d.get('goodsDetail', {}).get('skuList'),
-                                        lambda d: d.get('goodsDetail', {}).get('skus'),
-                                    ]:
-                                        result = path(state_data)
-                                        if result:
-                                            skus = result
-                                            print(f"  Found SKUs in dehydratedState.queries")
-                                            break
-                                    if skus:
-                                        break
-                        
-                        if skus and isinstance(skus, list) and len(skus) > 0:
-                            sizes_prices = []
-                            print(f"  ✅ Processing {len(skus)} SKU items from __NEXT_DATA__...")
-                            
-                            # Отладочная информация о структуре первого SKU
-                            if len(skus) > 0:
-                                print(f"  DEBUG: First SKU keys: {list(skus[0].keys())[:15]}")
-                                first_sku = skus[0]
-                                if 'properties' in first_sku:
-                                    print(f"  DEBUG: First SKU properties type: {type(first_sku['properties'])}")
-                                    if isinstance(first_sku['properties'], dict):
-                                        print(f"  DEBUG: First SKU properties keys: {list(first_sku['properties'].keys())[:10]}")
-                                    elif isinstance(first_sku['properties'], list):
-                                        print(f"  DEBUG: First SKU properties list length: {len(first_sku['properties'])}")
-                                        if len(first_sku['properties']) > 0:
-                                            print(f"  DEBUG: First property item: {first_sku['properties'][0]}")
-                            
-                            # Строим маппинг propertyValueId -> значение размера из baseProperties
-                            size_mapping = {}
-                            if 'baseProperties' in product_data:
-                                base_props = product_data['baseProperties']
-                                print(f"  DEBUG: baseProperties type: {type(base_props)}")
-                                if isinstance(base_props, list):
-                                    print(f"  DEBUG: baseProperties list length: {len(base_props)}")
-                                    # Выводим все группы для анализа
-                                    for idx, prop_group in enumerate(base_props):
-                                        if isinstance(prop_group, dict):
-                                            prop_name = prop_group.get('propertyName') or prop_group.get('name') or prop_group.get('propertyType') or ''
-                                            # Проверяем поле 'value' - возможно, там размер
-                                            prop_value = prop_group.get('value')
-                                            print(f"    baseProperties[{idx}]: propertyName='{prop_name}', value='{prop_value}', keys={list(prop_group.keys())[:10]}")
-                                            
-                                            # Если в 'value' есть число, похожее на размер
-                                            if prop_value and re.search(r'\d+[,.]?\d*', str(prop_value)):
-                                                # Проверяем, есть ли propertyValueId в этом элементе
-                                                value_id = prop_group.get('propertyValueId') or prop_group.get('id') or prop_group.get('key')
-                                                if value_id:
-                                                    size_mapping[value_id] = str(prop_value)
-                                                    print(f"      ✅ Mapped size from value: {value_id} -> {prop_value}")
-                                            
-                                            # Ищем группу с размерами (может быть 'размер', 'Size', 'size', 'RU', 'EU' и т.д.)
-                                            prop_name_lower = str(prop_name).lower()
-                                            if any(keyword in prop_name_lower for keyword in ['size', 'размер', 'разм']):
-                                                print(f"      ✅ Found size group: '{prop_name}'")
-                                                # В values могут быть размеры
-                                                values = prop_group.get('values') or prop_group.get('propertyValues') or prop_group.get('propertyValueList') or []
-                                                if isinstance(values, list):
-                                                    print(f"        Found {len(values)} size values")
-                                                    for val in values:
-                                                        if isinstance(val, dict):
-                                                            value_id = val.get('propertyValueId') or val.get('id') or val.get('propertyValueId')
-                                                            value_text = val.get('propertyValue') or val.get('value') or val.get('name') or val.get('text') or val.get('propertyValueText')
-                                                            if value_id and value_text:
-                                                                size_mapping[value_id] = value_text
-                                                                print(f"          Mapped size: {value_id} -> {value_text}")
-                                                break  # Нашли группу размеров
-                                            
-                                            # Если не нашли по имени, пробуем все группы
-                                            values = prop_group.get('values') or prop_group.get('propertyValues') or []
-                                            if isinstance(values, list) and len(values) > 0:
-                                                # Проверяем, похожи ли значения на размеры (содержат числа)
-                                                first_val = values[0]
-                                                if isinstance(first_val, dict):
-                                                    val_text = str(first_val.get('propertyValue') or first_val.get('value') or first_val.get('name') or '')
-                                                    # Если значение похоже на размер (содержит числа и возможно запятую/точку)
-                                                    if re.search(r'\d+[,.]?\d*', val_text):
-                                                        print(f"      🔍 Possible size group found (by value pattern): '{prop_name}'")
-                                                        for val in values:
-                                                            if isinstance(val, dict):
-                                                                value_id = val.get('propertyValueId') or val.get('id')
-                                                                value_text = val.get('propertyValue') or val.get('value') or val.get('name') or val.get('text')
-                                                                if value_id and value_text:
-                                                                    size_mapping[value_id] = value_text
-                                                                    print(f"          Mapped size: {value_id} -> {value_text}")
-                                                        if size_mapping:
-                                                            break  # Нашли и заполнили маппинг
-                                elif isinstance(base_props, dict):
-                                    # Если baseProperties - словарь, пробуем найти внутри
-                                    print(f"  DEBUG: baseProperties is dict, keys: {list(base_props.keys())[:10]}")
-                                    for key, value in base_props.items():
-                                        if isinstance(value, list):
-                                            for item in value:
-                                                if isinstance(item, dict):
-                                                    value_id = item.get('propertyValueId') or item.get('id')
-                                                    value_text = item.get('propertyValue') or item.get('value') or item.get('name')
-                                                    if value_id and value_text:
-                                                        size_mapping[value_id] = value_text
-                            
-                            # Пробуем найти цены для каждого SKU - возможно, цены в каждом SKU или в отдельном массиве
-                            sku_price_mapping = {}  # skuId -> price
-                            
-                            # Сначала ищем цены в каждом SKU - детальный поиск
-                            print(f"  DEBUG: Searching for prices in {len(skus)} SKUs...")
-                            for idx, sku in enumerate(skus):
-                                sku_id = sku.get('skuId')
-                                if idx < 3:  # Логируем первые 3 SKU для анализа
-                                    print(f"    SKU {idx+1} (skuId={sku_id}) keys: {list(sku.keys())[:15]}")
-                                
-                                # Ищем цену в самом SKU - расширенный поиск
-                                sku_price = (sku.get('price') or 
-                                            sku.get('salePrice') or 
-                                            sku.get('currentPrice') or
-                                            sku.get('priceValue') or
-                                            sku.get('priceInfo') or
-                                            sku.get('money') or
-                                            sku.get('lowPrice') or
-                                            sku.get('highPrice'))
-                                
-                                # Если price - словарь, извлекаем значение
-                                if isinstance(sku_price, dict):
-                                    sku_price = (sku_price.get('minUnitVal') or 
-                                                sku_price.get('amount') or
-                                                sku_price.get('money') or
-                                                sku_price.get('price') or
-                                                sku_price.get('salePrice'))
-                                
-                                if sku_price and sku_id:
-                                    sku_price_mapping[sku_id] = sku_price
-                                    if idx < 3:
-                                        print(f"      Found price in SKU: {sku_price}")
-                            
-                            # Ищем цены в других местах product_data
-                            print(f"  DEBUG: Searching for price arrays in product_data...")
-                            price_related_keys = [k for k in product_data.keys() if any(word in str(k).lower() for word in ['price', 'sku', 'money', 'cost'])]
-                            if price_related_keys:
-                                print(f"    Found price-related keys: {price_related_keys}")
-                                for key in price_related_keys:
-                                    value = product_data[key]
-                                    if isinstance(value, list) and len(value) > 0:
-                                        print(f"      {key} is a list with {len(value)} items")
-                                        if isinstance(value[0], dict):
-                                            print(f"        First item keys: {list(value[0].keys())[:10]}")
-                                            # Пробуем построить маппинг
-                                            for item in value:
-                                                if isinstance(item, dict):
-                                                    item_sku_id = item.get('skuId') or item.get('id') or item.get('sku')
-                                                    item_price = (item.get('price') or 
-                                                                item.get('money') or
-                                                                item.get('salePrice') or
-                                                                item.get('currentPrice') or
-                                                                item.get('priceValue'))
-                                                    if isinstance(item_price, dict):
-                                                        item_price = item_price.get('minUnitVal') or item_price.get('amount')
-                                                    if item_price and item_sku_id:
-                                                        sku_price_mapping[item_sku_id] = item_price
-                                                        print(f"          Mapped price: skuId={item_sku_id}, price={item_price}")
-                                    elif isinstance(value, dict):
-                                        print(f"      {key} is a dict with keys: {list(value.keys())[:10]}")
-                                        # Особый случай: skuMinPriceInfoDTO может содержать цены
-                                        if key == 'skuMinPriceInfoDTO':
-                                            print(f"        🔍 Analyzing skuMinPriceInfoDTO structure...")
-                                            # minPrice или authPrice могут содержать цену
-                                            min_price = value.get('minPrice')
-                                            auth_price = value.get('authPrice')
-                                            sku_id_dto = value.get('skuId')
-                                            print(f"          minPrice: {min_price}, authPrice: {auth_price}, skuId: {sku_id_dto}")
-                                            if min_price and sku_id_dto:
-                                                # Если minPrice - словарь
-                                                if isinstance(min_price, dict):
-                                                    price_val = min_price.get('minUnitVal') or min_price.get('amount') or min_price.get('money')
-                                                    # Если minUnitVal - это число, используем его (уже в копейках)
-                                                    if isinstance(price_val, (int, float)) and price_val >= 1000:
-                                                        pass  # Уже в копейках
-                                                    elif isinstance(price_val, str):
-                                                        try:
-                                                            price_val = float(price_val)
-                                                            if price_val >= 1000:
-                                                                price_val = int(price_val)  # Уже в копейках
-                                                            else:
-                                                                price_val = int(price_val * 100)  # В рублях, конвертируем
-                                                        except:
-                                                            pass
-                                                else:
-                                                    price_val = min_price
-                                                if price_val:
-                                                    # Сохраняем только числовое значение, не словарь
-                                                    if isinstance(price_val, dict):
-                                                        # Сохраняем оригинальный словарь для извлечения
-                                                        price_dict = price_val
-                                                        price_val = price_dict.get('minUnitVal')
-                                                        if price_val is None:
-                                                            amount = price_dict.get('amount')
-                                                            if amount:
-                                                                try:
-                                                                    amount_num = float(str(amount))
-                                                                    price_val = int(amount_num * 100) if amount_num < 1000 else int(amount_num)
-                                                                except:
-                                                                    price_val = None
-                                                    if price_val:
-                                                        sku_price_mapping[sku_id_dto] = price_val
-                                                        print(f"          ✅ Mapped price from minPrice: skuId={sku_id_dto}, price={price_val}")
-                                            if auth_price and sku_id_dto and sku_id_dto not in sku_price_mapping:
-                                                if isinstance(auth_price, dict):
-                                                    price_val = auth_price.get('minUnitVal') or auth_price.get('amount') or auth_price.get('money')
-                                                    if isinstance(price_val, (int, float)) and price_val >= 1000:
-                                                        pass
-                                                    elif isinstance(price_val, str):
-                                                        try:
-                                                            price_val = float(price_val)
-                                                            if price_val >= 1000:
-                                                                price_val = int(price_val)
-                                                            else:
-                                                                price_val = int(price_val * 100)
-                                                        except:
-                                                            pass
-                                                else:
-                                                    price_val = auth_price
-                                                if price_val:
-                                                    sku_price_mapping[sku_id_dto] = price_val
-                                                    print(f"          ✅ Mapped price from authPrice: skuId={sku_id_dto}, price={price_val}")
-                                        
-                                        # Особый случай: levelOneMinPriceSkus может содержать маппинг propertyValueId -> цены
-                                        # ВАЖНО: levelOneMinPriceSkus содержит цены для каждого propertyValueId (размера)
-                                        # Нужно связать propertyValueId -> price, затем propertyValueId -> SKU -> размер
-                                        elif key == 'levelOneMinPriceSkus':
-                                            print(f"        🔍 Analyzing levelOneMinPriceSkus structure...")
-                                            prop_value_price_mapping = {}  # propertyValueId -> price
-                                            for prop_value_id, price_info in value.items():
-                                                print(f"          propertyValueId={prop_value_id}, price_info type={type(price_info)}")
-                                                if isinstance(price_info, dict):
-                                                    print(f"            price_info keys: {list(price_info.keys())[:10]}")
-                                                    # Ищем цену в структуре - minPrice может быть словарем
-                                                    min_price_obj = price_info.get('minPrice')
-                                                    price_val = None
-                                                    
-                                                    # Детальное логирование для отладки
-                                                    if min_price_obj is not None:
-                                                        print(f"            minPrice type: {type(min_price_obj)}, value: {str(min_price_obj)[:200]}")
-                                                    else:
-                                                        print(f"            ⚠️ minPrice is None for propertyValueId={prop_value_id}")
-                                                    
-                                                    if min_price_obj is not None:
-                                                        if isinstance(min_price_obj, dict):
-                                                            # Извлекаем minUnitVal из minPrice.money.minUnitVal (уже в копейках)
-                                                            money_obj = min_price_obj.get('money', {})
-                                                            if isinstance(money_obj, dict):
-                                                                price_val = money_obj.get('minUnitVal')
-                                                                if not price_val:
-                                                                    # Если нет minUnitVal, пробуем amount и конвертируем
-                                                                    amount = money_obj.get('amount')
-                                                                    if amount:
-                                                                        try:
-                                                                            amount_num = float(str(amount))
-                                                                            if amount_num >= 1000:
-                                                                                price_val = int(amount_num)  # Уже в копейках
-                                                                            else:
-                                                                                price_val = int(amount_num * 100)  # В рублях
-                                                                        except:
-                                                                            pass
-                                                            
-                                                            # Если не нашли в money, пробуем напрямую из minPrice
-                                                            if not price_val:
-                                                                price_val = min_price_obj.get('minUnitVal')
-                                                                if not price_val:
-                                                                    amount = min_price_obj.get('amount')
-                                                                    if amount:
-                                                                        try:
-                                                                            amount_num = float(str(amount))
-                                                                            if amount_num >= 1000:
-                                                                                price_val = int(amount_num)
-                                                                            else:
-                                                                                price_val = int(amount_num * 100)
-                                                                        except:
-                                                                            pass
-                                                        elif isinstance(min_price_obj, (int, float)):
-                                                            price_val = int(min_price_obj) if min_price_obj >= 1000 else int(min_price_obj * 100)
-                                                    else:
-                                                        # minPrice отсутствует - выводим предупреждение
-                                                        print(f"            ⚠️ No minPrice for propertyValueId={prop_value_id}, checking authPrice...")
-                                                    
-                                                    # Если не нашли, пробуем authPrice
-                                                    if not price_val:
-                                                        auth_price_obj = price_info.get('authPrice')
-                                                        if isinstance(auth_price_obj, dict):
-                                                            price_val = auth_price_obj.get('minUnitVal') or auth_price_obj.get('amount')
-                                                            if price_val and isinstance(price_val, (int, float)) and price_val < 1000:
-                                                                price_val = int(price_val * 100)
-                                                        elif isinstance(auth_price_obj, (int, float)):
-                                                            price_val = int(auth_price_obj) if auth_price_obj >= 1000 else int(auth_price_obj * 100)
-                                                    
-                                                    # Также пробуем skuId из price_info и сразу связываем
-                                                    sku_id_from_price_info = price_info.get('skuId') or price_info.get('sourceSkuId')
-                                                    
-                                                    if price_val:
-                                                        # Сохраняем маппинг propertyValueId -> price
-                                                        prop_value_price_mapping[str(prop_value_id)] = price_val
-                                                        print(f"          ✅ Found price in levelOneMinPriceSkus: propertyValueId={prop_value_id}, price={price_val} копеек ({price_val/100} ₽)")
-                                                        
-                                                        # Если есть skuId, сразу связываем (это самый надежный способ!)
-                                                        if sku_id_from_price_info:
-                                                            sku_price_mapping[sku_id_from_price_info] = price_val
-                                                            print(f"          ✅ Mapped price directly via skuId: propertyValueId={prop_value_id} -> skuId={sku_id_from_price_info}, price={price_val} копеек")
-                                                    else:
-                                                        # Если не нашли цену, но есть skuId, пробуем найти цену через другие пути
-                                                        if sku_id_from_price_info:
-                                                            print(f"            ⚠️ No price found but skuId exists: {sku_id_from_price_info}, will try to find price later")
-                                                elif isinstance(price_info, (int, float, str)):
-                                                    # Возможно, прямое значение цены
-                                                    try:
-                                                        price_num = float(price_info)
-                                                        if price_num > 100:  # Разумная цена
-                                                            price_val = int(price_num) if price_num >= 1000 else int(price_num * 100)
-                                                            prop_value_price_mapping[str(prop_value_id)] = price_val
-                                                            print(f"          ✅ Found direct price: propertyValueId={prop_value_id}, price={price_val}")
-                                                    except:
-                                                        pass
-                                            
-                                            # Теперь связываем propertyValueId -> SKU через properties
-                                            if prop_value_price_mapping:
-                                                print(f"        🔗 Linking {len(prop_value_price_mapping)} propertyValueId prices to SKUs...")
-                                                for sku_item in skus:
-                                                    sku_id = sku_item.get('skuId')
-                                                    sku_props = sku_item.get('properties', [])
-                                                    if isinstance(sku_props, list):
-                                                        for prop in sku_props:
-                                                            if isinstance(prop, dict):
-                                                                prop_id = prop.get('propertyValueId')
-                                                                if prop_id:
-                                                                    prop_id_str = str(prop_id)
-                                                                    if prop_id_str in prop_value_price_mapping:
-                                                                        price_val = prop_value_price_mapping[prop_id_str]
-                                                                        if sku_id:
-                                                                            # Если уже есть цена для этого skuId, обновляем только если новая отличается
-                                                                            if sku_id in sku_price_mapping:
-                                                                                existing_price = sku_price_mapping[sku_id]
-                                                                                if price_val != existing_price:
-                                                                                    sku_price_mapping[sku_id] = price_val
-                                                                                    print(f"          🔄 Updated price for skuId={sku_id}: {existing_price} -> {price_val}")
-                                                                            else:
-                                                                                sku_price_mapping[sku_id] = price_val
-                                                                                print(f"          ✅ Linked: propertyValueId={prop_id_str} -> skuId={sku_id}, price={price_val}")
-                            
-                            # Также пробуем найти массив цен в product_data
-                            price_list = None
-                            base_price_money = None
-                            if 'price' in product_data:
-                                price_data = product_data['price']
-                                print(f"  DEBUG: price field type: {type(price_data)}")
-                                if isinstance(price_data, dict):
-                                    print(f"  DEBUG: price dict keys: {list(price_data.keys())[:10]}")
-                                    # Возможно, цены в price.money (общая цена) или price.skuList
-                                    base_price_money = price_data.get('money')  # Общая цена в центах/копейках
-                                    if base_price_money:
-                                        print(f"  DEBUG: Found base price money: {base_price_money}")
-                                        # Если money - словарь, берем minUnitVal
-                                        if isinstance(base_price_money, dict):
-                                            base_price_money = base_price_money.get('minUnitVal') or base_price_money.get('amount')
-                                    
-                                    # Ищем список цен по SKU - расширенный поиск
-                                    price_list = (price_data.get('skuList') or 
-                                                 price_data.get('priceList') or
-                                                 price_data.get('list') or
-                                                 price_data.get('skus') or
-                                                 price_data.get('skuPrices') or
-                                                 price_data.get('skuPriceList') or
-                                                 price_data.get('priceMap') or
-                                                 price_data.get('skuPriceMap'))
-                                    
-                                    # Если есть массив цен, строим маппинг
-                                    if price_list and isinstance(price_list, list):
-                                        print(f"  DEBUG: Found price_list with {len(price_list)} items")
-                                        for price_item in price_list:
-                                            if isinstance(price_item, dict):
-                                                item_sku_id = price_item.get('skuId') or price_item.get('id') or price_item.get('sku')
-                                                item_price = (price_item.get('money') or 
-                                                            price_item.get('price') or 
-                                                            price_item.get('salePrice') or
-                                                            price_item.get('currentPrice') or
-                                                            price_item.get('priceValue') or
-                                                            price_item.get('priceInfo'))
-                                                if item_price and item_sku_id:
-                                                    # Если price - словарь с minUnitVal
-                                                    if isinstance(item_price, dict):
-                                                        item_price = item_price.get('minUnitVal') or item_price.get('amount') or item_price.get('money')
-                                                        # Если minUnitVal - это число, используем его (уже в копейках)
-                                                        if isinstance(item_price, (int, float)) and item_price >= 1000:
-                                                            pass  # Уже в копейках
-                                                        elif isinstance(item_price, str):
-                                                            try:
-                                                                item_price = float(item_price)
-                                                                if item_price >= 1000:
-                                                                    item_price = int(item_price)  # Уже в копейках
-                                                                else:
-                                                                    item_price = int(item_price * 100)  # В рублях, конвертируем
-                                                            except:
-                                                                pass
-                                                    if item_price:
-                                                        sku_price_mapping[item_sku_id] = item_price
-                                                        print(f"        Mapped price from price_list: skuId={item_sku_id}, price={item_price}")
-                                    
-                                    # Также проверяем, может быть price_data - это словарь с ключами-скидками
-                                    if isinstance(price_data, dict):
-                                        # Ищем вложенные структуры с ценами
-                                        for key, value in price_data.items():
-                                            if key != 'money' and isinstance(value, (list, dict)):
-                                                if isinstance(value, list) and len(value) > 0:
-                                                    if isinstance(value[0], dict):
-                                                        # Возможно, это массив цен
-                                                        for item in value:
-                                                            if isinstance(item, dict):
-                                                                item_sku_id = item.get('skuId') or item.get('id')
-                                                                item_price = item.get('price') or item.get('money')
-                                                                if isinstance(item_price, dict):
-                                                                    item_price = item_price.get('minUnitVal') or item_price.get('amount')
-                                                                if item_price and item_sku_id:
-                                                                    sku_price_mapping[item_sku_id] = item_price
-                                elif isinstance(price_data, list):
-                                    price_list = price_data
-                                    print(f"  DEBUG: price is a list with {len(price_list)} items")
-                            
-                            print(f"  DEBUG: Size mapping has {len(size_mapping)} entries")
-                            print(f"  DEBUG: SKU price mapping has {len(sku_price_mapping)} entries")
-                            
-                            # Дополнительный поиск: проверяем, есть ли в product_data другие структуры с ценами
-                            # Проверяем, все ли цены одинаковые (сначала извлекаем числовые значения)
-                            unique_price_values = set()
-                            for price_val in sku_price_mapping.values():
-                                if isinstance(price_val, dict):
-                                    # Извлекаем minUnitVal или amount
-                                    num_val = price_val.get('minUnitVal')
-                                    if num_val is None:
-                                        amount = price_val.get('amount')
-                                        if amount:
-                                            try:
-                                                num_val = float(str(amount))
-                                                if num_val < 1000:
-                                                    num_val = int(num_val * 100)
-                                                else:
-                                                    num_val = int(num_val)
-                                            except:
-                                                pass
-                                    if num_val is not None:
-                                        unique_price_values.add(num_val)
-                                elif isinstance(price_val, (int, float)):
-                                    unique_price_values.add(price_val)
-                            
-                            if len(sku_price_mapping) == 0 or len(unique_price_values) <= 1:
-                                print(f"  ⚠️ All prices are the same or no prices found. Searching for individual prices...")
-                                # Ищем все возможные места с ценами
-                                for key, value in product_data.items():
-                                    if isinstance(value, (list, dict)):
-                                        # Пробуем найти структуры, которые могут содержать цены по SKU
-                                        if isinstance(value, list) and len(value) > 0:
-                                            first_item = value[0]
-                                            if isinstance(first_item, dict):
-                                                # Проверяем, есть ли в элементах skuId и price
-                                                has_sku_id = 'skuId' in first_item or 'id' in first_item
-                                                has_price = any(price_key in first_item for price_key in ['price', 'money', 'minPrice', 'salePrice', 'currentPrice', 'priceInfo', 'minUnitVal'])
-                                                if has_sku_id and has_price:
-                                                    print(f"    🔍 Found potential price list in '{key}' with {len(value)} items")
-                                                    for item in value:
-                                                        item_sku_id = item.get('skuId') or item.get('id')
-                                                        item_price = (item.get('price') or 
-                                                                    item.get('money') or
-                                                                    item.get('minPrice') or
-                                                                    item.get('salePrice') or
-                                                                    item.get('currentPrice') or
-                                                                    item.get('priceInfo'))
-                                                        if isinstance(item_price, dict):
-                                                            item_price = item_price.get('minUnitVal') or item_price.get('amount') or item_price.get('money')
-                                                            if isinstance(item_price, dict):
-                                                                item_price = item_price.get('minUnitVal') or item_price.get('amount')
-                                                        if item_price and item_sku_id:
-                                                            # Конвертируем цену в копейки, если нужно
-                                                            if isinstance(item_price, (int, float)):
-                                                                if item_price < 1000:
-                                                                    item_price = int(item_price * 100)
-                                                                else:
-                                                                    item_price = int(item_price)
-                                                            elif isinstance(item_price, str):
-                                                                try:
-                                                                    price_num = float(item_price.replace(' ', '').replace(',', ''))
-                                                                    item_price = int(price_num * 100) if price_num < 1000 else int(price_num)
-                                                                except:
-                                                                    continue
-                                                            if item_sku_id not in sku_price_mapping or sku_price_mapping[item_sku_id] != item_price:
-                                                                sku_price_mapping[item_sku_id] = item_price
-                                                                print(f"      ✅ Found individual price: skuId={item_sku_id}, price={item_price} копеек")
-                                        elif isinstance(value, dict):
-                                            # Пробуем найти вложенные структуры с ценами
-                                            for sub_key, sub_value in value.items():
-                                                if isinstance(sub_value, list) and len(sub_value) > 0:
-                                                    first_sub_item = sub_value[0]
-                                                    if isinstance(first_sub_item, dict):
-                                                        has_sku_id = 'skuId' in first_sub_item or 'id' in first_sub_item
-                                                        has_price = any(price_key in first_sub_item for price_key in ['price', 'money', 'minPrice', 'salePrice'])
-                                                        if has_sku_id and has_price:
-                                                            print(f"    🔍 Found potential price list in '{key}.{sub_key}' with {len(sub_value)} items")
-                                                            for item in sub_value:
-                                                                item_sku_id = item.get('skuId') or item.get('id')
-                                                                item_price = (item.get('price') or 
-                                                                            item.get('money') or
-                                                                            item.get('minPrice') or
-                                                                            item.get('salePrice'))
-                                                                if isinstance(item_price, dict):
-                                                                    item_price = item_price.get('minUnitVal') or item_price.get('amount')
-                                                                if item_price and item_sku_id:
-                                                                    if isinstance(item_price, (int, float)) and item_price < 1000:
-                                                                        item_price = int(item_price * 100)
-                                                                    if item_sku_id not in sku_price_mapping or sku_price_mapping[item_sku_id] != item_price:
-                                                                        sku_price_mapping[item_sku_id] = item_price
-                                                                        print(f"      ✅ Found individual price: skuId={item_sku_id}, price={item_price} копеек")
-                            
-                            if not size_mapping:
-                                print(f"  ⚠️ No size mapping found in baseProperties, trying alternative approach...")
-                            
-                            for idx, sku in enumerate(skus):
-                                # Извлекаем размер из properties через propertyValueId -> baseProperties маппинг
-                                size = None
-                                properties = sku.get('properties')
-                                
-                                if isinstance(properties, list):
-                                    # properties - список объектов с propertyValueId
-                                    for prop in properties:
-                                        if isinstance(prop, dict):
-                                            property_value_id = prop.get('propertyValueId') or prop.get('id')
-                                            if property_value_id:
-                                                # Ищем значение размера в маппинге
-                                                if property_value_id in size_mapping:
-                                                    size = size_mapping[property_value_id]
-                                                    print(f"    SKU {idx+1}: Found size via mapping {property_value_id} -> {size}")
-                                                    break
-                                
-                                # Если не нашли через маппинг, пробуем извлечь из skuTitle (поддерживаем дроби ⅔, ⅓)
-                                if not size:
-                                    sku_title = sku.get('skuTitle') or ''
-                                    # Ищем паттерн размера в конце названия (число с запятой/точкой или дробью)
-                                    if sku_title:
-                                        # Словарь для конвертации Unicode дробей в десятичные
-                                        fraction_map = {
-                                            '⅓': 0.333, '⅔': 0.667, '⅛': 0.125, '⅜': 0.375,
-                                            '⅝': 0.625, '⅞': 0.875, '¼': 0.25, '¾': 0.75, '½': 0.5
-                                        }
-                                        
-                                        # Паттерн для размеров с дробями: "34⅔", "35⅓", "34 ⅔", "34⅔ (35⅓)" и т.д.
-                                        # Также поддерживаем обычные форматы: "43,5", "43.5"
-                                        # Сначала ищем дробь (может быть перед скобкой или в конце)
-                                        size_match = re.search(r'(\d+)\s*([⅓⅔⅛⅜⅝⅞¼¾½])(?:\s*\(|$)', sku_title.strip())
-                                        if size_match:
-                                            whole = int(size_match.group(1))
-                                            fraction_char = size_match.group(2)
-                                            fraction_decimal = fraction_map.get(fraction_char, 0)
-                                            size = f"{whole + fraction_decimal:.3f}".rstrip('0').rstrip('.')
-                                            size = size.replace('.', ',')  # Заменяем точку на запятую
-                                            print(f"    SKU {idx+1}: Extracted size with fraction from skuTitle: '{size}' (was: {whole}{fraction_char})")
-                                        else:
-                                            # Ищем паттерн типа "43,5" или "43.5" в конце строки
-                                            size_match = re.search(r'(\d+[,.]?\d*)\s*$', sku_title.strip())
-                                            if size_match:
-                                                size = size_match.group(1).replace('.', ',')  # Заменяем точку на запятую
-                                                print(f"    SKU {idx+1}: Extracted size from skuTitle: '{size}'")
-                                
-                                # Если не нашли размер в properties, пробуем другие поля
-                                if not size:
-                                    size = (sku.get('size') or 
-                                           sku.get('sizeName') or 
-                                           sku.get('specValue') or
-                                           sku.get('sizeValue') or
-                                           sku.get('sizeText') or
-                                           sku.get('sizeLabel') or
-                                           sku.get('sizeNameCn') or
-                                           sku.get('sizeNameEn'))
-                                
-                                # Если размер все еще содержит название товара, извлекаем только числовую часть
-                                if size and len(size) > 10:
-                                    # Словарь для конвертации Unicode дробей
-                                    fraction_map = {
-                                        '⅓': 0.333, '⅔': 0.667, '⅛': 0.125, '⅜': 0.375,
-                                        '⅝': 0.625, '⅞': 0.875, '¼': 0.25, '¾': 0.75, '½': 0.5
-                                    }
-                                    
-                                    # Пробуем найти размер с дробью
-                                    size_match = re.search(r'(\d+)\s*([⅓⅔⅛⅜⅝⅞¼¾½])(?:\s*\(|$)', size.strip())
-                                    if size_match:
-                                        whole = int(size_match.group(1))
-                                        fraction_char = size_match.group(2)
-                                        fraction_decimal = fraction_map.get(fraction_char, 0)
-                                        size = f"{whole + fraction_decimal:.3f}".rstrip('0').rstrip('.')
-                                        size = size.replace('.', ',')
-                                        print(f"    SKU {idx+1}: Cleaned size with fraction to: '{size}'")
-                                    else:
-                                        # Пробуем найти число в конце
-                                        size_match = re.search(r'(\d+[,.]?\d*)\s*$', size.strip())
-                                        if size_match:
-                                            size = size_match.group(1).replace('.', ',')
-                                            print(f"    SKU {idx+1}: Cleaned size to: '{size}'")
-                                
-                                # Ищем цену для этого SKU
-                                price_value = None
-                                sku_id = sku.get('skuId')
-                                
-                                # Сначала пробуем найти цену в маппинге цен по SKU
-                                if sku_id and sku_id in sku_price_mapping:
-                                    price_value_raw = sku_price_mapping[sku_id]
-                                    # Если price_value_raw - словарь, извлекаем minUnitVal (уже в копейках)
-                                    if isinstance(price_value_raw, dict):
-                                        price_value = price_value_raw.get('minUnitVal')
-                                        if price_value is None:
-                                            # Если нет minUnitVal, пробуем amount и конвертируем
-                                            amount = price_value_raw.get('amount') or price_value_raw.get('money')
-                                            if amount:
-                                                try:
-                                                    amount_num = float(str(amount))
-                                                    if amount_num >= 1000:
-                                                        price_value = int(amount_num)  # Уже в копейках
-                                                    else:
-                                                        price_value = int(amount_num * 100)  # В рублях
-                                                except:
-                                                    price_value = None
-                                        elif isinstance(price_value, str):
-                                            try:
-                                                price_val_num = float(price_value)
-                                                if price_val_num >= 1000:
-                                                    price_value = int(price_val_num)
-                                                else:
-                                                    price_value = int(price_val_num * 100)
-                                            except:
-                                                price_value = None
-                                    else:
-                                        price_value = price_value_raw
-                                    print(f"    SKU {idx+1}: Found price in mapping: {price_value} (type: {type(price_value)})")
-                                else:
-                                    # Пробуем найти цену в самом SKU - расширенный поиск
-                                    price_value = (sku.get('price') or 
-                                                 sku.get('salePrice') or 
-                                                 sku.get('currentPrice') or
-                                                 sku.get('priceValue') or
-                                                 sku.get('lowPrice') or
-                                                 sku.get('highPrice') or
-                                                 sku.get('money'))
-                                    
-                                    # Если price - словарь с money/minUnitVal
-                                    if isinstance(price_value, dict):
-                                        price_value = price_value.get('minUnitVal') or price_value.get('amount') or price_value.get('money')
-                                    
-                                    # Пробуем найти в priceInfo
-                                    if not price_value:
-                                        price_info = sku.get('priceInfo')
-                                        if isinstance(price_info, dict):
-                                            price_value = (price_info.get('money') or
-                                                         price_info.get('price') or
-                                                         price_info.get('salePrice') or
-                                                         price_info.get('currentPrice'))
-                                            if isinstance(price_value, dict):
-                                                price_value = price_value.get('minUnitVal') or price_value.get('amount')
-                                    
-                                    # Если не нашли, пробуем найти в price_list по skuId
-                                    if not price_value and price_list and isinstance(price_list, list) and sku_id:
-                                        for price_item in price_list:
-                                            if isinstance(price_item, dict):
-                                                if price_item.get('skuId') == sku_id or price_item.get('id') == sku_id:
-                                                    # Цена может быть в price_item.money или напрямую
-                                                    price_value = (price_item.get('money') or
-                                                                 price_item.get('price') or 
-                                                                 price_item.get('salePrice') or
-                                                                 price_item.get('currentPrice') or
-                                                                 price_item.get('priceValue'))
-                                                    # Если price - словарь
-                                                    if isinstance(price_value, dict):
-                                                        price_value = price_value.get('minUnitVal') or price_value.get('amount')
-                                                    if price_value:
-                                                        print(f"    SKU {idx+1}: Found price in price_list: {price_value}")
-                                                    break
-                                    
-                                    # Если не нашли, пробуем найти в product_data по skuId (может быть отдельный массив)
-                                    if not price_value and sku_id:
-                                        # Ищем во всех массивах product_data
-                                        for key, value in product_data.items():
-                                            if isinstance(value, list) and len(value) > 0:
-                                                for item in value:
-                                                    if isinstance(item, dict):
-                                                        item_sku_id = item.get('skuId') or item.get('id')
-                                                        if item_sku_id == sku_id:
-                                                            item_price = (item.get('price') or 
-                                                                        item.get('money') or
-                                                                        item.get('salePrice') or
-                                                                        item.get('currentPrice'))
-                                                            if isinstance(item_price, dict):
-                                                                item_price = item_price.get('minUnitVal') or item_price.get('amount')
-                                                            if item_price:
-                                                                price_value = item_price
-                                                                print(f"    SKU {idx+1}: Found price in product_data['{key}']: {price_value}")
-                                                                break
-                                                    if price_value:
-                                                        break
-                                                if price_value:
-                                                    break
-                                
-                                # Если не нашли напрямую, пробуем вложенные структуры
-                                if not price_value and isinstance(sku, dict):
-                                    price_info = sku.get('priceInfo') or sku.get('price')
-                                    if isinstance(price_info, dict):
-                                        price_value = (price_info.get('money') or
-                                                     price_info.get('price') or 
-                                                     price_info.get('salePrice') or
-                                                     price_info.get('currentPrice'))
-                                
-                                # Сохраняем размер даже если нет цены (будет "-")
-                                if size:
-                                    try:
-                                        # Цена может быть в разных форматах
-                                        price_cents = None
-                                        
-                                        if isinstance(price_value, dict):
-                                            # Если это словарь, извлекаем minUnitVal (уже в копейках)
-                                            price_cents = price_value.get('minUnitVal')
-                                            if price_cents is None:
-                                                # Если нет minUnitVal, пробуем amount и конвертируем
-                                                amount = price_value.get('amount')
-                                                if amount:
-                                                    try:
-                                                        amount_num = float(str(amount))
-                                                        if amount_num >= 1000:
-                                                            price_cents = int(amount_num)  # Уже в копейках
-                                                        else:
-                                                            price_cents = int(amount_num * 100)  # В рублях
-                                                    except:
-                                                        pass
-                                        
-                                        elif isinstance(price_value, (int, float)):
-                                            # Если число большое (>= 1000), возможно это уже в копейках
-                                            if price_value >= 1000:
-                                                price_cents = int(price_value)
-                                            else:
-                                                price_cents = int(price_value * 100)  # Предполагаем рубли
-                                        else:
-                                            # Строка - парсим
-                                            price_str = str(price_value).replace(' ', '').replace(',', '').replace('₽', '').replace('₴', '')
-                                            price_num = float(re.sub(r'[^\d.]', '', price_str))
-                                            if price_num >= 1000:
-                                                price_cents = int(price_num)
-                                            else:
-                                                price_cents = int(price_num * 100)
-                                        
-                                        if price_cents and 100 <= price_cents <= 10000000:  # Разумный диапазон
-                                            sizes_prices.append({
-                                                'size': str(size),
-                                                'price': price_cents
-                                            })
-                                            print(f"  SKU {idx+1}: size={size}, price={price_cents} копеек")
-                                        else:
-                                            # Если цена не найдена или невалидна, сохраняем размер с "-"
-                                            sizes_prices.append({
-                                                'size': str(size),
-                                                'price': None  # Будет отображаться как "-"
-                                            })
-                                            print(f"  SKU {idx+1}: size={size}, price=None (no price available)")
-                                    except Exception as e:
-                                        # Если произошла ошибка при парсинге цены, все равно сохраняем размер
-                                        sizes_prices.append({
-                                            'size': str(size),
-                                            'price': None
-                                        })
-                                        print(f"  SKU {idx+1}: size={size}, price=None (error parsing price: {e})")
-                                elif size:
-                                    # Если размер есть, но цена не найдена, сохраняем с "-"
-                                    sizes_prices.append({
-                                        'size': str(size),
-                                        'price': None
-                                    })
-                                    print(f"  SKU {idx+1}: size={size}, price=None (no price found)")
-                            
-                            if sizes_prices:
-                                description_lines = ["Размеры и цены:"]
-                                for item in sizes_prices:
-                                    if item['price'] is not None:
-                                        price_rub = item['price'] / 100
-                                        description_lines.append(f"{item['size']}: {price_rub:,.0f} ₽")
-                                    else:
-                                        description_lines.append(f"{item['size']}: -")
-                                description = "\n".join(description_lines)
-                                
-                                # Минимальная цена (только из размеров с ценой)
-                                prices_with_values = [item['price'] for item in sizes_prices if item['price'] is not None]
-                                if prices_with_values:
-                                    min_price = min(prices_with_values)
-                                    price = min_price
-                                else:
-                                    # Если нет ни одной цены, используем базовую
-                                    price = base_price_money if base_price_money else None
-                                
-                                print(f"✅ Found {len(sizes_prices)} sizes from __NEXT_DATA__")
-                            else:
-                                print(f"⚠️ SKUs list found but no valid sizes parsed (skus count: {len(skus)})")
-                                # Выводим структуру для отладки
-                                if skus and len(skus) > 0:
-                                    print(f"  First SKU structure (keys): {list(skus[0].keys())[:10]}")
-                        else:
-                            print(f"⚠️ No SKUs found in product_data")
-                            print(f"    Available top-level keys ({len(product_data.keys())}): {list(product_data.keys())[:50]}")
-                            
-                            # Детальный анализ структуры
-                            try:
-                                import json
-                                # Ищем любые массивы в product_data
-                                arrays_found = []
-                                for key, value in product_data.items():
-                                    if isinstance(value, list) and len(value) > 0:
-                                        arrays_found.append((key, len(value)))
-                                        print(f"    Found array '{key}' with {len(value)} items")
-                                        if isinstance(value[0], dict):
-                                            print(f"      First item keys: {list(value[0].keys())[:20]}")
-                                
-                                if not arrays_found:
-                                    print(f"    ⚠️ No arrays found in product_data!")
-                                
-                                # Ищем ключи, связанные с размерами/ценами
-                                size_related_keys = [k for k in product_data.keys() if any(word in str(k).lower() for word in ['size', 'sku', 'price', 'variant', 'spec'])]
-                                if size_related_keys:
-                                    print(f"    🔍 Size/SKU/Price related keys: {size_related_keys}")
-                                    # Показываем содержимое этих ключей
-                                    for key in size_related_keys[:5]:
-                                        value = product_data[key]
-                                        print(f"      {key}: {type(value).__name__}, value preview: {str(value)[:200]}")
-                                
-                                # Показываем структуру для анализа
-                                sample = json.dumps(product_data, default=str, indent=2, ensure_ascii=False)[:3000]
-                                print(f"    Product data structure (first 3000 chars):\n{sample}")
-                            except Exception as e:
-                                print(f"    ❌ Error analyzing structure: {e}")
-                                import traceback
-                                traceback.print_exc()
-                        
-                        # Если цена не найдена из SKU, ищем основную цену
-                        if not price:
-                            price_value = None
-                            price_data = product_data.get('price')
-                            
-                            # Если price - словарь, ищем цену внутри (в логах видели 'money')
-                            if isinstance(price_data, dict):
-                                price_value = (price_data.get('money') or  # Основная цена в центах/копейках
-                                             price_data.get('price') or 
-                                             price_data.get('salePrice') or
-                                             price_data.get('currentPrice') or
-                                             price_data.get('lowPrice') or
-                                             price_data.get('minPrice') or
-                                             price_data.get('maxPrice'))
-                            elif isinstance(price_data, (int, float)):
-                                price_value = price_data
-                            elif price_data is None:
-                                # Пробуем другие поля
-                                price_value = (product_data.get('salePrice') or
-                                             product_data.get('currentPrice') or
-                                             product_data.get('lowPrice'))
-                            
-                            if price_value:
-                                try:
-                                    if isinstance(price_value, (int, float)):
-                                        # Проверяем разумность
-                                        if price_value > 100000:
-                                            print(f"  ⚠️ Main price too large ({price_value}), skipping")
-                                        elif price_value >= 1000:
-                                            price = int(price_value)  # Уже в копейках
-                                        else:
-                                            price = int(price_value * 100)
-                                    else:
-                                        price_str = str(price_value).replace(' ', '').replace(',', '')
-                                        price_num = float(re.sub(r'[^\d.]', '', price_str))
-                                        if price_num > 100000:
-                                            print(f"  ⚠️ Main price too large ({price_num} руб), skipping")
-                                        elif price_num >= 1000:
-                                            price = int(price_num)
-                                        else:
-                                            price = int(price_num * 100)
-                                except Exception as e:
-                                    print(f"  ❌ Error parsing main price: {e}")
-                                    pass
-                        
-                        print(f"Parsed from __NEXT_DATA__: title={bool(title)}, price={bool(price)}, images={len(images)}")
-                
-                except Exception as e:
-                    print(f"Error extracting data from __NEXT_DATA__: {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-            # Если не нашли в __NEXT_DATA__, продолжаем обычный парсинг
+                    if img_url.startswith('http') and img_url not in images:
+                        images.append(img_url)  # Пока сохраняем как URL
+                        logger.debug("✅ Added image %s from __NEXT_DATA__: %.80s...", idx + 1, img_url)
+        elif isinstance(images_data, str):
+            # Если одно изображение, тоже пропускаем
+            pass
+    
+    logger.debug("Found %s image URLs from __NEXT_DATA__", len(images))
+    if not images:
+        return None
+    # Первое изображение обычно подошва/стопа
+    return images[1:11] if len(images) > 1 else []
+
+
+@strategy('images', 'json_ld')
+def _images_from_json_ld(ctx: PageContext) -> Optional[List[str]]:
+    """Ссылки на оригинальные изображения из JSON-LD"""
+    found_urls = []
+    for json_ld in ctx.page.soup.find_all('script', type='application/ld+json'):
+        try:
+            import json
+            data = json.loads(json_ld.string)
+            if isinstance(data, list) and len(data) > 0:
+                data = data[0]
             
-            # Поиск названия товара (оригинальное, без перевода)
-            if not title:
-                # Ищем оригинальное название в JSON-LD (там обычно английское оригинальное)
-                json_ld_scripts = soup.find_all('script', type='application/ld+json')
-            for json_ld in json_ld_scripts:
-                try:
-                    import json
-                    data = json.loads(json_ld.string)
-                    if isinstance(data, list) and len(data) > 0:
-                        data = data[0]
+            if isinstance(data, dict):
+                # Ищем image (может быть строкой или массивом)
+                if 'image' in data:
+                    img_data = data['image']
+                    if isinstance(img_data, list):
+                        for img in img_data[:3]:
+                            if isinstance(img, str) and img not in found_urls:
+                                found_urls.append(img)
+                            elif isinstance(img, dict) and 'url' in img and img['url'] not in found_urls:
+                                found_urls.append(img['url'])
+                    elif isinstance(img_data, str) and img_data not in found_urls:
+                        found_urls.append(img_data)
                     
-                    if isinstance(data, dict):
-                        # Ищем название в JSON-LD - предпочитаем английское
-                        if 'name' in data:
-                            candidate = data['name']
-                            # Предпочитаем названия с латинскими буквами (английские)
-                            if re.search(r'[a-zA-Z]', candidate):
-                                title = candidate
-                                print(f"Found title from JSON-LD name: {title[:50]}...")
-                                break
-                        elif 'alternateName' in data:
-                            candidate = data['alternateName']
-                            if re.search(r'[a-zA-Z]', candidate):
-                                title = candidate
-                                print(f"Found title from JSON-LD alternateName: {title[:50]}...")
-                                break
-                except Exception as e:
-                    print(f"Error parsing JSON-LD for title: {e}")
-                    pass
-            
-            # Если не нашли в JSON-LD, ищем в JavaScript переменных (там часто оригинальное название)
-            if not title:
-                # Ищем в script тегах переменные типа productName, product_title, etc.
-                script_tags = soup.find_all('script')
-                for script in script_tags:
-                    if script.string:
-                        # Ищем паттерны типа "name": "New Balance..."
-                        name_patterns = [
-                            re.compile(r'["\']name["\']\s*[:=]\s*["\']([^"\']+?)["\']', re.IGNORECASE),
-                            re.compile(r'["\']productName["\']\s*[:=]\s*["\']([^"\']+?)["\']', re.IGNORECASE),
-                            re.compile(r'["\']title["\']\s*[:=]\s*["\']([^"\']+?)["\']', re.IGNORECASE),
-                        ]
-                        for pattern in name_patterns:
-                            matches = pattern.findall(script.string)
-                            for match in matches:
-                                # Предпочитаем названия с латинскими буквами
-                                if re.search(r'[a-zA-Z]', match) and len(match) > 10:
-                                    title = match.strip()
-                                    print(f"Found title from script variable: {title[:50]}...")
-                                    break
-                            if title:
-                                break
-                    if title:
+                    if len(found_urls) >= 3:
                         break
+        except:
+            pass
+    return _images_to_download(found_urls) if found_urls else None
+
+
+@strategy('images', 'gallery')
+def _images_from_gallery(ctx: PageContext) -> Optional[List[str]]:
+    """Изображения галереи товара по CSS-селекторам"""
+    soup = ctx.page.soup
+    base_domain = ctx.base_domain
+    found_urls = []
+    logger.debug("Searching for images in HTML gallery...")
+    # Селекторы для галереи товара
+    gallery_selectors = [
+        '.product-gallery img',
+        '.product-images img',
+        '.gallery-item img',
+        '.swiper-slide img',
+        '.slider-item img',
+        '.product-photos img',
+        '[class*="gallery"] img',
+        '[class*="slider"] img',
+        '[class*="carousel"] img',
+        '[class*="swiper"] img',
+        '.product-image img',
+        '.product__image img',
+        '[class*="product"] [class*="image"] img',
+        '[class*="goods"] img',
+        'img[src*="product"]',
+        'img[src*="goods"]'
+    ]
+    
+    # Собираем все изображения, сохраняя порядок появления на странице
+    all_img_elements = []
+    for selector in gallery_selectors:
+        img_tags = soup.select(selector)
+        logger.debug("Trying selector '%s': found %s elements", selector, len(img_tags))
+        for img in img_tags:
+            skip_image = False
+            skip_parent_keywords = ['outfit', 'naryad', 'наряд', 'lifestyle', 'style', 'look', 'wearing', 'worn']
             
-            # Если не нашли, ищем в data-атрибутах
-            if not title:
-                title_elem = soup.select_one('[data-name], [data-product-name], [data-title], [data-original-name]')
-                if title_elem:
-                    candidate = (title_elem.get('data-name') or 
-                                title_elem.get('data-product-name') or 
-                                title_elem.get('data-title') or
-                                title_elem.get('data-original-name'))
-                    if candidate:
-                        # Предпочитаем английские названия
-                        if re.search(r'[a-zA-Z]', candidate):
-                            title = candidate
-                            print(f"Found title from data-attribute: {title[:50]}...")
-            
-            # В последнюю очередь пробуем селекторы
-            if not title:
-                title_selectors = [
-                    'h1.product-title',
-                    'h1.goods-title',
-                    '.product-name',
-                    '.goods-name',
-                    '.product__title',
-                    '.product-title',
-                    'h1[class*="product"]',
-                    'h1'
-                ]
-                
-                for selector in title_selectors:
-                    title_elem = soup.select_one(selector)
-                    if title_elem:
-                        candidate = title_elem.get_text(strip=True)
-                        if candidate and len(candidate) > 5:
-                            title = candidate
-                            print(f"Found title with selector '{selector}': {title[:50]}...")
-                            break
-            
-            # Очистка названия от суффиксов сайта и переведенных частей
-            if title:
-                title = re.sub(r'\s*[-|]\s*thepoizon.*$', '', title, flags=re.IGNORECASE)
-                title = re.sub(r'\s*[-|]\s*POIZON.*$', '', title, flags=re.IGNORECASE)
-                title = re.sub(r'\s*[-|]\s*得物.*$', '', title, flags=re.IGNORECASE)
+            parent = img.find_parent()
+            if parent:
+                parent_classes = ' '.join(parent.get('class', [])).lower()
+                parent_id = (parent.get('id') or '').lower()
                 
-                # Удаляем все слова на кириллице, оставляем только латиницу, цифры и пробелы
-                # Разбиваем на слова и фильтруем только те, что содержат латиницу или цифры
-                words = title.split()
-                english_words = []
+                if any(keyword in parent_classes or keyword in parent_id for keyword in skip_parent_keywords):
+                    skip_image = True
                 
-                for word in words:
-                    # Проверяем, есть ли в слове кириллица
-                    has_cyrillic = re.search(r'[А-Яа-яЁё]', word)
-                    # Проверяем, есть ли в слове латиница или цифры
-                    has_latin_or_digits = re.search(r'[A-Za-z0-9]', word)
-                    
-                    # Пропускаем слова с кириллицей
-                    if has_cyrillic:
-                        continue
-                    
-                    # Оставляем слова с латиницей или цифрами, а также специальные символы (например, модели типа "NB-850")
-                    if has_latin_or_digits or re.match(r'^[A-Za-z0-9\-_/]+$', word):
-                        english_words.append(word)
-                
-                # Объединяем обратно
-                title = ' '.join(english_words).strip()
-                
-                # Дополнительная очистка - убираем множественные пробелы
-                title = re.sub(r'\s+', ' ', title).strip()
+                if not skip_image:
+                    ancestors = parent.find_parents()
+                    for ancestor in ancestors[:5]:
+                        ancestor_classes = ' '.join(ancestor.get('class', [])).lower()
+                        ancestor_id = (ancestor.get('id') or '').lower()
+                        if any(keyword in ancestor_classes or keyword in ancestor_id for keyword in skip_parent_keywords):
+                            skip_image = True
+                            break
             
-            # Поиск цены
-            price_selectors = [
-                '.product-price',
-                '.price',
-                '.goods-price',
-                '.product__price',
-                '.price-value',
-                '.product-price-value',
-                '[class*="price"]',
-                '[class*="Price"]',
-                '[class*="PRICE"]',
-                '[data-price]',
-                '[class*="amount"]',
-                '[class*="Amount"]',
-                '[class*="cost"]',
-                '[class*="Cost"]',
-                '.current-price',
-                '.price-current',
-                '.price__current',
-                '[itemprop="price"]',
-                '[data-value]',
-                '.sale-price',
-                '.final-price'
-            ]
+            if skip_image:
+                logger.debug("⏭️ Skipping image from outfit/lifestyle section: %.80s...", img.get('src', ''))
+                continue
             
-            for selector in price_selectors:
-                price_elems = soup.select(selector)
-                for price_elem in price_elems:
-                    price_text = price_elem.get_text(strip=True)
-                    if not price_text:
-                        # Пробуем атрибуты
-                        price_text = price_elem.get('data-price') or price_elem.get('data-value') or price_elem.get('content') or ''
-                    
-                    if price_text:
-                        # Извлекаем число из цены (удаляем символы валют)
-                        # Поддерживаем разные форматы: "12 345 ₽", "12345₽", "12,345", "12.345"
-                        price_text_clean = re.sub(r'[^\d.,]', '', price_text.replace(',', '').replace(' ', ''))
-                        if price_text_clean:
-                            try:
-                                price_num = float(price_text_clean.replace(',', '.'))
-                                # Проверяем разумность цены (от 100 рублей до 1 млн)
-                                if 100 <= price_num <= 1000000:
-                                    price_rub = int(price_num * 100)  # в копейках
-                                    price = price_rub
-                                    print(f"Found price with selector '{selector}': {price_text} -> {price_rub} копеек")
-                                    break
-                                elif price_num < 100:  # Если цена меньше 100, возможно это юани
-                                    price_rub = int(price_num * 12.5 * 100)  # в копейках
-                                    if price_rub >= 10000:  # Проверяем разумность после конвертации
-                                        price = price_rub
-                                        print(f"Found price (yuan->rub) with selector '{selector}': {price_text} -> {price_rub} копеек")
-                                        break
-                            except Exception as e:
-                                print(f"Error parsing price '{price_text}': {e}")
-                                pass
-                if price:
-                    break
+            # Ищем оригинальные изображения (не миниатюры)
+            img_url = None
             
-            # Также пробуем найти цену в JSON-LD или других мета-тегах
-            if not price:
-                # Ищем JSON-LD с данными товара
-                json_ld_scripts = soup.find_all('script', type='application/ld+json')
-                for json_ld in json_ld_scripts:
-                    try:
-                        import json
-                        data = json.loads(json_ld.string)
-                        # Поддерживаем как объект, так и массив
-                        if isinstance(data, list) and len(data) > 0:
-                            data = data[0]
-                        
-                        if isinstance(data, dict):
-                            offers = data.get('offers', {})
-                            if isinstance(offers, dict) and 'price' in offers:
-                                price_num = float(offers['price'])
-                                if 100 <= price_num <= 1000000:
-                                    price_rub = int(price_num * 100)
-                                    price = price_rub
-                                    print(f"Found price in JSON-LD offers: {price_rub} копеек")
-                                    break
-                                elif price_num < 100:
-                                    price_rub = int(price_num * 12.5 * 100)
-                                    if price_rub >= 10000:
-                                        price = price_rub
-                                        print(f"Found price (yuan->rub) in JSON-LD: {price_rub} копеек")
-                                        break
-                    except Exception as e:
-                        print(f"Error parsing JSON-LD: {e}")
-                        pass
+            # Проверяем data-атрибуты для оригинальных изображений (в приоритете)
+            img_url = (img.get('data-original') or 
+                      img.get('data-src-large') or 
+                      img.get('data-full') or
+                      img.get('data-url') or
+                      img.get('data-original-src') or
+                      img.get('data-lazy-src') or
+                      img.get('data-src') or
+                      img.get('src'))
             
-            # Если все еще не нашли, ищем в meta-тегах
-            if not price:
-                meta_price = soup.find('meta', property='product:price:amount')
-                if meta_price:
-                    try:
-                        price_num = float(meta_price.get('content', ''))
-                        if 100 <= price_num <= 1000000:
-                            price_rub = int(price_num * 100)
-                            price = price_rub
-                            print(f"Found price in meta product:price:amount: {price_rub} копеек")
-                    except:
-                        pass
-            
-            # Последняя попытка - ищем все числа на странице, которые похожи на цены
-            if not price:
-                # Ищем числа от 1000 до 100000 с символом рубля рядом
-                price_patterns = [
-                    re.compile(r'(\d{1,3}(?:\s?\d{3})*(?:[.,]\d{2})?)\s*[₽₴]', re.IGNORECASE),
-                    re.compile(r'(\d{1,3}(?:\s?\d{3})*(?:[.,]\d{2})?)\s*(?:руб|RUB)', re.IGNORECASE),
-                    re.compile(r'price["\']?\s*[:=]\s*["\']?(\d{1,3}(?:\s?\d{3})*(?:[.,]\d{2})?)', re.IGNORECASE),
-                ]
+            if img_url:
+                # Пропускаем миниатюры, иконки, логотипы, AI-изображения
+                img_url_lower = img_url.lower()
+                skip_keywords = ['thumb', 'icon', 'placeholder', 'logo', 'avatar', 'default', 'ai/generate', 'ai_generate']
+                if any(skip in img_url_lower for skip in skip_keywords):
+                    continue
                 
-                page_text = soup.get_text()
-                for pattern in price_patterns:
-                    matches = pattern.findall(page_text)
-                    for match in matches[:5]:  # Проверяем первые 5 совпадений
-                        try:
-                            price_text_clean = match.replace(' ', '').replace(',', '.')
-                            price_num = float(price_text_clean)
-                            if 1000 <= price_num <= 100000:
-                                price_rub = int(price_num * 100)
-                                price = price_rub
-                                print(f"Found price with regex pattern: {match} -> {price_rub} копеек")
-                                break
-                        except:
-                            pass
-                    if price:
+                # Нормализуем URL
+                if img_url.startswith('//'):
+                    img_url = 'https:' + img_url
+                elif img_url.startswith('/'):
+                    img_url = base_domain + img_url
+                
+                if img_url.startswith('http'):
+                    # Сохраняем URL и позицию для сортировки
+                    if not any(item['url'] == img_url for item in all_img_elements):
+                        all_img_elements.append({
+                            'url': img_url,
+                            'position': len(all_img_elements)
+                        })
+                        logger.debug("Added image: %.80s...", img_url)
+    
+    # Сортируем по порядку появления на странице и добавляем в found_urls
+    all_img_elements.sort(key=lambda x: x['position'])
+    for item in all_img_elements:
+        if item['url'] not in found_urls:
+            found_urls.append(item['url'])
+    
+    logger.debug("Found %s images in HTML gallery", len(found_urls))
+    return _images_to_download(found_urls) if found_urls else None
+
+
+@strategy('images', 'script')
+def _images_from_scripts(ctx: PageContext) -> Optional[List[str]]:
+    """Ссылки на изображения в JavaScript-переменных"""
+    found_urls = []
+    logger.debug("Searching for images in JavaScript variables...")
+    script_tags = ctx.page.soup.find_all('script')
+    for script in script_tags:
+        if script.string:
+            # Ищем паттерны типа "image": "http://..." или imageUrls: [...]
+            img_patterns = [
+                re.compile(r'["\']image["\']\s*[:=]\s*["\']([^"\']+?)["\']', re.IGNORECASE),
+                re.compile(r'["\']imageUrl["\']\s*[:=]\s*["\']([^"\']+?)["\']', re.IGNORECASE),
+                re.compile(r'["\']url["\']\s*[:=]\s*["\']([^"\']+?\.(?:jpg|jpeg|png|webp))["\']', re.IGNORECASE),
+            ]
+            for pattern in img_patterns:
+                matches = pattern.findall(script.string)
+                for match in matches:
+                    if match.startswith('http') and match not in found_urls:
+                        # Пропускаем миниатюры
+                        if not any(skip in match.lower() for skip in ['thumb', 'icon', 'placeholder']):
+                            found_urls.append(match)
+                            logger.debug("Found image in script: %.80s...", match)
+    return _images_to_download(found_urls) if found_urls else None
+
+
+@strategy('category', 'breadcrumb')
+def _category_from_breadcrumb(ctx: PageContext) -> Optional[str]:
+    """Категория или подкатегория магазина по хлебным крошкам страницы товара"""
+    page = ctx.page
+    # Хлебные крошки - небольшой блок, полный DOM ради него не строим
+    soup = page.fragment_soup(b'BreadCrumb_breadcrumb__Iy_yk')
+    breadcrumb = soup.select_one('div.BreadCrumb_breadcrumb__Iy_yk') if soup else None
+    if breadcrumb:
+        links = breadcrumb.select('a span')
+        if len(links) >= 3:
+            breadcrumb_category = links[2].get_text(strip=True)
+            from app.utils.category_mapping import MAIN_CATEGORIES_WITH_SUBCATEGORIES
+            all_categories = set(MAIN_CATEGORIES_WITH_SUBCATEGORIES.keys())
+            for subcats in MAIN_CATEGORIES_WITH_SUBCATEGORIES.values():
+                all_categories.update(subcats)
+            for cat in all_categories:
+                if cat.lower() == breadcrumb_category.lower() or breadcrumb_category.lower() in cat.lower() or cat.lower() in breadcrumb_category.lower():
+                    return cat
+    return None
+
+
+def _first_present(data: Any, keys: Tuple[str, ...]) -> Any:
+    """Первое непустое значение словаря по списку ключей (data может быть не словарем)"""
+    if isinstance(data, dict):
+        for key in keys:
+            if data.get(key):
+                return data[key]
+    return None
+
+
+def _cached_next_data_value(ctx: PageContext, field: str, expected_type: type) -> Any:
+    """Значение по пути, запомненному для отпечатка схемы этой страницы"""
+    if not ctx.fingerprint:
+        return None
+    path = next_data_paths.lookup(ctx.fingerprint, field)
+    if path is None:
+        return None
+    value = next_data_paths.resolve(ctx.next_data, path)
+    if isinstance(value, expected_type) and value:
+        return value
+    # При том же отпечатке данные лежат в другом месте - путь найдется заново
+    next_data_paths.forget(ctx.fingerprint, field)
+    return None
+
+
+def _remember_next_data_path(ctx: PageContext, field: str, value: Any) -> None:
+    """Запомнить путь к найденному значению, если для этой схемы его еще нет"""
+    if ctx.fingerprint and next_data_paths.lookup(ctx.fingerprint, field) is None:
+        path = next_data_paths.find_path(ctx.next_data, value)
+        if path is not None:
+            next_data_paths.remember(ctx.fingerprint, field, path)
+
+
+@strategy('product', 'cached_path')
+def _product_from_cached_path(ctx: PageContext) -> Optional[Dict[str, Any]]:
+    """Данные товара по пути, найденному на прошлых страницах с той же схемой __NEXT_DATA__"""
+    return _cached_next_data_value(ctx, 'product', dict)
+
+
+@strategy('product', 'page_props')
+def _product_from_page_props(ctx: PageContext) -> Optional[Dict[str, Any]]:
+    """Данные товара прямо в pageProps (в логах видно, что это goodsDetail)"""
+    page_props = ctx.page_props
+    product_data = (_first_present(page_props, ('goodsDetail', 'productData', 'product')) or
+                    _first_present(page_props.get('initialState'), ('product',)) or
+                    _first_present(page_props.get('data'), ('product', 'productData')))
+    return product_data if isinstance(product_data, dict) else None
+
+
+@strategy('product', 'dehydrated_state')
+def _product_from_dehydrated_state(ctx: PageContext) -> Optional[Dict[str, Any]]:
+    """Данные товара в dehydratedState.queries (часто используется в Next.js)"""
+    dehydrated_state = ctx.page_props.get('dehydratedState') or {}
+    for query in dehydrated_state.get('queries', []):
+        state_data = query.get('state', {}).get('data', {})
+        product_data = (_first_present(state_data, ('goodsDetail', 'product', 'productData')) or
+                        _first_present(state_data.get('data') if isinstance(state_data, dict) else None, ('product', 'goodsDetail')))
+        if isinstance(product_data, dict):
+            logger.debug("Found product_data in dehydratedState.queries")
+            return product_data
+    return None
+
+
+SKU_LIST_KEYS = ('skus', 'skuList', 'skuInfos', 'skuData', 'priceList', 'sizeList',
+                 'sizePriceList', 'sizes', 'sizeInfos', 'goodsSkuList', 'skuInfosList',
+                 'skuListData', 'sizePriceData', 'variants', 'variations')
+
+
+@strategy('skus', 'cached_path')
+def _skus_from_cached_path(ctx: PageContext) -> Optional[list]:
+    """Список SKU по пути, найденному на прошлых страницах с той же схемой __NEXT_DATA__"""
+    return _cached_next_data_value(ctx, 'skus', list)
+
+
+@strategy('skus', 'product_keys')
+def _skus_from_product_keys(ctx: PageContext) -> Any:
+    """Список SKU по известным ключам данных товара"""
+    product_data = ctx.product_data
+    if not product_data:
+        return None
+    for key in SKU_LIST_KEYS:
+        if key in product_data:
+            logger.debug("Found SKUs in product_data['%s']", key)
+            return product_data[key]
+    return None
+
+
+@strategy('skus', 'nested')
+def _skus_from_nested(ctx: PageContext) -> Any:
+    """Список SKU во вложенных структурах данных товара"""
+    product_data = ctx.product_data
+    if not product_data:
+        return None
+    logger.debug("SKUs not found directly, searching in nested structures...")
+    nested_keys = ['data', 'goodsDetail', 'detail', 'goods', 'productInfo', 'spuInfo', 'goodsInfo']
+    for nested_key in nested_keys:
+        nested_data = product_data.get(nested_key)
+        if isinstance(nested_data, dict):
+            for key in ['skus', 'skuList', 'skuInfos', 'sizeList', 'skuData']:
+                if key in nested_data:
+                    logger.debug("Found SKUs in product_data['%s']['%s']", nested_key, key)
+                    if nested_data[key]:
+                        return nested_data[key]
+                    break
+    return None
+
+
+@strategy('skus', 'array_scan')
+def _skus_from_array_scan(ctx: PageContext) -> Any:
+    """Массив данных товара, элементы которого содержат и размер, и цену"""
+    product_data = ctx.product_data
+    if not product_data:
+        return None
+    logger.debug("Searching in arrays within product_data...")
+    for key, value in product_data.items():
+        if isinstance(value, list) and len(value) > 0:
+            first_item = value[0]
+            if isinstance(first_item, dict):
+                has_size = any(k in first_item for k in ['size', 'sizeName', 'specValue', 'sizeValue', 'sizeText'])
+                has_price = any(k in first_item for k in ['price', 'salePrice', 'currentPrice', 'priceValue'])
+                if has_size and has_price:
+                    logger.debug("Found SKUs in array: product_data['%s']", key)
+                    return value
+    return None
+
+
+@strategy('skus', 'price_info')
+def _skus_from_price_info(ctx: PageContext) -> Any:
+    """Размеры и цены в priceInfo из pageProps"""
+    page_props = ctx.page_props
+    if not ctx.product_data or 'priceInfo' not in page_props:
+        return None
+    skus = None
+    price_info = page_props['priceInfo']
+    logger.debug("Found priceInfo in pageProps, type: %s", type(price_info))
+    if isinstance(price_info, dict):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("priceInfo keys: %s", list(price_info.keys())[:20])
+        # Пробуем найти список размеров с ценами
+        for key in ['skuList', 'skus', 'sizePriceList', 'sizeList', 'prices']:
+            if key in price_info:
+                candidate = price_info[key]
+                if isinstance(candidate, list) and len(candidate) > 0:
+                    skus = candidate
+                    logger.debug("✅ Found SKUs in priceInfo['%s']", key)
+                    break
+    elif isinstance(price_info, list) and len(price_info) > 0:
+        # Если priceInfo сам является массивом
+        first_item = price_info[0]
+        if isinstance(first_item, dict):
+            has_size = any(k in first_item for k in ['size', 'sizeName', 'specValue'])
+            has_price = any(k in first_item for k in ['price', 'salePrice', 'currentPrice'])
+            if has_size and has_price:
+                skus = price_info
+                logger.debug("✅ Using priceInfo list as SKUs")
+    return skus
+
+
+@strategy('skus', 'dehydrated_state')
+def _skus_from_dehydrated_state(ctx: PageContext) -> Any:
+    """Список SKU в dehydratedState.queries"""
+    dehydrated_state = ctx.page_props.get('dehydratedState')
+    if not ctx.product_data or not dehydrated_state:
+        return None
+    logger.debug("Searching in dehydratedState queries...")
+    queries = dehydrated_state.get('queries', [])
+    for query in queries:
+        state_data = query.get('state', {}).get('data', {})
+        if isinstance(state_data, dict):
+            # Ищем SKU данные в разных местах
+            for path in [
+                lambda d: d.get('skuList'),
+                lambda d: d.get('skus'),
+                lambda d: d.get('data', {}).get('skuList'),
+                lambda d: d.get('data', {}).get('skus'),
+                lambda d: d.get('goodsDetail', {}).get('skuList'),
+                lambda d: d.get('goodsDetail', {}).get('skus'),
+            ]:
+                result = path(state_data)
+                if result:
+                    logger.debug("Found SKUs in dehydratedState.queries")
+                    return result
+    return None
+
+
+@strategy('title', 'next_data')
+def _title_from_next_data(ctx: PageContext) -> Optional[str]:
+    """Название из данных товара в __NEXT_DATA__"""
+    product_data = ctx.product_data
+    if not product_data:
+        return None
+    return (product_data.get('title') or 
+           product_data.get('name') or
+           product_data.get('productName') or
+           product_data.get('spuName') or
+           product_data.get('goodsName') or
+           product_data.get('goodsNameEn') or None)
+
+
+@strategy('title', 'json_ld')
+def _title_from_json_ld(ctx: PageContext) -> Optional[str]:
+    """Оригинальное название из JSON-LD (там обычно английское)"""
+    page = ctx.page
+    title = None
+    # Ищем оригинальное название в JSON-LD (там обычно английское оригинальное)
+    for json_ld in page.soup.find_all('script', type='application/ld+json'):
+        try:
+            import json
+            data = json.loads(json_ld.string)
+            if isinstance(data, list) and len(data) > 0:
+                data = data[0]
+            
+            if isinstance(data, dict):
+                # Ищем название в JSON-LD - предпочитаем английское
+                if 'name' in data:
+                    candidate = data['name']
+                    # Предпочитаем названия с латинскими буквами (английские)
+                    if re.search(r'[a-zA-Z]', candidate):
+                        title = candidate
+                        logger.debug("Found title from JSON-LD name: %.50s...", title)
+                        break
+                elif 'alternateName' in data:
+                    candidate = data['alternateName']
+                    if re.search(r'[a-zA-Z]', candidate):
+                        title = candidate
+                        logger.debug("Found title from JSON-LD alternateName: %.50s...", title)
                         break
+        except Exception as e:
+            logger.warning("Error parsing JSON-LD for title: %s", e)
+            pass
+    return title
+
+
+@strategy('title', 'script_variable')
+def _title_from_script_variable(ctx: PageContext) -> Optional[str]:
+    """Название из JavaScript-переменных (там часто оригинальное)"""
+    page = ctx.page
+    title = None
+    # Ищем в script тегах переменные типа productName, product_title, etc.
+    script_tags = page.soup.find_all('script')
+    for script in script_tags:
+        if script.string:
+            # Ищем паттерны типа "name": "New Balance..."
+            name_patterns = [
+                re.compile(r'["\']name["\']\s*[:=]\s*["\']([^"\']+?)["\']', re.IGNORECASE),
+                re.compile(r'["\']productName["\']\s*[:=]\s*["\']([^"\']+?)["\']', re.IGNORECASE),
+                re.compile(r'["\']title["\']\s*[:=]\s*["\']([^"\']+?)["\']', re.IGNORECASE),
+            ]
+            for pattern in name_patterns:
+                matches = pattern.findall(script.string)
+                for match in matches:
+                    # Предпочитаем названия с латинскими буквами
+                    if re.search(r'[a-zA-Z]', match) and len(match) > 10:
+                        title = match.strip()
+                        logger.debug("Found title from script variable: %.50s...", title)
+                        break
+                if title:
+                    break
+        if title:
+            break
+    return title
+
+
+@strategy('title', 'data_attribute')
+def _title_from_data_attribute(ctx: PageContext) -> Optional[str]:
+    """Название из data-атрибутов"""
+    page = ctx.page
+    title = None
+    title_elem = page.soup.select_one('[data-name], [data-product-name], [data-title], [data-original-name]')
+    if title_elem:
+        candidate = (title_elem.get('data-name') or 
+                    title_elem.get('data-product-name') or 
+                    title_elem.get('data-title') or
+                    title_elem.get('data-original-name'))
+        if candidate:
+            # Предпочитаем английские названия
+            if re.search(r'[a-zA-Z]', candidate):
+                title = candidate
+                logger.debug("Found title from data-attribute: %.50s...", title)
+    return title
+
+
+@strategy('title', 'selector')
+def _title_from_selector(ctx: PageContext) -> Optional[str]:
+    """Название по CSS-селекторам (в последнюю очередь)"""
+    page = ctx.page
+    title = None
+    title_selectors = [
+        'h1.product-title',
+        'h1.goods-title',
+        '.product-name',
+        '.goods-name',
+        '.product__title',
+        '.product-title',
+        'h1[class*="product"]',
+        'h1'
+    ]
+    
+    for selector in title_selectors:
+        title_elem = page.soup.select_one(selector)
+        if title_elem:
+            candidate = title_elem.get_text(strip=True)
+            if candidate and len(candidate) > 5:
+                title = candidate
+                logger.debug("Found title with selector '%s': %.50s...", selector, title)
+                break
+    return title
+
+
+def _clean_title(title: Optional[str]) -> Optional[str]:
+    """Очистка названия от суффиксов сайта и переведенных частей"""
+    if not title:
+        return title
+    title = re.sub(r'\s*[-|]\s*thepoizon.*$', '', title, flags=re.IGNORECASE)
+    title = re.sub(r'\s*[-|]\s*POIZON.*$', '', title, flags=re.IGNORECASE)
+    title = re.sub(r'\s*[-|]\s*得物.*$', '', title, flags=re.IGNORECASE)
+    
+    # Удаляем все слова на кириллице, оставляем только латиницу, цифры и пробелы
+    # Разбиваем на слова и фильтруем только те, что содержат латиницу или цифры
+    words = title.split()
+    english_words = []
+    
+    for word in words:
+        # Проверяем, есть ли в слове кириллица
+        has_cyrillic = re.search(r'[А-Яа-яЁё]', word)
+        # Проверяем, есть ли в слове латиница или цифры
+        has_latin_or_digits = re.search(r'[A-Za-z0-9]', word)
+        
+        # Пропускаем слова с кириллицей
+        if has_cyrillic:
+            continue
+        
+        # Оставляем слова с латиницей или цифрами, а также специальные символы (например, модели типа "NB-850")
+        if has_latin_or_digits or re.match(r'^[A-Za-z0-9\-_/]+$', word):
+            english_words.append(word)
+    
+    # Объединяем обратно
+    title = ' '.join(english_words).strip()
+    
+    # Дополнительная очистка - убираем множественные пробелы
+    title = re.sub(r'\s+', ' ', title).strip()
+    return title
+
+
+def _sizes_complete(sizes_prices: list) -> bool:
+    """Размеры не нужно уточнять: они найдены и цены у них не все одинаковые"""
+    unique_prices = set(item['price'] for item in sizes_prices if item['price'] is not None)
+    return bool(sizes_prices) and len(unique_prices) != 1
+
+
+@strategy('sizes', 'next_data_skus')
+def _sizes_from_next_data(ctx: PageContext) -> Optional[list]:
+    """
+    Размеры и цены из SKU в __NEXT_DATA__. Минимальную цену (или общую цену товара,
+    если у размеров цен нет) оставляет в ctx.sku_price для цепочки цены.
+    """
+    product_data = ctx.product_data
+    if not product_data:
+        return None
+    skus = ctx.values.get('skus')
+    if not (skus and isinstance(skus, list) and len(skus) > 0):
+        logger.warning("⚠️ No SKUs found in product_data")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Available top-level keys (%s): %s", len(product_data.keys()), list(product_data.keys())[:50])
+        
+        # Детальный анализ структуры (json.dumps всего товара - только при LOG_LEVEL=DEBUG)
+        if logger.isEnabledFor(logging.DEBUG):
+            try:
+                import json
+                # Ищем любые массивы в product_data
+                arrays_found = []
+                for key, value in product_data.items():
+                    if isinstance(value, list) and len(value) > 0:
+                        arrays_found.append((key, len(value)))
+                        logger.debug("Found array '%s' with %s items", key, len(value))
+                        if isinstance(value[0], dict):
+                            logger.debug("First item keys: %s", list(value[0].keys())[:20])
             
-            # Поиск изображений (галерея товара, пропускаем первое - это обычно подошва/стопа)
-            found_urls = []
+                if not arrays_found:
+                    logger.warning("⚠️ No arrays found in product_data!")
             
-            # Сначала ищем в JSON-LD - там могут быть ссылки на оригинальные изображения
-            for json_ld in json_ld_scripts:
-                try:
-                    import json
-                    data = json.loads(json_ld.string)
-                    if isinstance(data, list) and len(data) > 0:
-                        data = data[0]
-                    
-                    if isinstance(data, dict):
-                        # Ищем image (может быть строкой или массивом)
-                        if 'image' in data:
-                            img_data = data['image']
-                            if isinstance(img_data, list):
-                                for img in img_data[:3]:
-                                    if isinstance(img, str) and img not in found_urls:
-                                        found_urls.append(img)
-                                    elif isinstance(img, dict) and 'url' in img and img['url'] not in found_urls:
-                                        found_urls.append(img['url'])
-                            elif isinstance(img_data, str) and img_data not in found_urls:
-                                found_urls.append(img_data)
-                            
-                            if len(found_urls) >= 3:
-                                break
-                except:
-                    pass
+                # Ищем ключи, связанные с размерами/ценами
+                size_related_keys = [k for k in product_data.keys() if any(word in str(k).lower() for word in ['size', 'sku', 'price', 'variant', 'spec'])]
+                if size_related_keys:
+                    logger.debug("🔍 Size/SKU/Price related keys: %s", size_related_keys)
+                    # Показываем содержимое этих ключей
+                    for key in size_related_keys[:5]:
+                        value = product_data[key]
+                        logger.debug("%s: %s, value preview: %.200s", key, type(value).__name__, value)
             
-            # Если не нашли в JSON-LD, ищем в галерее товара
-            if len(found_urls) == 0:
-                print("Searching for images in HTML gallery...")
-                # Селекторы для галереи товара
-                gallery_selectors = [
-                    '.product-gallery img',
-                    '.product-images img',
-                    '.gallery-item img',
-                    '.swiper-slide img',
-                    '.slider-item img',
-                    '.product-photos img',
-                    '[class*="gallery"] img',
-                    '[class*="slider"] img',
-                    '[class*="carousel"] img',
-                    '[class*="swiper"] img',
-                    '.product-image img',
-                    '.product__image img',
-                    '[class*="product"] [class*="image"] img',
-                    '[class*="goods"] img',
-                    'img[src*="product"]',
-                    'img[src*="goods"]'
-                ]
+                # Показываем структуру для анализа
+                sample = json.dumps(product_data, default=str, indent=2, ensure_ascii=False)[:3000]
+                logger.debug("Product data structure (first 3000 chars):\n%s", sample)
+            except Exception as e:
+                logger.error("❌ Error analyzing structure: %s", e, exc_info=True)
+        return None
+    
+    sizes_prices = []
+    logger.debug("✅ Processing %s SKU items from __NEXT_DATA__...", len(skus))
+    
+    # Отладочная информация о структуре первого SKU
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("First SKU keys: %s", list(skus[0].keys())[:15])
+        first_sku = skus[0]
+        if 'properties' in first_sku:
+            logger.debug("First SKU properties type: %s", type(first_sku['properties']))
+            if isinstance(first_sku['properties'], dict):
+                logger.debug("First SKU properties keys: %s", list(first_sku['properties'].keys())[:10])
+            elif isinstance(first_sku['properties'], list):
+                logger.debug("First SKU properties list length: %s", len(first_sku['properties']))
+                if len(first_sku['properties']) > 0:
+                    logger.debug("First property item: %s", first_sku['properties'][0])
+    
+    # Строим маппинг propertyValueId -> значение размера из baseProperties
+    size_mapping = {}
+    if 'baseProperties' in product_data:
+        base_props = product_data['baseProperties']
+        logger.debug("baseProperties type: %s", type(base_props))
+        if isinstance(base_props, list):
+            logger.debug("baseProperties list length: %s", len(base_props))
+            # Выводим все группы для анализа
+            for idx, prop_group in enumerate(base_props):
+                if isinstance(prop_group, dict):
+                    prop_name = prop_group.get('propertyName') or prop_group.get('name') or prop_group.get('propertyType') or ''
+                    # Проверяем поле 'value' - возможно, там размер
+                    prop_value = prop_group.get('value')
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("baseProperties[%s]: propertyName='%s', value='%s', keys=%s", idx, prop_name, prop_value, list(prop_group.keys())[:10])
+                    
+                    # Если в 'value' есть число, похожее на размер
+                    if prop_value and re.search(r'\d+[,.]?\d*', str(prop_value)):
+                        # Проверяем, есть ли propertyValueId в этом элементе
+                        value_id = prop_group.get('propertyValueId') or prop_group.get('id') or prop_group.get('key')
+                        if value_id:
+                            size_mapping[value_id] = str(prop_value)
+                            logger.debug("✅ Mapped size from value: %s -> %s", value_id, prop_value)
+                    
+                    # Ищем группу с размерами (может быть 'размер', 'Size', 'size', 'RU', 'EU' и т.д.)
+                    prop_name_lower = str(prop_name).lower()
+                    if any(keyword in prop_name_lower for keyword in ['size', 'размер', 'разм']):
+                        logger.debug("✅ Found size group: '%s'", prop_name)
+                        # В values могут быть размеры
+                        values = prop_group.get('values') or prop_group.get('propertyValues') or prop_group.get('propertyValueList') or []
+                        if isinstance(values, list):
+                            logger.debug("Found %s size values", len(values))
+                            for val in values:
+                                if isinstance(val, dict):
+                                    value_id = val.get('propertyValueId') or val.get('id') or val.get('propertyValueId')
+                                    value_text = val.get('propertyValue') or val.get('value') or val.get('name') or val.get('text') or val.get('propertyValueText')
+                                    if value_id and value_text:
+                                        size_mapping[value_id] = value_text
+                                        logger.debug("Mapped size: %s -> %s", value_id, value_text)
+                        break  # Нашли группу размеров
+                    
+                    # Если не нашли по имени, пробуем все группы
+                    values = prop_group.get('values') or prop_group.get('propertyValues') or []
+                    if isinstance(values, list) and len(values) > 0:
+                        # Проверяем, похожи ли значения на размеры (содержат числа)
+                        first_val = values[0]
+                        if isinstance(first_val, dict):
+                            val_text = str(first_val.get('propertyValue') or first_val.get('value') or first_val.get('name') or '')
+                            # Если значение похоже на размер (содержит числа и возможно запятую/точку)
+                            if re.search(r'\d+[,.]?\d*', val_text):
+                                logger.debug("🔍 Possible size group found (by value pattern): '%s'", prop_name)
+                                for val in values:
+                                    if isinstance(val, dict):
+                                        value_id = val.get('propertyValueId') or val.get('id')
+                                        value_text = val.get('propertyValue') or val.get('value') or val.get('name') or val.get('text')
+                                        if value_id and value_text:
+                                            size_mapping[value_id] = value_text
+                                            logger.debug("Mapped size: %s -> %s", value_id, value_text)
+                                if size_mapping:
+                                    break  # Нашли и заполнили маппинг
+        elif isinstance(base_props, dict):
+            # Если baseProperties - словарь, пробуем найти внутри
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("baseProperties is dict, keys: %s", list(base_props.keys())[:10])
+            for key, value in base_props.items():
+                if isinstance(value, list):
+                    for item in value:
+                        if isinstance(item, dict):
+                            value_id = item.get('propertyValueId') or item.get('id')
+                            value_text = item.get('propertyValue') or item.get('value') or item.get('name')
+                            if value_id and value_text:
+                                size_mapping[value_id] = value_text
+    
+    # Пробуем найти цены для каждого SKU - возможно, цены в каждом SKU или в отдельном массиве
+    sku_price_mapping = {}  # skuId -> price
+    
+    # Сначала ищем цены в каждом SKU - детальный поиск
+    logger.debug("Searching for prices in %s SKUs...", len(skus))
+    for idx, sku in enumerate(skus):
+        sku_id = sku.get('skuId')
+        if idx < 3 and logger.isEnabledFor(logging.DEBUG):  # Логируем первые 3 SKU для анализа
+            logger.debug("SKU %s (skuId=%s) keys: %s", idx + 1, sku_id, list(sku.keys())[:15])
+        
+        # Ищем цену в самом SKU - расширенный поиск
+        sku_price = (sku.get('price') or 
+                    sku.get('salePrice') or 
+                    sku.get('currentPrice') or
+                    sku.get('priceValue') or
+                    sku.get('priceInfo') or
+                    sku.get('money') or
+                    sku.get('lowPrice') or
+                    sku.get('highPrice'))
+        
+        # Если price - словарь, извлекаем значение
+        if isinstance(sku_price, dict):
+            sku_price = (sku_price.get('minUnitVal') or 
+                        sku_price.get('amount') or
+                        sku_price.get('money') or
+                        sku_price.get('price') or
+                        sku_price.get('salePrice'))
+        
+        if sku_price and sku_id:
+            sku_price_mapping[sku_id] = sku_price
+            if idx < 3:
+                logger.debug("Found price in SKU: %s", sku_price)
+    
+    # Ищем цены в других местах product_data
+    logger.debug("Searching for price arrays in product_data...")
+    price_related_keys = [k for k in product_data.keys() if any(word in str(k).lower() for word in ['price', 'sku', 'money', 'cost'])]
+    if price_related_keys:
+        logger.debug("Found price-related keys: %s", price_related_keys)
+        for key in price_related_keys:
+            value = product_data[key]
+            if isinstance(value, list) and len(value) > 0:
+                logger.debug("%s is a list with %s items", key, len(value))
+                if isinstance(value[0], dict):
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("First item keys: %s", list(value[0].keys())[:10])
+                    # Пробуем построить маппинг
+                    for item in value:
+                        if isinstance(item, dict):
+                            item_sku_id = item.get('skuId') or item.get('id') or item.get('sku')
+                            item_price = (item.get('price') or 
+                                        item.get('money') or
+                                        item.get('salePrice') or
+                                        item.get('currentPrice') or
+                                        item.get('priceValue'))
+                            if isinstance(item_price, dict):
+                                item_price = item_price.get('minUnitVal') or item_price.get('amount')
+                            if item_price and item_sku_id:
+                                sku_price_mapping[item_sku_id] = item_price
+                                logger.debug("Mapped price: skuId=%s, price=%s", item_sku_id, item_price)
+            elif isinstance(value, dict):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("%s is a dict with keys: %s", key, list(value.keys())[:10])
+                # Особый случай: skuMinPriceInfoDTO может содержать цены
+                if key == 'skuMinPriceInfoDTO':
+                    logger.debug("🔍 Analyzing skuMinPriceInfoDTO structure...")
+                    # minPrice или authPrice могут содержать цену
+                    min_price = value.get('minPrice')
+                    auth_price = value.get('authPrice')
+                    sku_id_dto = value.get('skuId')
+                    logger.debug("minPrice: %s, authPrice: %s, skuId: %s", min_price, auth_price, sku_id_dto)
+                    if min_price and sku_id_dto:
+                        # Если minPrice - словарь
+                        if isinstance(min_price, dict):
+                            price_val = min_price.get('minUnitVal') or min_price.get('amount') or min_price.get('money')
+                            # Если minUnitVal - это число, используем его (уже в копейках)
+                            if isinstance(price_val, (int, float)) and price_val >= 1000:
+                                pass  # Уже в копейках
+                            elif isinstance(price_val, str):
+                                try:
+                                    price_val = float(price_val)
+                                    if price_val >= 1000:
+                                        price_val = int(price_val)  # Уже в копейках
+                                    else:
+                                        price_val = int(price_val * 100)  # В рублях, конвертируем
+                                except:
+                                    pass
+                        else:
+                            price_val = min_price
+                        if price_val:
+                            # Сохраняем только числовое значение, не словарь
+                            if isinstance(price_val, dict):
+                                # Сохраняем оригинальный словарь для извлечения
+                                price_dict = price_val
+                                price_val = price_dict.get('minUnitVal')
+                                if price_val is None:
+                                    amount = price_dict.get('amount')
+                                    if amount:
+                                        try:
+                                            amount_num = float(str(amount))
+                                            price_val = int(amount_num * 100) if amount_num < 1000 else int(amount_num)
+                                        except:
+                                            price_val = None
+                            if price_val:
+                                sku_price_mapping[sku_id_dto] = price_val
+                                logger.debug("✅ Mapped price from minPrice: skuId=%s, price=%s", sku_id_dto, price_val)
+                    if auth_price and sku_id_dto and sku_id_dto not in sku_price_mapping:
+                        if isinstance(auth_price, dict):
+                            price_val = auth_price.get('minUnitVal') or auth_price.get('amount') or auth_price.get('money')
+                            if isinstance(price_val, (int, float)) and price_val >= 1000:
+                                pass
+                            elif isinstance(price_val, str):
+                                try:
+                                    price_val = float(price_val)
+                                    if price_val >= 1000:
+                                        price_val = int(price_val)
+                                    else:
+                                        price_val = int(price_val * 100)
+                                except:
+                                    pass
+                        else:
+                            price_val = auth_price
+                        if price_val:
+                            sku_price_mapping[sku_id_dto] = price_val
+                            logger.debug("✅ Mapped price from authPrice: skuId=%s, price=%s", sku_id_dto, price_val)
                 
-                # Собираем все изображения, сохраняя порядок появления на странице
-                all_img_elements = []
-                for selector in gallery_selectors:
-                    img_tags = soup.select(selector)
-                    print(f"  Trying selector '{selector}': found {len(img_tags)} elements")
-                    for img in img_tags:
-                        skip_image = False
-                        skip_parent_keywords = ['outfit', 'naryad', 'наряд', 'lifestyle', 'style', 'look', 'wearing', 'worn']
-                        
-                        parent = img.find_parent()
-                        if parent:
-                            parent_classes = ' '.join(parent.get('class', [])).lower()
-                            parent_id = (parent.get('id') or '').lower()
+                # Особый случай: levelOneMinPriceSkus может содержать маппинг propertyValueId -> цены
+                # ВАЖНО: levelOneMinPriceSkus содержит цены для каждого propertyValueId (размера)
+                # Нужно связать propertyValueId -> price, затем propertyValueId -> SKU -> размер
+                elif key == 'levelOneMinPriceSkus':
+                    logger.debug("🔍 Analyzing levelOneMinPriceSkus structure...")
+                    prop_value_price_mapping = {}  # propertyValueId -> price
+                    for prop_value_id, price_info in value.items():
+                        logger.debug("propertyValueId=%s, price_info type=%s", prop_value_id, type(price_info))
+                        if isinstance(price_info, dict):
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug("price_info keys: %s", list(price_info.keys())[:10])
+                            # Ищем цену в структуре - minPrice может быть словарем
+                            min_price_obj = price_info.get('minPrice')
+                            price_val = None
                             
-                            if any(keyword in parent_classes or keyword in parent_id for keyword in skip_parent_keywords):
-                                skip_image = True
+                            # Детальное логирование для отладки
+                            if min_price_obj is not None:
+                                logger.debug("minPrice type: %s, value: %.200s", type(min_price_obj), min_price_obj)
+                            else:
+                                logger.warning("⚠️ minPrice is None for propertyValueId=%s", prop_value_id)
                             
-                            if not skip_image:
-                                ancestors = parent.find_parents()
-                                for ancestor in ancestors[:5]:
-                                    ancestor_classes = ' '.join(ancestor.get('class', [])).lower()
-                                    ancestor_id = (ancestor.get('id') or '').lower()
-                                    if any(keyword in ancestor_classes or keyword in ancestor_id for keyword in skip_parent_keywords):
-                                        skip_image = True
-                                        break
-                        
-                        if skip_image:
-                            print(f"    ⏭️ Skipping image from outfit/lifestyle section: {img.get('src', '')[:80]}...")
-                            continue
-                        
-                        # Ищем оригинальные изображения (не миниатюры)
-                        img_url = None
-                        
-                        # Проверяем data-атрибуты для оригинальных изображений (в приоритете)
-                        img_url = (img.get('data-original') or 
-                                  img.get('data-src-large') or 
-                                  img.get('data-full') or
-                                  img.get('data-url') or
-                                  img.get('data-original-src') or
-                                  img.get('data-lazy-src') or
-                                  img.get('data-src') or
-                                  img.get('src'))
-                        
-                        if img_url:
-                            # Пропускаем миниатюры, иконки, логотипы, AI-изображения
-                            img_url_lower = img_url.lower()
-                            skip_keywords = ['thumb', 'icon', 'placeholder', 'logo', 'avatar', 'default', 'ai/generate', 'ai_generate']
-                            if any(skip in img_url_lower for skip in skip_keywords):
-                                continue
+                            if min_price_obj is not None:
+                                if isinstance(min_price_obj, dict):
+                                    # Извлекаем minUnitVal из minPrice.money.minUnitVal (уже в копейках)
+                                    money_obj = min_price_obj.get('money', {})
+                                    if isinstance(money_obj, dict):
+                                        price_val = money_obj.get('minUnitVal')
+                                        if not price_val:
+                                            # Если нет minUnitVal, пробуем amount и конвертируем
+                                            amount = money_obj.get('amount')
+                                            if amount:
+                                                try:
+                                                    amount_num = float(str(amount))
+                                                    if amount_num >= 1000:
+                                                        price_val = int(amount_num)  # Уже в копейках
+                                                    else:
+                                                        price_val = int(amount_num * 100)  # В рублях
+                                                except:
+                                                    pass
+                                    
+                                    # Если не нашли в money, пробуем напрямую из minPrice
+                                    if not price_val:
+                                        price_val = min_price_obj.get('minUnitVal')
+                                        if not price_val:
+                                            amount = min_price_obj.get('amount')
+                                            if amount:
+                                                try:
+                                                    amount_num = float(str(amount))
+                                                    if amount_num >= 1000:
+                                                        price_val = int(amount_num)
+                                                    else:
+                                                        price_val = int(amount_num * 100)
+                                                except:
+                                                    pass
+                                elif isinstance(min_price_obj, (int, float)):
+                                    price_val = int(min_price_obj) if min_price_obj >= 1000 else int(min_price_obj * 100)
+                            else:
+                                # minPrice отсутствует - выводим предупреждение
+                                logger.warning("⚠️ No minPrice for propertyValueId=%s, checking authPrice...", prop_value_id)
                             
-                            # Нормализуем URL
-                            if img_url.startswith('//'):
-                                img_url = 'https:' + img_url
-                            elif img_url.startswith('/'):
-                                img_url = base_domain + img_url
+                            # Если не нашли, пробуем authPrice
+                            if not price_val:
+                                auth_price_obj = price_info.get('authPrice')
+                                if isinstance(auth_price_obj, dict):
+                                    price_val = auth_price_obj.get('minUnitVal') or auth_price_obj.get('amount')
+                                    if price_val and isinstance(price_val, (int, float)) and price_val < 1000:
+                                        price_val = int(price_val * 100)
+                                elif isinstance(auth_price_obj, (int, float)):
+                                    price_val = int(auth_price_obj) if auth_price_obj >= 1000 else int(auth_price_obj * 100)
                             
-                            if img_url.startswith('http'):
-                                # Сохраняем URL и позицию для сортировки
-                                if not any(item['url'] == img_url for item in all_img_elements):
-                                    all_img_elements.append({
-                                        'url': img_url,
-                                        'position': len(all_img_elements)
-                                    })
-                                    print(f"    Added image: {img_url[:80]}...")
-                
-                # Сортируем по порядку появления на странице и добавляем в found_urls
-                all_img_elements.sort(key=lambda x: x['position'])
-                for item in all_img_elements:
-                    if item['url'] not in found_urls:
-                        found_urls.append(item['url'])
-                
-                print(f"Found {len(found_urls)} images in HTML gallery")
+                            # Также пробуем skuId из price_info и сразу связываем
+                            sku_id_from_price_info = price_info.get('skuId') or price_info.get('sourceSkuId')
+                            
+                            if price_val:
+                                # Сохраняем маппинг propertyValueId -> price
+                                prop_value_price_mapping[str(prop_value_id)] = price_val
+                                logger.debug("✅ Found price in levelOneMinPriceSkus: propertyValueId=%s, price=%s копеек (%s ₽)", prop_value_id, price_val, price_val / 100)
+                                
+                                # Если есть skuId, сразу связываем (это самый надежный способ!)
+                                if sku_id_from_price_info:
+                                    sku_price_mapping[sku_id_from_price_info] = price_val
+                                    logger.debug("✅ Mapped price directly via skuId: propertyValueId=%s -> skuId=%s, price=%s копеек", prop_value_id, sku_id_from_price_info, price_val)
+                            else:
+                                # Если не нашли цену, но есть skuId, пробуем найти цену через другие пути
+                                if sku_id_from_price_info:
+                                    logger.warning("⚠️ No price found but skuId exists: %s, will try to find price later", sku_id_from_price_info)
+                        elif isinstance(price_info, (int, float, str)):
+                            # Возможно, прямое значение цены
+                            try:
+                                price_num = float(price_info)
+                                if price_num > 100:  # Разумная цена
+                                    price_val = int(price_num) if price_num >= 1000 else int(price_num * 100)
+                                    prop_value_price_mapping[str(prop_value_id)] = price_val
+                                    logger.debug("✅ Found direct price: propertyValueId=%s, price=%s", prop_value_id, price_val)
+                            except:
+                                pass
+                    
+                    # Теперь связываем propertyValueId -> SKU через properties
+                    if prop_value_price_mapping:
+                        logger.debug("🔗 Linking %s propertyValueId prices to SKUs...", len(prop_value_price_mapping))
+                        for sku_item in skus:
+                            sku_id = sku_item.get('skuId')
+                            sku_props = sku_item.get('properties', [])
+                            if isinstance(sku_props, list):
+                                for prop in sku_props:
+                                    if isinstance(prop, dict):
+                                        prop_id = prop.get('propertyValueId')
+                                        if prop_id:
+                                            prop_id_str = str(prop_id)
+                                            if prop_id_str in prop_value_price_mapping:
+                                                price_val = prop_value_price_mapping[prop_id_str]
+                                                if sku_id:
+                                                    # Если уже есть цена для этого skuId, обновляем только если новая отличается
+                                                    if sku_id in sku_price_mapping:
+                                                        existing_price = sku_price_mapping[sku_id]
+                                                        if price_val != existing_price:
+                                                            sku_price_mapping[sku_id] = price_val
+                                                            logger.debug("🔄 Updated price for skuId=%s: %s -> %s", sku_id, existing_price, price_val)
+                                                    else:
+                                                        sku_price_mapping[sku_id] = price_val
+                                                        logger.debug("✅ Linked: propertyValueId=%s -> skuId=%s, price=%s", prop_id_str, sku_id, price_val)
+    
+    # Также пробуем найти массив цен в product_data
+    price_list = None
+    base_price_money = None
+    if 'price' in product_data:
+        price_data = product_data['price']
+        logger.debug("price field type: %s", type(price_data))
+        if isinstance(price_data, dict):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("price dict keys: %s", list(price_data.keys())[:10])
+            # Возможно, цены в price.money (общая цена) или price.skuList
+            base_price_money = price_data.get('money')  # Общая цена в центах/копейках
+            if base_price_money:
+                logger.debug("Found base price money: %s", base_price_money)
+                # Если money - словарь, берем minUnitVal
+                if isinstance(base_price_money, dict):
+                    base_price_money = base_price_money.get('minUnitVal') or base_price_money.get('amount')
             
-            # Если все еще не нашли, ищем в JavaScript переменных
-            if len(found_urls) == 0:
-                print("Searching for images in JavaScript variables...")
-                script_tags = soup.find_all('script')
-                for script in script_tags:
-                    if script.string:
-                        # Ищем паттерны типа "image": "http://..." или imageUrls: [...]
-                        img_patterns = [
-                            re.compile(r'["\']image["\']\s*[:=]\s*["\']([^"\']+?)["\']', re.IGNORECASE),
-                            re.compile(r'["\']imageUrl["\']\s*[:=]\s*["\']([^"\']+?)["\']', re.IGNORECASE),
-                            re.compile(r'["\']url["\']\s*[:=]\s*["\']([^"\']+?\.(?:jpg|jpeg|png|webp))["\']', re.IGNORECASE),
-                        ]
-                        for pattern in img_patterns:
-                            matches = pattern.findall(script.string)
-                            for match in matches:
-                                if match.startswith('http') and match not in found_urls:
-                                    # Пропускаем миниатюры
-                                    if not any(skip in match.lower() for skip in ['thumb', 'icon', 'placeholder']):
-                                        found_urls.append(match)
-                                        print(f"    Found image in script: {match[:80]}...")
+            # Ищем список цен по SKU - расширенный поиск
+            price_list = (price_data.get('skuList') or 
+                         price_data.get('priceList') or
+                         price_data.get('list') or
+                         price_data.get('skus') or
+                         price_data.get('skuPrices') or
+                         price_data.get('skuPriceList') or
+                         price_data.get('priceMap') or
+                         price_data.get('skuPriceMap'))
             
-            print(f"Total found {len(found_urls)} image URLs before downloading")
+            # Если есть массив цен, строим маппинг
+            if price_list and isinstance(price_list, list):
+                logger.debug("Found price_list with %s items", len(price_list))
+                for price_item in price_list:
+                    if isinstance(price_item, dict):
+                        item_sku_id = price_item.get('skuId') or price_item.get('id') or price_item.get('sku')
+                        item_price = (price_item.get('money') or 
+                                    price_item.get('price') or 
+                                    price_item.get('salePrice') or
+                                    price_item.get('currentPrice') or
+                                    price_item.get('priceValue') or
+                                    price_item.get('priceInfo'))
+                        if item_price and item_sku_id:
+                            # Если price - словарь с minUnitVal
+                            if isinstance(item_price, dict):
+                                item_price = item_price.get('minUnitVal') or item_price.get('amount') or item_price.get('money')
+                                # Если minUnitVal - это число, используем его (уже в копейках)
+                                if isinstance(item_price, (int, float)) and item_price >= 1000:
+                                    pass  # Уже в копейках
+                                elif isinstance(item_price, str):
+                                    try:
+                                        item_price = float(item_price)
+                                        if item_price >= 1000:
+                                            item_price = int(item_price)  # Уже в копейках
+                                        else:
+                                            item_price = int(item_price * 100)  # В рублях, конвертируем
+                                    except:
+                                        pass
+                            if item_price:
+                                sku_price_mapping[item_sku_id] = item_price
+                                logger.debug("Mapped price from price_list: skuId=%s, price=%s", item_sku_id, item_price)
             
-            # Скачиваем и конвертируем изображения (пропускаем первое, фильтруем AI-изображения)
-            if found_urls:
-                # Фильтруем изображения: убираем AI-изображения, пропускаем первое (только если изображений больше 1)
-                images_to_download = []
-                ai_images = []
-                
-                # Сначала фильтруем AI-изображения
-                filtered_urls = []
-                for img_url in found_urls:
-                    img_url_lower = img_url.lower()
-                    if 'ai/generate' in img_url_lower or 'ai_generate' in img_url_lower:
-                        ai_images.append(img_url)
-                        print(f"  ⏭️ Skipping AI image: {img_url[:80]}...")
-                        continue
-                    filtered_urls.append(img_url)
+            # Также проверяем, может быть price_data - это словарь с ключами-скидками
+            if isinstance(price_data, dict):
+                # Ищем вложенные структуры с ценами
+                for key, value in price_data.items():
+                    if key != 'money' and isinstance(value, (list, dict)):
+                        if isinstance(value, list) and len(value) > 0:
+                            if isinstance(value[0], dict):
+                                # Возможно, это массив цен
+                                for item in value:
+                                    if isinstance(item, dict):
+                                        item_sku_id = item.get('skuId') or item.get('id')
+                                        item_price = item.get('price') or item.get('money')
+                                        if isinstance(item_price, dict):
+                                            item_price = item_price.get('minUnitVal') or item_price.get('amount')
+                                        if item_price and item_sku_id:
+                                            sku_price_mapping[item_sku_id] = item_price
+        elif isinstance(price_data, list):
+            price_list = price_data
+            logger.debug("price is a list with %s items", len(price_list))
+    
+    logger.debug("Size mapping has %s entries", len(size_mapping))
+    logger.debug("SKU price mapping has %s entries", len(sku_price_mapping))
+    
+    # Дополнительный поиск: проверяем, есть ли в product_data другие структуры с ценами
+    # Проверяем, все ли цены одинаковые (сначала извлекаем числовые значения)
+    unique_price_values = set()
+    for price_val in sku_price_mapping.values():
+        if isinstance(price_val, dict):
+            # Извлекаем minUnitVal или amount
+            num_val = price_val.get('minUnitVal')
+            if num_val is None:
+                amount = price_val.get('amount')
+                if amount:
+                    try:
+                        num_val = float(str(amount))
+                        if num_val < 1000:
+                            num_val = int(num_val * 100)
+                        else:
+                            num_val = int(num_val)
+                    except:
+                        pass
+            if num_val is not None:
+                unique_price_values.add(num_val)
+        elif isinstance(price_val, (int, float)):
+            unique_price_values.add(price_val)
+    
+    if len(sku_price_mapping) == 0 or len(unique_price_values) <= 1:
+        logger.warning("⚠️ All prices are the same or no prices found. Searching for individual prices...")
+        # Ищем все возможные места с ценами
+        for key, value in product_data.items():
+            if isinstance(value, (list, dict)):
+                # Пробуем найти структуры, которые могут содержать цены по SKU
+                if isinstance(value, list) and len(value) > 0:
+                    first_item = value[0]
+                    if isinstance(first_item, dict):
+                        # Проверяем, есть ли в элементах skuId и price
+                        has_sku_id = 'skuId' in first_item or 'id' in first_item
+                        has_price = any(price_key in first_item for price_key in ['price', 'money', 'minPrice', 'salePrice', 'currentPrice', 'priceInfo', 'minUnitVal'])
+                        if has_sku_id and has_price:
+                            logger.debug("🔍 Found potential price list in '%s' with %s items", key, len(value))
+                            for item in value:
+                                item_sku_id = item.get('skuId') or item.get('id')
+                                item_price = (item.get('price') or 
+                                            item.get('money') or
+                                            item.get('minPrice') or
+                                            item.get('salePrice') or
+                                            item.get('currentPrice') or
+                                            item.get('priceInfo'))
+                                if isinstance(item_price, dict):
+                                    item_price = item_price.get('minUnitVal') or item_price.get('amount') or item_price.get('money')
+                                    if isinstance(item_price, dict):
+                                        item_price = item_price.get('minUnitVal') or item_price.get('amount')
+                                if item_price and item_sku_id:
+                                    # Конвертируем цену в копейки, если нужно
+                                    if isinstance(item_price, (int, float)):
+                                        if item_price < 1000:
+                                            item_price = int(item_price * 100)
+                                        else:
+                                            item_price = int(item_price)
+                                    elif isinstance(item_price, str):
+                                        try:
+                                            price_num = float(item_price.replace(' ', '').replace(',', ''))
+                                            item_price = int(price_num * 100) if price_num < 1000 else int(price_num)
+                                        except:
+                                            continue
+                                    if item_sku_id not in sku_price_mapping or sku_price_mapping[item_sku_id] != item_price:
+                                        sku_price_mapping[item_sku_id] = item_price
+                                        logger.debug("✅ Found individual price: skuId=%s, price=%s копеек", item_sku_id, item_price)
+                elif isinstance(value, dict):
+                    # Пробуем найти вложенные структуры с ценами
+                    for sub_key, sub_value in value.items():
+                        if isinstance(sub_value, list) and len(sub_value) > 0:
+                            first_sub_item = sub_value[0]
+                            if isinstance(first_sub_item, dict):
+                                has_sku_id = 'skuId' in first_sub_item or 'id' in first_sub_item
+                                has_price = any(price_key in first_sub_item for price_key in ['price', 'money', 'minPrice', 'salePrice'])
+                                if has_sku_id and has_price:
+                                    logger.debug("🔍 Found potential price list in '%s.%s' with %s items", key, sub_key, len(sub_value))
+                                    for item in sub_value:
+                                        item_sku_id = item.get('skuId') or item.get('id')
+                                        item_price = (item.get('price') or 
+                                                    item.get('money') or
+                                                    item.get('minPrice') or
+                                                    item.get('salePrice'))
+                                        if isinstance(item_price, dict):
+                                            item_price = item_price.get('minUnitVal') or item_price.get('amount')
+                                        if item_price and item_sku_id:
+                                            if isinstance(item_price, (int, float)) and item_price < 1000:
+                                                item_price = int(item_price * 100)
+                                            if item_sku_id not in sku_price_mapping or sku_price_mapping[item_sku_id] != item_price:
+                                                sku_price_mapping[item_sku_id] = item_price
+                                                logger.debug("✅ Found individual price: skuId=%s, price=%s копеек", item_sku_id, item_price)
+    
+    if not size_mapping:
+        logger.warning("⚠️ No size mapping found in baseProperties, trying alternative approach...")
+    
+    for idx, sku in enumerate(skus):
+        # Извлекаем размер из properties через propertyValueId -> baseProperties маппинг
+        size = None
+        properties = sku.get('properties')
+        
+        if isinstance(properties, list):
+            # properties - список объектов с propertyValueId
+            for prop in properties:
+                if isinstance(prop, dict):
+                    property_value_id = prop.get('propertyValueId') or prop.get('id')
+                    if property_value_id:
+                        # Ищем значение размера в маппинге
+                        if property_value_id in size_mapping:
+                            size = size_mapping[property_value_id]
+                            logger.debug("SKU %s: Found size via mapping %s -> %s", idx + 1, property_value_id, size)
+                            break
+        
+        # Если не нашли через маппинг, пробуем извлечь из skuTitle (поддерживаем дроби ⅔, ⅓)
+        if not size:
+            sku_title = sku.get('skuTitle') or ''
+            # Ищем паттерн размера в конце названия (число с запятой/точкой или дробью)
+            if sku_title:
+                # Словарь для конвертации Unicode дробей в десятичные
+                fraction_map = {
+                    '⅓': 0.333, '⅔': 0.667, '⅛': 0.125, '⅜': 0.375,
+                    '⅝': 0.625, '⅞': 0.875, '¼': 0.25, '¾': 0.75, '½': 0.5
+                }
                 
-                # Если после фильтрации осталось только одно изображение, не пропускаем его
-                if len(filtered_urls) == 1:
-                    images_to_download = filtered_urls
-                    print(f"  ℹ️ Only 1 image found, not skipping it")
+                # Паттерн для размеров с дробями: "34⅔", "35⅓", "34 ⅔", "34⅔ (35⅓)" и т.д.
+                # Также поддерживаем обычные форматы: "43,5", "43.5"
+                # Сначала ищем дробь (может быть перед скобкой или в конце)
+                size_match = re.search(r'(\d+)\s*([⅓⅔⅛⅜⅝⅞¼¾½])(?:\s*\(|$)', sku_title.strip())
+                if size_match:
+                    whole = int(size_match.group(1))
+                    fraction_char = size_match.group(2)
+                    fraction_decimal = fraction_map.get(fraction_char, 0)
+                    size = f"{whole + fraction_decimal:.3f}".rstrip('0').rstrip('.')
+                    size = size.replace('.', ',')  # Заменяем точку на запятую
+                    logger.debug("SKU %s: Extracted size with fraction from skuTitle: '%s' (was: %s%s)", idx + 1, size, whole, fraction_char)
                 else:
-                    # Пропускаем первое изображение только если изображений больше 1
-                    for idx, img_url in enumerate(filtered_urls):
-                        if idx == 0:
-                            print(f"  ⏭️ Skipping first image: {img_url[:80]}...")
-                            continue
-                        images_to_download.append(img_url)
-                        if len(images_to_download) >= 10:
+                    # Ищем паттерн типа "43,5" или "43.5" в конце строки
+                    size_match = re.search(r'(\d+[,.]?\d*)\s*$', sku_title.strip())
+                    if size_match:
+                        size = size_match.group(1).replace('.', ',')  # Заменяем точку на запятую
+                        logger.debug("SKU %s: Extracted size from skuTitle: '%s'", idx + 1, size)
+        
+        # Если не нашли размер в properties, пробуем другие поля
+        if not size:
+            size = (sku.get('size') or 
+                   sku.get('sizeName') or 
+                   sku.get('specValue') or
+                   sku.get('sizeValue') or
+                   sku.get('sizeText') or
+                   sku.get('sizeLabel') or
+                   sku.get('sizeNameCn') or
+                   sku.get('sizeNameEn'))
+        
+        # Если размер все еще содержит название товара, извлекаем только числовую часть
+        if size and len(size) > 10:
+            # Словарь для конвертации Unicode дробей
+            fraction_map = {
+                '⅓': 0.333, '⅔': 0.667, '⅛': 0.125, '⅜': 0.375,
+                '⅝': 0.625, '⅞': 0.875, '¼': 0.25, '¾': 0.75, '½': 0.5
+            }
+            
+            # Пробуем найти размер с дробью
+            size_match = re.search(r'(\d+)\s*([⅓⅔⅛⅜⅝⅞¼¾½])(?:\s*\(|$)', size.strip())
+            if size_match:
+                whole = int(size_match.group(1))
+                fraction_char = size_match.group(2)
+                fraction_decimal = fraction_map.get(fraction_char, 0)
+                size = f"{whole + fraction_decimal:.3f}".rstrip('0').rstrip('.')
+                size = size.replace('.', ',')
+                logger.debug("SKU %s: Cleaned size with fraction to: '%s'", idx + 1, size)
+            else:
+                # Пробуем найти число в конце
+                size_match = re.search(r'(\d+[,.]?\d*)\s*$', size.strip())
+                if size_match:
+                    size = size_match.group(1).replace('.', ',')
+                    logger.debug("SKU %s: Cleaned size to: '%s'", idx + 1, size)
+        
+        # Ищем цену для этого SKU
+        price_value = None
+        sku_id = sku.get('skuId')
+        
+        # Сначала пробуем найти цену в маппинге цен по SKU
+        if sku_id and sku_id in sku_price_mapping:
+            price_value_raw = sku_price_mapping[sku_id]
+            # Если price_value_raw - словарь, извлекаем minUnitVal (уже в копейках)
+            if isinstance(price_value_raw, dict):
+                price_value = price_value_raw.get('minUnitVal')
+                if price_value is None:
+                    # Если нет minUnitVal, пробуем amount и конвертируем
+                    amount = price_value_raw.get('amount') or price_value_raw.get('money')
+                    if amount:
+                        try:
+                            amount_num = float(str(amount))
+                            if amount_num >= 1000:
+                                price_value = int(amount_num)  # Уже в копейках
+                            else:
+                                price_value = int(amount_num * 100)  # В рублях
+                        except:
+                            price_value = None
+                elif isinstance(price_value, str):
+                    try:
+                        price_val_num = float(price_value)
+                        if price_val_num >= 1000:
+                            price_value = int(price_val_num)
+                        else:
+                            price_value = int(price_val_num * 100)
+                    except:
+                        price_value = None
+            else:
+                price_value = price_value_raw
+            logger.debug("SKU %s: Found price in mapping: %s (type: %s)", idx + 1, price_value, type(price_value))
+        else:
+            # Пробуем найти цену в самом SKU - расширенный поиск
+            price_value = (sku.get('price') or 
+                         sku.get('salePrice') or 
+                         sku.get('currentPrice') or
+                         sku.get('priceValue') or
+                         sku.get('lowPrice') or
+                         sku.get('highPrice') or
+                         sku.get('money'))
+            
+            # Если price - словарь с money/minUnitVal
+            if isinstance(price_value, dict):
+                price_value = price_value.get('minUnitVal') or price_value.get('amount') or price_value.get('money')
+            
+            # Пробуем найти в priceInfo
+            if not price_value:
+                price_info = sku.get('priceInfo')
+                if isinstance(price_info, dict):
+                    price_value = (price_info.get('money') or
+                                 price_info.get('price') or
+                                 price_info.get('salePrice') or
+                                 price_info.get('currentPrice'))
+                    if isinstance(price_value, dict):
+                        price_value = price_value.get('minUnitVal') or price_value.get('amount')
+            
+            # Если не нашли, пробуем найти в price_list по skuId
+            if not price_value and price_list and isinstance(price_list, list) and sku_id:
+                for price_item in price_list:
+                    if isinstance(price_item, dict):
+                        if price_item.get('skuId') == sku_id or price_item.get('id') == sku_id:
+                            # Цена может быть в price_item.money или напрямую
+                            price_value = (price_item.get('money') or
+                                         price_item.get('price') or 
+                                         price_item.get('salePrice') or
+                                         price_item.get('currentPrice') or
+                                         price_item.get('priceValue'))
+                            # Если price - словарь
+                            if isinstance(price_value, dict):
+                                price_value = price_value.get('minUnitVal') or price_value.get('amount')
+                            if price_value:
+                                logger.debug("SKU %s: Found price in price_list: %s", idx + 1, price_value)
                             break
-                
-                # Если реальных изображений мало, добавляем AI-изображения в конец
-                if len(images_to_download) < 5 and ai_images:
-                    print(f"  ⚠️ Only {len(images_to_download)} real images found, adding {len(ai_images)} AI images...")
-                    for ai_img in ai_images[:5]:
-                        if len(images_to_download) >= 10:
+            
+            # Если не нашли, пробуем найти в product_data по skuId (может быть отдельный массив)
+            if not price_value and sku_id:
+                # Ищем во всех массивах product_data
+                for key, value in product_data.items():
+                    if isinstance(value, list) and len(value) > 0:
+                        for item in value:
+                            if isinstance(item, dict):
+                                item_sku_id = item.get('skuId') or item.get('id')
+                                if item_sku_id == sku_id:
+                                    item_price = (item.get('price') or 
+                                                item.get('money') or
+                                                item.get('salePrice') or
+                                                item.get('currentPrice'))
+                                    if isinstance(item_price, dict):
+                                        item_price = item_price.get('minUnitVal') or item_price.get('amount')
+                                    if item_price:
+                                        price_value = item_price
+                                        logger.debug("SKU %s: Found price in product_data['%s']: %s", idx + 1, key, price_value)
+                                        break
+                            if price_value:
+                                break
+                        if price_value:
                             break
-                        images_to_download.append(ai_img)
-                max_images = len(images_to_download)
+        
+        # Если не нашли напрямую, пробуем вложенные структуры
+        if not price_value and isinstance(sku, dict):
+            price_info = sku.get('priceInfo') or sku.get('price')
+            if isinstance(price_info, dict):
+                price_value = (price_info.get('money') or
+                             price_info.get('price') or 
+                             price_info.get('salePrice') or
+                             price_info.get('currentPrice'))
+        
+        # Сохраняем размер даже если нет цены (будет "-")
+        if size:
+            try:
+                # Цена может быть в разных форматах
+                price_cents = None
+                
+                if isinstance(price_value, dict):
+                    # Если это словарь, извлекаем minUnitVal (уже в копейках)
+                    price_cents = price_value.get('minUnitVal')
+                    if price_cents is None:
+                        # Если нет minUnitVal, пробуем amount и конвертируем
+                        amount = price_value.get('amount')
+                        if amount:
+                            try:
+                                amount_num = float(str(amount))
+                                if amount_num >= 1000:
+                                    price_cents = int(amount_num)  # Уже в копейках
+                                else:
+                                    price_cents = int(amount_num * 100)  # В рублях
+                            except:
+                                pass
                 
-                for idx, img_url in enumerate(images_to_download, 1):
-                    print(f"Downloading image {idx}/{max_images}: {img_url[:80]}...")
-                    img_base64 = await download_image_to_base64(img_url, client)
-                    if img_base64:
-                        images.append(img_base64)
-                        print(f"  Successfully downloaded image {idx}")
+                elif isinstance(price_value, (int, float)):
+                    # Если число большое (>= 1000), возможно это уже в копейках
+                    if price_value >= 1000:
+                        price_cents = int(price_value)
                     else:
-                        print(f"  Failed to download image {idx}")
-            
-            # Если images уже содержит URL (из __NEXT_DATA__), нужно их скачать
-            if images and all(isinstance(img, str) and img.startswith('http') for img in images):
-                downloaded_images = []
-                # Пропускаем первое, скачиваем остальные
-                images_to_download = images[1:11] if len(images) > 1 else []
-                for idx, img_url in enumerate(images_to_download, 1):
-                    print(f"Downloading image {idx}/{len(images_to_download)}: {img_url[:80]}...")
-                    img_base64 = await download_image_to_base64(img_url, client)
-                    if img_base64:
-                        downloaded_images.append(img_base64)
-                        print(f"  Successfully downloaded image {idx}")
+                        price_cents = int(price_value * 100)  # Предполагаем рубли
+                else:
+                    # Строка - парсим
+                    price_str = str(price_value).replace(' ', '').replace(',', '').replace('₽', '').replace('₴', '')
+                    price_num = float(re.sub(r'[^\d.]', '', price_str))
+                    if price_num >= 1000:
+                        price_cents = int(price_num)
                     else:
-                        print(f"  Failed to download image {idx}")
-                images = downloaded_images
-            
-            print(f"Downloaded {len(images)} images")
-            
-            # Используем ТОЛЬКО Selenium для парсинга размеров и цен (как просил пользователь)
-            # Если у нас уже есть sizes_prices из __NEXT_DATA__ но все цены одинаковые, 
-            # или если размеры вообще не найдены, используем Selenium
-            need_selenium = False
-            need_html_search = False
-            if sizes_prices:
-                # Проверяем, все ли цены одинаковые
-                unique_prices = set(item['price'] for item in sizes_prices if item['price'] is not None)
-                if len(unique_prices) == 1:
-                    need_selenium = True
-                    need_html_search = True
-                    print(f"  ⚠️ All sizes have the same price ({list(unique_prices)[0]}), trying to find individual prices...")
+                        price_cents = int(price_num * 100)
+                
+                if price_cents and 100 <= price_cents <= 10000000:  # Разумный диапазон
+                    sizes_prices.append({
+                        'size': str(size),
+                        'price': price_cents
+                    })
+                    logger.debug("SKU %s: size=%s, price=%s копеек", idx + 1, size, price_cents)
+                else:
+                    # Если цена не найдена или невалидна, сохраняем размер с "-"
+                    sizes_prices.append({
+                        'size': str(size),
+                        'price': None  # Будет отображаться как "-"
+                    })
+                    logger.debug("SKU %s: size=%s, price=None (no price available)", idx + 1, size)
+            except Exception as e:
+                # Если произошла ошибка при парсинге цены, все равно сохраняем размер
+                sizes_prices.append({
+                    'size': str(size),
+                    'price': None
+                })
+                logger.debug("SKU %s: size=%s, price=None (error parsing price: %s)", idx + 1, size, e)
+        elif size:
+            # Если размер есть, но цена не найдена, сохраняем с "-"
+            sizes_prices.append({
+                'size': str(size),
+                'price': None
+            })
+            logger.debug("SKU %s: size=%s, price=None (no price found)", idx + 1, size)
+    
+    if not sizes_prices:
+        logger.warning("⚠️ SKUs list found but no valid sizes parsed (skus count: %s)", len(skus))
+        # Выводим структуру для отладки
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("First SKU structure (keys): %s", list(skus[0].keys())[:10])
+        return None
+    
+    # Минимальная цена (только из размеров с ценой)
+    prices_with_values = [item['price'] for item in sizes_prices if item['price'] is not None]
+    if prices_with_values:
+        min_price = min(prices_with_values)
+        ctx.sku_price = min_price
+    else:
+        # Если нет ни одной цены, используем базовую
+        ctx.sku_price = base_price_money if base_price_money else None
+    
+    logger.debug("✅ Found %s sizes from __NEXT_DATA__", len(sizes_prices))
+    return sizes_prices
+
+
+@strategy('sizes', 'html_text')
+def _sizes_from_html_text(ctx: PageContext) -> Optional[list]:
+    """
+    Агрессивный поиск пар размер/цена в тексте страницы, когда размеров из SKU нет
+    или у всех одна цена. Цены из HTML дополняют и уточняют размеры из SKU.
+    """
+    sizes_prices = ctx.values.get('sizes') or []
+    unique_prices = set(item['price'] for item in sizes_prices if item['price'] is not None)
+    if sizes_prices:
+        logger.warning("⚠️ All sizes have the same price (%s), trying to find individual prices...", list(unique_prices)[0])
+    else:
+        logger.warning("⚠️ No sizes found in __NEXT_DATA__, trying alternative methods...")
+    
+    logger.debug("🔍 Trying aggressive HTML text search for size-price pairs...")
+    html_sizes_prices = _extract_sizes_prices_from_html(ctx.page.text)
+    if not html_sizes_prices:
+        return None
+    unique_html_prices = set(item['price'] for item in html_sizes_prices if item['price'] is not None)
+    if len(unique_html_prices) <= 1:  # Нужны разные цены
+        return None
+    logger.debug("✅ Found %s size-price pairs from HTML (with %s different prices)", len(html_sizes_prices), len(unique_html_prices))
+    # Объединяем размеры из HTML с размерами из __NEXT_DATA__, приоритет у HTML (если есть цена)
+    # Создаем словарь для быстрого поиска размеров из HTML
+    html_sizes_dict = {item['size']: item for item in html_sizes_prices}
+    
+    # Если все цены были одинаковые, то размеры, которых нет в HTML, должны получить None
+    all_same_price = len(unique_prices) == 1 if sizes_prices else False
+    base_price = list(unique_prices)[0] if unique_prices else None
+    
+    # Обновляем цены в существующих размерах из __NEXT_DATA__
+    for item in sizes_prices:
+        size_key = item['size']
+        if size_key in html_sizes_dict:
+            html_item = html_sizes_dict[size_key]
+            # Обновляем цену, если в HTML есть цена
+            if html_item['price'] is not None:
+                item['price'] = html_item['price']
+                logger.debug("✅ Updated price for size %s from HTML: %s ₽", size_key, html_item['price'] / 100)
+        elif all_same_price and item['price'] == base_price:
+            # Если размер не найден в HTML и все цены были одинаковые, ставим None
+            item['price'] = None
+            logger.warning("⚠️ Size %s not found in HTML, setting price to None", size_key)
+    
+    # Добавляем размеры из HTML, которых нет в __NEXT_DATA__
+    existing_sizes = {item['size'] for item in sizes_prices}
+    for html_item in html_sizes_prices:
+        if html_item['size'] not in existing_sizes:
+            sizes_prices.append(html_item)
+            logger.debug("✅ Added size %s from HTML", html_item['size'])
+    return sizes_prices
+
+
+@strategy('price', 'next_data_skus')
+def _price_from_skus(ctx: PageContext) -> Optional[int]:
+    """Минимальная цена размеров из __NEXT_DATA__ (ее находит стратегия размеров)"""
+    return ctx.sku_price
+
+
+@strategy('price', 'next_data_main')
+def _price_from_next_data(ctx: PageContext) -> Optional[int]:
+    """Основная цена товара из __NEXT_DATA__"""
+    product_data = ctx.product_data
+    if not product_data:
+        return None
+    price = None
+    price_value = None
+    price_data = product_data.get('price')
+    
+    # Если price - словарь, ищем цену внутри (в логах видели 'money')
+    if isinstance(price_data, dict):
+        price_value = (price_data.get('money') or  # Основная цена в центах/копейках
+                     price_data.get('price') or 
+                     price_data.get('salePrice') or
+                     price_data.get('currentPrice') or
+                     price_data.get('lowPrice') or
+                     price_data.get('minPrice') or
+                     price_data.get('maxPrice'))
+    elif isinstance(price_data, (int, float)):
+        price_value = price_data
+    elif price_data is None:
+        # Пробуем другие поля
+        price_value = (product_data.get('salePrice') or
+                     product_data.get('currentPrice') or
+                     product_data.get('lowPrice'))
+    
+    if price_value:
+        try:
+            if isinstance(price_value, (int, float)):
+                # Проверяем разумность
+                if price_value > 100000:
+                    logger.warning("⚠️ Main price too large (%s), skipping", price_value)
+                elif price_value >= 1000:
+                    price = int(price_value)  # Уже в копейках
+                else:
+                    price = int(price_value * 100)
             else:
-                need_selenium = True
-                need_html_search = True
-                print(f"  ⚠️ No sizes found in __NEXT_DATA__, trying alternative methods...")
-            
-            # Сначала пробуем агрессивный поиск в HTML
-            if need_html_search:
-                print(f"  🔍 Trying aggressive HTML text search for size-price pairs...")
-                html_sizes_prices = _extract_sizes_prices_from_html(soup, response.text, response.text)
-                if html_sizes_prices:
-                    unique_html_prices = set(item['price'] for item in html_sizes_prices if item['price'] is not None)
-                    if len(unique_html_prices) > 1:  # Если нашли разные цены
-                        print(f"  ✅ Found {len(html_sizes_prices)} size-price pairs from HTML (with {len(unique_html_prices)} different prices)")
-                        # Объединяем размеры из HTML с размерами из __NEXT_DATA__, приоритет у HTML (если есть цена)
-                        # Создаем словарь для быстрого поиска размеров из HTML
-                        html_sizes_dict = {item['size']: item for item in html_sizes_prices}
-                        
-                        # Если все цены были одинаковые, то размеры, которых нет в HTML, должны получить None
-                        all_same_price = len(unique_prices) == 1 if sizes_prices else False
-                        base_price = list(unique_prices)[0] if unique_prices else None
-                        
-                        # Обновляем цены в существующих размерах из __NEXT_DATA__
-                        for item in sizes_prices:
-                            size_key = item['size']
-                            if size_key in html_sizes_dict:
-                                html_item = html_sizes_dict[size_key]
-                                # Обновляем цену, если в HTML есть цена
-                                if html_item['price'] is not None:
-                                    item['price'] = html_item['price']
-                                    print(f"    ✅ Updated price for size {size_key} from HTML: {html_item['price']/100} ₽")
-                            elif all_same_price and item['price'] == base_price:
-                                # Если размер не найден в HTML и все цены были одинаковые, ставим None
-                                item['price'] = None
-                                print(f"    ⚠️ Size {size_key} not found in HTML, setting price to None")
-                        
-                        # Добавляем размеры из HTML, которых нет в __NEXT_DATA__
-                        existing_sizes = {item['size'] for item in sizes_prices}
-                        for html_item in html_sizes_prices:
-                            if html_item['size'] not in existing_sizes:
-                                sizes_prices.append(html_item)
-                                print(f"    ✅ Added size {html_item['size']} from HTML")
-                        
-                        need_selenium = False  # Не нужно использовать Selenium, если нашли в HTML
+                price_str = str(price_value).replace(' ', '').replace(',', '')
+                price_num = float(re.sub(r'[^\d.]', '', price_str))
+                if price_num > 100000:
+                    logger.warning("⚠️ Main price too large (%s руб), skipping", price_num)
+                elif price_num >= 1000:
+                    price = int(price_num)
+                else:
+                    price = int(price_num * 100)
+        except Exception as e:
+            logger.error("❌ Error parsing main price: %s", e)
+            pass
+    return price
+
+
+@strategy('price', 'selector')
+def _price_from_selector(ctx: PageContext) -> Optional[int]:
+    """Цена по CSS-селекторам"""
+    page = ctx.page
+    price = None
+    price_selectors = [
+        '.product-price',
+        '.price',
+        '.goods-price',
+        '.product__price',
+        '.price-value',
+        '.product-price-value',
+        '[class*="price"]',
+        '[class*="Price"]',
+        '[class*="PRICE"]',
+        '[data-price]',
+        '[class*="amount"]',
+        '[class*="Amount"]',
+        '[class*="cost"]',
+        '[class*="Cost"]',
+        '.current-price',
+        '.price-current',
+        '.price__current',
+        '[itemprop="price"]',
+        '[data-value]',
+        '.sale-price',
+        '.final-price'
+    ]
+
+    for selector in price_selectors:
+        price_elems = page.soup.select(selector)
+        for price_elem in price_elems:
+            price_text = price_elem.get_text(strip=True)
+            if not price_text:
+                # Пробуем атрибуты
+                price_text = price_elem.get('data-price') or price_elem.get('data-value') or price_elem.get('content') or ''
+        
+            if price_text:
+                # Извлекаем число из цены (удаляем символы валют)
+                # Поддерживаем разные форматы: "12 345 ₽", "12345₽", "12,345", "12.345"
+                price_text_clean = re.sub(r'[^\d.,]', '', price_text.replace(',', '').replace(' ', ''))
+                if price_text_clean:
+                    try:
+                        price_num = float(price_text_clean.replace(',', '.'))
+                        # Проверяем разумность цены (от 100 рублей до 1 млн)
+                        if 100 <= price_num <= 1000000:
+                            price_rub = int(price_num * 100)  # в копейках
+                            price = price_rub
+                            logger.debug("Found price with selector '%s': %s -> %s копеек", selector, price_text, price_rub)
+                            break
+                        elif price_num < 100:  # Если цена меньше 100, возможно это юани
+                            price_rub = int(price_num * 12.5 * 100)  # в копейках
+                            if price_rub >= 10000:  # Проверяем разумность после конвертации
+                                price = price_rub
+                                logger.debug("Found price (yuan->rub) with selector '%s': %s -> %s копеек", selector, price_text, price_rub)
+                                break
+                    except Exception as e:
+                        logger.warning("Error parsing price '%s': %s", price_text, e)
+                        pass
+        if price:
+            break
+    return price
+
+
+@strategy('price', 'json_ld')
+def _price_from_json_ld(ctx: PageContext) -> Optional[int]:
+    """Цена из offers в JSON-LD"""
+    page = ctx.page
+    price = None
+    # Ищем JSON-LD с данными товара
+    for json_ld in page.soup.find_all('script', type='application/ld+json'):
+        try:
+            import json
+            data = json.loads(json_ld.string)
+            # Поддерживаем как объект, так и массив
+            if isinstance(data, list) and len(data) > 0:
+                data = data[0]
             
+            if isinstance(data, dict):
+                offers = data.get('offers', {})
+                if isinstance(offers, dict) and 'price' in offers:
+                    price_num = float(offers['price'])
+                    if 100 <= price_num <= 1000000:
+                        price_rub = int(price_num * 100)
+                        price = price_rub
+                        logger.debug("Found price in JSON-LD offers: %s копеек", price_rub)
+                        break
+                    elif price_num < 100:
+                        price_rub = int(price_num * 12.5 * 100)
+                        if price_rub >= 10000:
+                            price = price_rub
+                            logger.debug("Found price (yuan->rub) in JSON-LD: %s копеек", price_rub)
+                            break
+        except Exception as e:
+            logger.warning("Error parsing JSON-LD: %s", e)
+            pass
+    return price
+
+
+@strategy('price', 'meta')
+def _price_from_meta(ctx: PageContext) -> Optional[int]:
+    """Цена из meta product:price:amount"""
+    page = ctx.page
+    price = None
+    meta_price = page.soup.find('meta', property='product:price:amount')
+    if meta_price:
+        try:
+            price_num = float(meta_price.get('content', ''))
+            if 100 <= price_num <= 1000000:
+                price_rub = int(price_num * 100)
+                price = price_rub
+                logger.debug("Found price in meta product:price:amount: %s копеек", price_rub)
+        except:
+            pass
+    return price
+
+
+@strategy('price', 'text_regex')
+def _price_from_text_regex(ctx: PageContext) -> Optional[int]:
+    """Последняя попытка - числа рядом с символом рубля в тексте страницы"""
+    page = ctx.page
+    price = None
+    # Ищем числа от 1000 до 100000 с символом рубля рядом
+    price_patterns = [
+        re.compile(r'(\d{1,3}(?:\s?\d{3})*(?:[.,]\d{2})?)\s*[₽₴]', re.IGNORECASE),
+        re.compile(r'(\d{1,3}(?:\s?\d{3})*(?:[.,]\d{2})?)\s*(?:руб|RUB)', re.IGNORECASE),
+        re.compile(r'price["\']?\s*[:=]\s*["\']?(\d{1,3}(?:\s?\d{3})*(?:[.,]\d{2})?)', re.IGNORECASE),
+    ]
+    
+    page_text = page.soup.get_text()
+    for pattern in price_patterns:
+        matches = pattern.findall(page_text)
+        for match in matches[:5]:  # Проверяем первые 5 совпадений
+            try:
+                price_text_clean = match.replace(' ', '').replace(',', '.')
+                price_num = float(price_text_clean)
+                if 1000 <= price_num <= 100000:
+                    price_rub = int(price_num * 100)
+                    price = price_rub
+                    logger.debug("Found price with regex pattern: %s -> %s копеек", match, price_rub)
+                    break
+            except:
+                pass
+        if price:
+            break
+    return price
+
+
+# Ключи данных товара, от которых зависят размеры и цены (цены, SKU, свойства размеров)
+_PRICE_KEY_RE = re.compile(r'price|sku|size|propert', re.IGNORECASE)
+
+
+def content_hash(value: Any) -> str:
+    """Короткий устойчивый хэш JSON-значения (ключи словарей сортируются)"""
+    if orjson is not None:
+        raw = orjson.dumps(value, option=orjson.OPT_SORT_KEYS, default=str)
+    else:
+        raw = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def _next_data_price_hash(ctx: PageContext) -> Optional[str]:
+    """
+    Хэш части __NEXT_DATA__, из которой берутся размеры и цены: список SKU, ценовые и
+    размерные ключи данных товара и priceInfo. None, если SKU в __NEXT_DATA__ нет
+    (размеры тогда ищутся в HTML, и сравнивать можно только результат разбора).
+    """
+    skus = ctx.values.get('skus')
+    if not ctx.product_data or not (isinstance(skus, list) and skus):
+        return None
+    subtree = {
+        'skus': skus,
+        'product': {key: value for key, value in ctx.product_data.items() if _PRICE_KEY_RE.search(str(key))},
+        'priceInfo': ctx.page_props.get('priceInfo'),
+    }
+    return 'n:' + content_hash(subtree)
+
+
+def extract_product_page(
+    html: Union[bytes, str],
+    url: str,
+    prices_only: bool = False,
+    known_price_hash: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Разбор HTML страницы товара без сетевых запросов.
+    Только CPU-работа (__NEXT_DATA__, регулярные выражения, при необходимости DOM), поэтому
+    parse_poizon_product выполняет ее в пуле процессов. Каждое поле извлекается цепочкой
+    стратегий (app/utils/poizon_strategies.py) до первой успешной, поэтому DOM строится,
+    только если до запасных стратегий по HTML дошло дело.
+    Возвращает название, базовую цену, размеры, ссылки на изображения для скачивания,
+    признак need_selenium, категорию из хлебных крошек и замеры стратегий (strategy_timings).
+    prices_only=True пропускает поиск названия, изображений и категории (обновление цен).
+    price_hash - хэш ценовой части __NEXT_DATA__ (None, если SKU там нет); если он совпал
+    с known_price_hash, разбор размеров и цен не выполняется и возвращается unchanged=True.
+    """
+    ctx = PageContext(PageSource(html), url, poizon_client.base_domain(url), prices_only)
+    
+    # Вырезаем __NEXT_DATA__ прямо из HTML (там все данные товара), без DOM
+    if ctx.next_data:
+        logger.debug("✅ Found __NEXT_DATA__ script with product data")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("__NEXT_DATA__ keys: %s", list(ctx.next_data.keys())[:10])
+    else:
+        logger.warning("⚠️ __NEXT_DATA__ script not found in HTML!")
+    
+    product_data = run_chain('product', ctx)
+    if product_data:
+        logger.debug("✅ Found product_data in __NEXT_DATA__")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("product_data keys (first 30): %s", list(product_data.keys())[:30])
+        _remember_next_data_path(ctx, 'product', product_data)
+        skus = run_chain('skus', ctx)
+        if skus and isinstance(skus, list):
+            _remember_next_data_path(ctx, 'skus', skus)
+    
+    price_hash = _next_data_price_hash(ctx)
+    if prices_only and price_hash is not None and price_hash == known_price_hash:
+        logger.info("Price data unchanged, skipping extraction")
+        return {'unchanged': True, 'price_hash': price_hash, 'strategy_timings': ctx.timings}
+    
+    title = None if prices_only else _clean_title(run_chain('title', ctx))
+    sizes_prices = run_chain('sizes', ctx, accept=_sizes_complete) or []
+    price = run_chain('price', ctx)
+    # Пустой список из __NEXT_DATA__ (одно изображение) - тоже ответ, в HTML не ищем
+    image_urls = [] if prices_only else (run_chain('images', ctx, accept=lambda urls: urls is not None) or [])
+    extracted_category = None if prices_only else run_chain('category', ctx)
+    
+    # Сводка по стратегиям за запуск пишется на INFO (poizon_strategies.format_stats), по странице - только DEBUG
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Extraction strategies: %s", ", ".join(f"{field}={name}" for field, name, hit, _ in ctx.timings if hit))
+    
+    return {
+        'title': title,
+        'price': price,
+        'sizes_prices': sizes_prices,
+        'image_urls': image_urls,
+        # Selenium нужен, если размеров нет или у всех одна цена
+        'need_selenium': not _sizes_complete(sizes_prices),
+        'extracted_category': extracted_category,
+        'price_hash': price_hash,
+        'strategy_timings': ctx.timings
+    }
+
+
+def _size_sort_key(item: Dict[str, Any]) -> float:
+    size_str = item['size'].split('(')[0].strip()  # Берем только RU размер
+    try:
+        # Поддерживаем дроби в размерах (⅔, ⅓ и т.д.)
+        # Словарь для конвертации Unicode дробей
+        fraction_map = {
+            '⅓': 0.333, '⅔': 0.667, '⅛': 0.125, '⅜': 0.375,
+            '⅝': 0.625, '⅞': 0.875, '¼': 0.25, '¾': 0.75, '½': 0.5
+        }
+        
+        # Ищем дробь в размере
+        fraction_match = re.search(r'(\d+)\s*([⅓⅔⅛⅜⅝⅞¼¾½])', size_str)
+        if fraction_match:
+            whole = int(fraction_match.group(1))
+            fraction_char = fraction_match.group(2)
+            fraction_decimal = fraction_map.get(fraction_char, 0)
+            return whole + fraction_decimal
+        
+        # Обычный формат с запятой/точкой
+        return float(size_str.replace(',', '.'))
+    except:
+        return 0
+
+
+def _build_sizes_description(sizes_prices: list) -> Tuple[list, str]:
+    """Убирает дубликаты размеров, сортирует их и формирует описание "Размеры и цены" """
+    if not sizes_prices:
+        logger.debug("No sizes found, description will be empty")
+        return [], ""
+    
+    # Убираем дубликаты размеров - группируем по размеру и берем один вариант (с минимальной ценой или первый)
+    unique_sizes = {}
+    for item in sizes_prices:
+        size = item['size']
+        size_price = item['price']
+        
+        if size not in unique_sizes:
+            unique_sizes[size] = item
+        else:
+            # Если уже есть такой размер, выбираем вариант с ценой (если есть) или с минимальной ценой
+            existing = unique_sizes[size]
+            if size_price is not None:
+                if existing['price'] is None:
+                    # Заменяем на вариант с ценой
+                    unique_sizes[size] = item
+                elif size_price < existing['price']:
+                    # Берем вариант с минимальной ценой
+                    unique_sizes[size] = item
+            # Если оба без цены или текущий без цены, оставляем существующий
+    
+    sizes_prices = list(unique_sizes.values())
+    logger.debug("📊 Removed duplicates, %s unique sizes", len(sizes_prices))
+    
+    # Сортируем размеры от меньшего к большему
+    sizes_prices.sort(key=_size_sort_key)
+    logger.debug("📊 Sorted %s sizes from smallest to largest", len(sizes_prices))
+    
+    description_lines = ["Размеры и цены:"]
+    for item in sizes_prices:
+        if item['price'] is not None:
+            price_rub = item['price'] / 100
+            description_lines.append(f"{item['size']}: {price_rub:,.0f} ₽")
+        else:
+            description_lines.append(f"{item['size']}: -")
+    logger.debug("Created description with %s sizes", len(sizes_prices))
+    return sizes_prices, "\n".join(description_lines)
+
+
+def _select_final_price(sizes_prices: list, base_price: Optional[int], title: Optional[str]) -> int:
+    """Минимальная цена среди размеров с ценой, иначе базовая цена страницы"""
+    prices_with_values = [item['price'] for item in sizes_prices if item['price'] is not None]
+    if prices_with_values:
+        final_price = min(prices_with_values)
+        logger.debug("Using minimum size price: %s копеек (from %s sizes with prices, %s total sizes)", final_price, len(prices_with_values), len(sizes_prices))
+        return final_price
+    if base_price and base_price > 0:
+        if sizes_prices:
+            logger.debug("No prices found in sizes, using base price: %s копеек", base_price)
+        return base_price
+    if title:
+        raise Exception(f"Не удалось найти цену товара. Проверьте формат страницы thepoizon.ru. Название товара найдено: '{title[:50]}...'")
+    raise Exception("Не удалось найти цену товара. Проверьте формат страницы thepoizon.ru.")
+
+
+async def _fetch_product_html(url: str, stop_after_next_data: bool = False) -> bytes:
+    """
+    Загружает HTML страницы товара через общий клиент; ошибки сети переводятся в понятные сообщения.
+    Возвращает байты: текст декодируется только если разбору понадобится DOM.
+    stop_after_next_data=True читает страницу потоком только до конца блока __NEXT_DATA__.
+    """
+    # Проверяем, что URL валидный
+    if not url or not url.startswith('http'):
+        raise Exception("Некорректный URL. URL должен начинаться с http:// или https://")
+    
+    try:
+        logger.info("Fetching thepoizon.ru URL: %s", url)
+        if stop_after_next_data:
+            response, content, complete = await poizon_client.fetch_until_next_data(url)
+        else:
+            response = await poizon_client.fetch(url)
+            response.raise_for_status()
+            content, complete = response.content, True
+    except httpx.HTTPStatusError as e:
+        error_msg = f"HTTP {e.response.status_code}: Не удалось загрузить страницу thepoizon.ru. Сайт может блокировать запросы или URL неверный."
+        logger.warning("%s", error_msg)
+        raise Exception(error_msg)
+    except httpx.RequestError as e:
+        error_msg = f"Ошибка сети: Не удалось подключиться к thepoizon.ru. Проверьте подключение к интернету."
+        logger.warning("%s", error_msg)
+        raise Exception(error_msg)
+    
+    # Проверяем, что получили HTML
+    content_type = response.headers.get('content-type', '')
+    if 'text/html' not in content_type:
+        raise Exception(f"Получен не HTML-контент (content-type: {content_type}). Проверьте URL товара.")
+    
+    logger.info("Received HTML, length: %s%s", len(content), '' if complete else ' (stopped after __NEXT_DATA__)')
+    return content
+
+
+async def parse_poizon_product(url: str, use_selenium: bool = True, skip_size_guide: bool = False) -> Optional[Dict[str, Any]]:
+    # Все записи разбора страницы помечаются ее URL
+    with log_context(url=url):
+        try:
+            html = await _fetch_product_html(url)
+            # Разбор страницы - чистая CPU-работа, выполняется в пуле процессов,
+            # чтобы не блокировать event loop
+            page = await run_cpu(extract_product_page, html, url)
+            poizon_strategies.record(page['strategy_timings'])
+            title = page['title']
+            sizes_prices = page['sizes_prices']
+            need_selenium = page['need_selenium']
+        
+            logger.debug("Downloading %s images...", len(page['image_urls']))
+            images = await download_images(page['image_urls'])
+            logger.info("Downloaded %s images", len(images))
+        
             if need_selenium and use_selenium:
-                print(f"  🚀 Using Selenium to parse sizes and prices...")
-                selenium_sizes_prices = _parse_sizes_prices_with_selenium(url)
+                logger.debug("🚀 Using Selenium to parse sizes and prices...")
+                started = time.perf_counter()
+                try:
+                    # Selenium блокирует поток ~25 секунд, поэтому выполняется в отдельном пуле
+                    selenium_sizes_prices = await run_selenium(_parse_sizes_prices_with_selenium, url)
+                except SeleniumQueueFull as e:
+                    logger.warning("⚠️ %s, skipping Selenium parsing (using existing data)", e)
+                    selenium_sizes_prices = None
+                unique_selenium_prices = set(item['price'] for item in selenium_sizes_prices or () if item['price'] is not None)
+                if selenium_sizes_prices is not None:
+                    # Последнее звено цепочки размеров, выполняется вне пула разбора
+                    poizon_strategies.record([('sizes', 'selenium', len(unique_selenium_prices) > 1, time.perf_counter() - started)])
                 if selenium_sizes_prices:
-                    unique_selenium_prices = set(item['price'] for item in selenium_sizes_prices if item['price'] is not None)
                     if len(unique_selenium_prices) > 1:  # Если нашли разные цены
-                        print(f"  ✅ Got {len(selenium_sizes_prices)} size-price pairs from Selenium (with {len(unique_selenium_prices)} different prices)")
+                        logger.debug("✅ Got %s size-price pairs from Selenium (with %s different prices)", len(selenium_sizes_prices), len(unique_selenium_prices))
                         sizes_prices = selenium_sizes_prices
                     else:
-                        print(f"  ⚠️ Selenium found sizes but all prices are still the same")
+                        logger.warning("⚠️ Selenium found sizes but all prices are still the same")
                 else:
-                    print(f"  ⚠️ Selenium didn't find sizes/prices, using existing data if available")
+                    logger.warning("⚠️ Selenium didn't find sizes/prices, using existing data if available")
             elif need_selenium and not use_selenium:
-                print(f"  ⚠️ Selenium disabled, skipping Selenium parsing (using existing data)")
-            
+                logger.warning("⚠️ Selenium disabled, skipping Selenium parsing (using existing data)")
+        
             # Формируем описание из размеров и цен (только из Selenium или __NEXT_DATA__)
-            if sizes_prices:
-                # Убираем дубликаты размеров - группируем по размеру и берем один вариант (с минимальной ценой или первый)
-                unique_sizes = {}
-                for item in sizes_prices:
-                    size = item['size']
-                    price = item['price']
-                    
-                    if size not in unique_sizes:
-                        unique_sizes[size] = item
-                    else:
-                        # Если уже есть такой размер, выбираем вариант с ценой (если есть) или с минимальной ценой
-                        existing = unique_sizes[size]
-                        if price is not None:
-                            if existing['price'] is None:
-                                # Заменяем на вариант с ценой
-                                unique_sizes[size] = item
-                            elif price < existing['price']:
-                                # Берем вариант с минимальной ценой
-                                unique_sizes[size] = item
-                        # Если оба без цены или текущий без цены, оставляем существующий
-                
-                sizes_prices = list(unique_sizes.values())
-                print(f"  📊 Removed duplicates, {len(sizes_prices)} unique sizes")
-                
-                # Сортируем размеры от меньшего к большему
-                def sort_key(item):
-                    size_str = item['size'].split('(')[0].strip()  # Берем только RU размер
-                    try:
-                        # Поддерживаем дроби в размерах (⅔, ⅓ и т.д.)
-                        # Словарь для конвертации Unicode дробей
-                        fraction_map = {
-                            '⅓': 0.333, '⅔': 0.667, '⅛': 0.125, '⅜': 0.375,
-                            '⅝': 0.625, '⅞': 0.875, '¼': 0.25, '¾': 0.75, '½': 0.5
-                        }
-                        
-                        # Ищем дробь в размере
-                        fraction_match = re.search(r'(\d+)\s*([⅓⅔⅛⅜⅝⅞¼¾½])', size_str)
-                        if fraction_match:
-                            whole = int(fraction_match.group(1))
-                            fraction_char = fraction_match.group(2)
-                            fraction_decimal = fraction_map.get(fraction_char, 0)
-                            return whole + fraction_decimal
-                        
-                        # Обычный формат с запятой/точкой
-                        return float(size_str.replace(',', '.'))
-                    except:
-                        return 0
-                
-                sizes_prices.sort(key=sort_key)
-                print(f"  📊 Sorted {len(sizes_prices)} sizes from smallest to largest")
-                
-                description_lines = ["Размеры и цены:"]
-                for item in sizes_prices:
-                    if item['price'] is not None:
-                        price_rub = item['price'] / 100
-                        description_lines.append(f"{item['size']}: {price_rub:,.0f} ₽")
-                    else:
-                        description_lines.append(f"{item['size']}: -")
-                description = "\n".join(description_lines)
-                print(f"Created description with {len(sizes_prices)} sizes")
-            else:
-                description = ""
-                print("No sizes found, description will be empty")
-            
+            sizes_prices, description = _build_sizes_description(sizes_prices)
+        
             if not title:
                 raise Exception("Не удалось найти название товара. Возможно, структура страницы изменилась или товар недоступен.")
-            
+        
             # Используем минимальную цену из размеров, если она найдена, иначе основную цену
-            final_price = None
-            if sizes_prices:
-                # Берем минимальную цену среди размеров (только размеры с ценой)
-                prices_with_values = [item['price'] for item in sizes_prices if item['price'] is not None]
-                if prices_with_values:
-                    min_size_price = min(prices_with_values)
-                    final_price = min_size_price
-                    print(f"Using minimum size price: {final_price} копеек (from {len(prices_with_values)} sizes with prices, {len(sizes_prices)} total sizes)")
-                else:
-                    # Если нет цен в размерах, используем базовую цену
-                    if price and price > 0:
-                        final_price = price
-                        print(f"No prices found in sizes, using base price: {final_price} копеек")
-                    else:
-                        # Дополнительная отладочная информация
-                        print("DEBUG: No prices found in sizes and no base price, checking price selectors:")
-                        for selector in ['.product-price', '.price', '[class*="price"]', '[data-price]']:
-                            elems = soup.select(selector)
-                            for elem in elems[:3]:
-                                print(f"  {selector}: {elem.get_text(strip=True)[:100]} (attrs: {dict(list(elem.attrs.items())[:3])})")
-                        
-                        raise Exception(f"Не удалось найти цену товара. Проверьте формат страницы thepoizon.ru. Название товара найдено: '{title[:50]}...'")
-            else:
-                # Если нет размеров, используем базовую цену
-                if price and price > 0:
-                    final_price = price
-                else:
-                    # Дополнительная отладочная информация
-                    print("DEBUG: No sizes and no base price, checking price selectors:")
-                    for selector in ['.product-price', '.price', '[class*="price"]', '[data-price]']:
-                        elems = soup.select(selector)
-                        for elem in elems[:3]:
-                            print(f"  {selector}: {elem.get_text(strip=True)[:100]} (attrs: {dict(list(elem.attrs.items())[:3])})")
-                    
-                    raise Exception(f"Не удалось найти цену товара. Проверьте формат страницы thepoizon.ru. Название товара найдено: '{title[:50]}...'")
-            
-            # Проверяем, что финальная цена валидна
-            if not final_price or final_price <= 0:
-                # Дополнительная отладочная информация
-                print("DEBUG: Final price is invalid, checking price selectors:")
-                for selector in ['.product-price', '.price', '[class*="price"]', '[data-price]']:
-                    elems = soup.select(selector)
-                    for elem in elems[:3]:
-                        print(f"  {selector}: {elem.get_text(strip=True)[:100]} (attrs: {dict(list(elem.attrs.items())[:3])})")
-                
-                raise Exception(f"Не удалось найти цену товара. Проверьте формат страницы thepoizon.ru. Название товара найдено: '{title[:50]}...'")
-            
-            print(f"Successfully parsed product: {title[:50]}... (price: {final_price} копеек, images: {len(images)}, sizes: {len(sizes_prices)})")
-            
-            extracted_category = None
-            breadcrumb = soup.select_one('div.BreadCrumb_breadcrumb__Iy_yk')
-            if breadcrumb:
-                links = breadcrumb.select('a span')
-                if len(links) >= 3:
-                    breadcrumb_category = links[2].get_text(strip=True)
-                    from app.utils.category_mapping import MAIN_CATEGORIES_WITH_SUBCATEGORIES
-                    all_categories = set(MAIN_CATEGORIES_WITH_SUBCATEGORIES.keys())
-                    for subcats in MAIN_CATEGORIES_WITH_SUBCATEGORIES.values():
-                        all_categories.update(subcats)
-                    for cat in all_categories:
-                        if cat.lower() == breadcrumb_category.lower() or breadcrumb_category.lower() in cat.lower() or cat.lower() in breadcrumb_category.lower():
-                            extracted_category = cat
-                            break
-            
+            final_price = _select_final_price(sizes_prices, page['price'], title)
+        
+            logger.info("Successfully parsed product: %s... (price: %s копеек, images: %s, sizes: %s)", title[:50], final_price, len(images), len(sizes_prices))
+        
+            extracted_category = page['extracted_category']
+        
             result = {
                 'title': title[:500],
                 'price_cents': final_price,
@@ -3124,28 +3370,53 @@ async def parse_poizon_product(url: str, use_selenium: bool = True, skip_size_gu
                 'images_base64': images,
                 'extracted_category': extracted_category
             }
-            
+        
             if description:
-                print(f"Description will be saved (first 200 chars): {description[:200]}")
+                logger.debug("Description will be saved (first 200 chars): %.200s", description)
             else:
-                print("WARNING: Description is empty - no sizes and prices found!")
-            
+                logger.warning("Description is empty - no sizes and prices found!")
+        
             if extracted_category:
-                print(f"Extracted category from breadcrumb: {extracted_category}")
-            
+                logger.debug("Extracted category from breadcrumb: %s", extracted_category)
+        
             return result
-            
-    except httpx.HTTPStatusError as e:
-        error_msg = f"HTTP {e.response.status_code}: Не удалось загрузить страницу thepoizon.ru. Сайт может блокировать запросы или URL неверный."
-        print(error_msg)
-        raise Exception(error_msg)
-    except httpx.RequestError as e:
-        error_msg = f"Ошибка сети: Не удалось подключиться к thepoizon.ru. Проверьте подключение к интернету."
-        print(error_msg)
-        raise Exception(error_msg)
-    except Exception as e:
-        error_msg = str(e)
-        print(f"Parse error: {error_msg}")
-        import traceback
-        traceback.print_exc()
-        raise Exception(error_msg)
+        
+        except HostUnavailable:
+            # Тип ошибки нужен задачам: при недоступном сайте они останавливаются
+            raise
+        except Exception as e:
+            error_msg = str(e)
+            logger.error("Parse error: %s", error_msg, exc_info=True)
+            raise Exception(error_msg)
+
+
+async def parse_poizon_prices(url: str, known_price_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Только размеры и цены товара - для периодического обновления цен.
+    Один запрос HTML без изображений, Selenium, названия и категории.
+    Возвращает price_cents, description, sizes_prices и price_hash. Если ценовая часть страницы
+    не изменилась с known_price_hash, возвращает только unchanged=True и price_hash.
+    """
+    # Все записи разбора страницы помечаются ее URL
+    with log_context(url=url):
+        try:
+            # Для цен достаточно __NEXT_DATA__, остаток страницы не скачиваем
+            html = await _fetch_product_html(url, stop_after_next_data=True)
+            page = await run_cpu(extract_product_page, html, url, True, known_price_hash)
+            poizon_strategies.record(page['strategy_timings'])
+            if page.get('unchanged'):
+                return {'unchanged': True, 'price_hash': page['price_hash']}
+            sizes_prices, description = _build_sizes_description(page['sizes_prices'])
+            final_price = _select_final_price(sizes_prices, page['price'], None)
+            # Без SKU в __NEXT_DATA__ изменения определяются по результату разбора
+            price_hash = page['price_hash'] or 'p:' + content_hash([final_price, sizes_prices])
+            return {
+                'unchanged': price_hash == known_price_hash,
+                'price_cents': final_price,
+                'description': description[:2000],
+                'sizes_prices': sizes_prices,
+                'price_hash': price_hash
+            }
+        except Exception as e:
+            logger.warning("Price parse error for %s: %s", url, e)
+            raise
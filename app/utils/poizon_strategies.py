@@ -0,0 +1,154 @@
+"""
+Реестр стратегий извлечения данных со страницы товара Poizon.
+Для каждого поля (данные товара, SKU, название, размеры, цена, изображения, категория)
+хранится упорядоченная цепочка стратегий; первая успешная останавливает цепочку.
+Реестр считает попадания и время каждой стратегии, чтобы по наблюдаемой статистике
+менять порядок и убирать стратегии, которые никогда не срабатывают.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config import settings
+from app.utils import next_data_paths
+from app.utils.page_source import PageSource
+
+logger = logging.getLogger(__name__)
+
+
+# (поле, стратегия, успех, секунды) - одна запись на вызов стратегии
+Timing = Tuple[str, str, bool, float]
+
+
+class PageContext:
+    """Состояние разбора одной страницы, общее для всех стратегий"""
+
+    def __init__(self, page: PageSource, url: str, base_domain: str, prices_only: bool = False):
+        self.page = page
+        self.url = url
+        self.base_domain = base_domain
+        self.prices_only = prices_only
+        # Результаты уже отработавших цепочек по полям
+        self.values: Dict[str, Any] = {}
+        # Промежуточные данные, которые стратегия одного поля оставляет другим
+        self.sku_price: Optional[int] = None
+        self.timings: List[Timing] = []
+        self._fingerprint: Optional[str] = None
+
+    @property
+    def next_data(self) -> Optional[Dict[str, Any]]:
+        next_data = self.page.next_data
+        return next_data if isinstance(next_data, dict) else None
+
+    @property
+    def page_props(self) -> Dict[str, Any]:
+        """props.pageProps из __NEXT_DATA__ (пустой словарь, если его нет)"""
+        page_props = (self.next_data or {}).get('props', {}).get('pageProps', {})
+        return page_props if isinstance(page_props, dict) else {}
+
+    @property
+    def product_data(self) -> Optional[Dict[str, Any]]:
+        return self.values.get('product')
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        """Отпечаток схемы __NEXT_DATA__ (None, если его нет)"""
+        if self._fingerprint is None and self.next_data:
+            self._fingerprint = next_data_paths.fingerprint(self.next_data)
+        return self._fingerprint
+
+
+class Strategy:
+    __slots__ = ('field', 'name', 'fn')
+
+    def __init__(self, field: str, name: str, fn: Callable[[PageContext], Any]):
+        self.field = field
+        self.name = name
+        self.fn = fn
+
+
+_registry: Dict[str, List[Strategy]] = {}
+_stats_lock = threading.Lock()
+# (поле, стратегия) -> [вызовы, попадания, суммарное время в секундах]
+_stats: Dict[Tuple[str, str], List[float]] = {}
+
+
+def strategy(field: str, name: str):
+    """Декоратор: добавить функцию в конец цепочки поля. Функция возвращает None, если ничего не нашла"""
+    def decorator(fn: Callable[[PageContext], Any]) -> Callable[[PageContext], Any]:
+        _registry.setdefault(field, []).append(Strategy(field, name, fn))
+        return fn
+    return decorator
+
+
+def _disabled() -> set:
+    # POIZON_DISABLED_STRATEGIES="title/json_ld,price/text_regex"
+    return {item.strip() for item in (settings.poizon_disabled_strategies or '').split(',') if item.strip()}
+
+
+def run_chain(field: str, ctx: PageContext, accept: Callable[[Any], bool] = bool) -> Any:
+    """
+    Запускает стратегии поля по порядку до первой, чей результат принят accept.
+    Если ни одна не принята, возвращает последний не-None результат: следующая стратегия
+    видит его в ctx.values и может дополнить (например, размеры из HTML к размерам из SKU).
+    """
+    disabled = _disabled()
+    value = None
+    for item in _registry.get(field, ()):
+        if f'{field}/{item.name}' in disabled:
+            continue
+        started = time.perf_counter()
+        try:
+            result = item.fn(ctx)
+        except Exception as e:
+            logger.warning("⚠️ Strategy %s/%s failed: %s", field, item.name, e)
+            result = None
+        hit = result is not None and accept(result)
+        ctx.timings.append((field, item.name, hit, time.perf_counter() - started))
+        if result is not None:
+            value = result
+            ctx.values[field] = value
+        if hit:
+            break
+    return value
+
+
+def record(timings: List[Timing]) -> None:
+    """
+    Учесть замеры разбора в статистике процесса. Разбор идет в пуле процессов,
+    поэтому замеры возвращаются вместе с результатом и учитываются вызывающим.
+    """
+    with _stats_lock:
+        for field, name, hit, seconds in timings:
+            entry = _stats.setdefault((field, name), [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += int(hit)
+            entry[2] += seconds
+
+
+def stats() -> Dict[str, List[Dict[str, Any]]]:
+    """Статистика по полям в порядке цепочек: вызовы, доля попаданий, среднее время"""
+    with _stats_lock:
+        snapshot = {key: list(value) for key, value in _stats.items()}
+    result: Dict[str, List[Dict[str, Any]]] = {}
+    for (field, name), (calls, hits, seconds) in snapshot.items():
+        result.setdefault(field, []).append({
+            'strategy': name,
+            'calls': int(calls),
+            'hits': int(hits),
+            'hit_rate': round(hits / calls, 3) if calls else 0.0,
+            'avg_ms': round(seconds / calls * 1000, 2) if calls else 0.0
+        })
+    for field, rows in result.items():
+        order = [item.name for item in _registry.get(field, ())]
+        rows.sort(key=lambda row: order.index(row['strategy']) if row['strategy'] in order else len(order))
+    return result
+
+
+def format_stats() -> str:
+    """Статистика стратегий одной таблицей для лога"""
+    lines = ["Extraction strategy stats (field/strategy: hits/calls, avg ms):"]
+    for field, rows in stats().items():
+        for row in rows:
+            lines.append(f"  {field}/{row['strategy']}: {row['hits']}/{row['calls']} ({row['hit_rate']:.0%}), {row['avg_ms']} ms")
+    return "\n".join(lines)
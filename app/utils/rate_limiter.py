@@ -0,0 +1,156 @@
+"""
+Адаптивное ограничение запросов к хостам Poizon (сайт, CDN изображений).
+У каждого хоста свой token bucket (запросов в секунду) и окно одновременных запросов.
+Оба предела растут аддитивно, пока хост отвечает нормально, и уменьшаются вдвое,
+когда он отбивается (429, 5xx, таймауты) - AIMD, как у TCP. Retry-After выполняется
+буквально: до указанного момента к хосту не уходит ни одного запроса.
+Вместо фиксированных пауз между товарами темп определяет то, что хост сейчас выдерживает.
+"""
+import asyncio
+import contextlib
+import email.utils
+import logging
+import time
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Ответы, означающие "слишком часто" или перегрузку хоста
+BACKOFF_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Повторные отказы в пределах этого окна считаются одним сигналом (отказы пачки параллельных запросов)
+BACKOFF_COOLDOWN_SECONDS = 1.0
+# Retry-After больше этого значения не выполняется буквально
+MAX_RETRY_AFTER_SECONDS = 300.0
+# Доля максимальной скорости, которую возвращает каждый успешный ответ
+RATE_INCREASE_FRACTION = 0.05
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах: число секунд или HTTP-дата"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class HostLimiter:
+    """Token bucket и AIMD-окно одновременных запросов одного хоста"""
+
+    def __init__(self, host: str, max_rate: float, min_rate: float, burst: int, max_concurrency: int):
+        self.host = host
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.rate = max_rate
+        self.concurrency = float(max_concurrency)
+        self.tokens = float(burst)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._refilled_at = time.monotonic()
+        self._last_backoff = 0.0
+        self._cond = asyncio.Condition()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(float(self.burst), self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    async def _acquire(self) -> None:
+        async with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait: Optional[float] = self.blocked_until - now
+                elif self.in_flight >= int(self.concurrency):
+                    wait = None
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        self.in_flight += 1
+                        return
+                    wait = (1.0 - self.tokens) / self.rate
+                # Ожидание отпускает блокировку; освобождение слота будит раньше срока
+                try:
+                    await asyncio.wait_for(self._cond.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def request(self) -> AsyncIterator['HostLimiter']:
+        """
+        Слот для одного запроса: ждет токен, свободное место в окне и конец Retry-After.
+        Таймауты и сетевые ошибки внутри блока считаются отказом хоста.
+        Ответ передается в observe() внутри блока.
+        """
+        await self._acquire()
+        try:
+            yield self
+        except (httpx.TimeoutException, httpx.NetworkError) as e:
+            self.backoff(f'{type(e).__name__}')
+            raise
+        finally:
+            await self._release()
+
+    def observe(self, response: httpx.Response) -> None:
+        """Учесть ответ хоста: рост пределов при успехе, снижение при отказе"""
+        if response.status_code in BACKOFF_STATUSES:
+            self.backoff(str(response.status_code), parse_retry_after(response.headers.get('retry-after')))
+        else:
+            self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_INCREASE_FRACTION)
+
+    def backoff(self, reason: str, retry_after: Optional[float] = None) -> None:
+        now = time.monotonic()
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, now + min(retry_after, MAX_RETRY_AFTER_SECONDS))
+        if now - self._last_backoff < BACKOFF_COOLDOWN_SECONDS:
+            return
+        self._last_backoff = now
+        self.concurrency = max(1.0, self.concurrency / 2)
+        self.rate = max(self.min_rate, self.rate / 2)
+        logger.warning(
+            "Host %s pushed back (%s): concurrency %.1f, rate %.2f/s%s",
+            self.host, reason, self.concurrency, self.rate,
+            f', retry after {retry_after:.0f}s' if retry_after is not None else ''
+        )
+
+
+_limiters: Dict[str, HostLimiter] = {}
+
+
+def for_url(url: str) -> HostLimiter:
+    """Ограничитель хоста url (общий для всех запросов процесса к этому хосту)"""
+    host = urlsplit(url).hostname or ''
+    limiter = _limiters.get(host)
+    if limiter is None:
+        limiter = _limiters[host] = HostLimiter(
+            host,
+            max_rate=settings.poizon_max_rate_per_host,
+            min_rate=settings.poizon_min_rate_per_host,
+            burst=settings.poizon_rate_burst,
+            max_concurrency=settings.poizon_max_connections_per_host
+        )
+    return limiter
+
+
+def reset() -> None:
+    """Забыть состояние хостов (при закрытии клиента: ограничители привязаны к event loop)"""
+    _limiters.clear()
@@ -0,0 +1,157 @@
+"""
+Воркер задач парсинга: забирает задачи из очереди scrape_jobs (app/jobs.py).
+Отдельным процессом (server_role=worker) он не делит CPU с процессами API;
+при server_role=all JobWorker запускается внутри процесса API.
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import List, Dict, Any, Optional
+from app.config import settings
+from app.db import queries
+from app.db.change_feed import ChangeFeed
+from app.db.schema import ensure_schema
+from app.utils.executors import shutdown_executors
+from app.logging_config import setup_logging, stop_logging
+from app import jobs
+
+logger = logging.getLogger(__name__)
+
+
+# Воркер уступает CPU процессам API на той же машине
+WORKER_NICE = 10
+
+
+class JobWorker:
+    """
+    Цикл выборки задач: NOTIFY scrape_jobs будит его сразу, опрос раз в JOB_POLL_SECONDS
+    подбирает задачи, уведомление о которых было пропущено (например, при перезапуске),
+    и брошенные упавшими воркерами.
+    Задача забирается, только если есть свободный слот: общий (WORKER_MAX_JOBS)
+    и по ее типу (JOB_TYPE_LIMITS)
+    """
+
+    def __init__(self):
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.running: Dict[asyncio.Task, str] = {}
+        self._wake = asyncio.Event()
+        self._feed = ChangeFeed(queries.SCRAPE_JOBS_CHANNEL, self._on_notify)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._feed.start()
+            self._task = asyncio.create_task(self._run())
+            logger.info("Job worker %s started (max %s concurrent jobs)", self.name, settings.worker_max_jobs)
+
+    async def stop(self) -> None:
+        """
+        Перестать брать задачи и прервать выполняющиеся: они сохраняют прогресс и возвращаются
+        в очередь, следующий воркер продолжит их с checkpoint (деплой не ждет многочасовой задачи)
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._feed.stop()
+        if self.running:
+            logger.info("Job worker stopping, checkpointing %s running jobs...", len(self.running))
+            tasks = list(self.running)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _on_notify(self, payloads: List[Dict[str, Any]]) -> None:
+        self._wake.set()
+
+    def _free_types(self) -> List[str]:
+        if len(self.running) >= settings.worker_max_jobs:
+            return []
+        busy: Dict[str, int] = {}
+        for job_type in self.running.values():
+            busy[job_type] = busy.get(job_type, 0) + 1
+        return [
+            job_type for job_type in jobs.JOB_HANDLERS
+            if busy.get(job_type, 0) < settings.job_type_limits.get(job_type, settings.worker_max_jobs)
+        ]
+
+    async def _claim_available(self) -> None:
+        while True:
+            job_types = self._free_types()
+            if not job_types:
+                return
+            job = await asyncio.to_thread(
+                queries.claim_scrape_job, job_types, self.name,
+                settings.job_stale_seconds, settings.job_max_attempts
+            )
+            if job is None:
+                return
+            task = asyncio.create_task(jobs.execute(job))
+            self.running[task] = job['type']
+            task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self.running.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Job runner failed: %s", task.exception())
+        # Освободился слот - можно забрать следующую задачу
+        self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                await self._claim_available()
+            except Exception as e:
+                logger.warning("Failed to claim scrape jobs: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.job_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def run_worker() -> None:
+    """Принимать задачи до SIGTERM/SIGINT, затем сохранить прогресс текущих"""
+    try:
+        await asyncio.to_thread(ensure_schema)
+    except Exception as e:
+        logger.error("Failed to update database schema: %s", e)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    worker = JobWorker()
+    worker.start()
+    await stop.wait()
+    await worker.stop()
+    shutdown_executors()
+    from app.utils import poizon_client
+    await poizon_client.close_client()
+
+
+def main() -> None:
+    setup_logging()
+    try:
+        os.nice(WORKER_NICE)
+    except OSError:
+        pass
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    try:
+        asyncio.run(run_worker())
+    finally:
+        stop_logging()
+
+
+if __name__ == "__main__":
+    main()
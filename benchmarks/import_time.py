@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Бюджет холодного старта API-воркера.
+
+    python benchmarks/import_time.py [--budget-ms 200] [--runs 9]
+
+Запускает `python -X importtime -c "import app.main"` и импорт самого фреймворка
+(FastAPI/pydantic - большая и неизменная часть старта) поочередно несколько раз
+и берет медиану разностей соседних замеров: нагрузка машины меняется между
+запусками, а минимум по каждой серии отдельно попадает на разный шум
+и дает ложные срабатывания. Завершается с кодом 1, если собственные импорты приложения
+дольше бюджета или если при старте подтянулся стек парсинга
+(selenium, bs4, fake_useragent, app.utils.poizon_parser).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые процесс API не должен импортировать при старте
+FORBIDDEN_MODULES = (
+    'selenium',
+    'bs4',
+    'fake_useragent',
+    'app.utils.poizon_parser',
+    'app.utils.poizon_category_parser',
+)
+
+# Фреймворк, без которого API не стартует; его время в бюджет не входит
+BASELINE_IMPORT = 'import fastapi, fastapi.middleware.cors, fastapi.responses, pydantic_settings, psycopg2.extras'
+
+# Settings требует эти переменные; для замера импорта значения не важны
+DUMMY_ENV = {
+    'TELEGRAM_BOT_TOKEN': 'benchmark',
+    'DATABASE_URL': 'postgresql://localhost/benchmark',
+    'ADMIN_TGID': '0',
+    'FRONTEND_URL': 'http://localhost',
+}
+
+
+def measure_once(statement):
+    """Возвращает (суммарное время импортов в мс, список импортированных модулей)"""
+    env = {**DUMMY_ENV, **os.environ}
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'{statement} failed:\n{proc.stderr[-2000:]}')
+
+    total_us = 0
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        modules.append(name)
+        # cumulative модулей верхнего уровня (без отступа) уже включает вложенные импорты
+        if parts[2] == ' ' + name:
+            total_us += int(parts[1].strip())
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_BUDGET_MS', 200)),
+                        help='бюджет на импорты приложения сверх фреймворка, мс')
+    parser.add_argument('--runs', type=int, default=9)
+    args = parser.parse_args()
+
+    timings = []
+    baseline_timings = []
+    modules = []
+    for _ in range(args.runs):
+        elapsed_ms, modules = measure_once('import app.main')
+        timings.append(elapsed_ms)
+        baseline_ms, _ = measure_once(BASELINE_IMPORT)
+        baseline_timings.append(baseline_ms)
+    median = statistics.median(timings)
+    baseline = statistics.median(baseline_timings)
+    overhead = max(statistics.median(app - base for app, base in zip(timings, baseline_timings)), 0.0)
+
+    leaked = [
+        forbidden for forbidden in FORBIDDEN_MODULES
+        if any(name == forbidden or name.startswith(forbidden + '.') for name in modules)
+    ]
+
+    print(f'import app.main: median {median:.1f} ms, best {min(timings):.1f} ms, worst {max(timings):.1f} ms '
+          f'over {args.runs} runs')
+    print(f'framework baseline: median {baseline:.1f} ms')
+    print(f'app overhead (median of paired runs): {overhead:.1f} ms (budget {args.budget_ms:.0f} ms), modules imported: {len(modules)}')
+
+    failed = False
+    if leaked:
+        print(f'FAIL: scraping stack imported at startup: {", ".join(leaked)}')
+        failed = True
+    if overhead > args.budget_ms:
+        print(f'FAIL: app import overhead {overhead:.1f} ms exceeds budget {args.budget_ms:.0f} ms')
+        failed = True
+    if not failed:
+        print('OK')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Скорость разбора сохраненных страниц товаров Poizon.
+
+    python benchmarks/page_parsing.py [--pages benchmarks/pages] [--runs 5]
+
+Страницы сохраняются заранее, например:
+    curl -sL -o benchmarks/pages/nike-1.html 'https://thepoizon.ru/product/...'
+
+Для каждой страницы сравнивает получение __NEXT_DATA__ через полный DOM
+(BeautifulSoup html.parser + json) с быстрым путем PageSource (срез байтов + orjson)
+и замеряет extract_product_page целиком. Выводит медианы в миллисекундах.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Settings требует эти переменные; для замера разбора значения не важны
+for name, value in {
+    'TELEGRAM_BOT_TOKEN': 'benchmark',
+    'DATABASE_URL': 'postgresql://localhost/benchmark',
+    'ADMIN_TGID': '0',
+    'FRONTEND_URL': 'http://localhost',
+}.items():
+    os.environ.setdefault(name, value)
+
+from bs4 import BeautifulSoup  # noqa: E402
+from app.utils.page_source import PageSource  # noqa: E402
+from app.utils.poizon_parser import extract_product_page  # noqa: E402
+
+# Предупреждения парсера в замер не входят; отладочные записи отбрасываются, как при LOG_LEVEL=INFO
+logging.getLogger('app').setLevel(logging.ERROR)
+
+
+def dom_next_data(content):
+    soup = BeautifulSoup(content.decode('utf-8', errors='replace'), 'html.parser')
+    script = soup.find('script', id='__NEXT_DATA__')
+    return json.loads(script.string) if script else None
+
+
+def fast_next_data(content):
+    return PageSource(content).next_data
+
+
+def full_extract(content):
+    return extract_product_page(content, 'https://thepoizon.ru/product/benchmark')
+
+
+def median_ms(fn, content, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(content)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', default=os.path.join(ROOT, 'benchmarks', 'pages'))
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.pages, '*.html')))
+    if not paths:
+        print(f'No saved pages in {args.pages}; save product pages there as *.html first')
+        return 2
+
+    print(f"{'page':40} {'KB':>6} {'dom+json':>9} {'fast':>7} {'extract':>8}")
+    totals = [0.0, 0.0, 0.0]
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        if (dom_next_data(content) is None) != (fast_next_data(content) is None):
+            print(f'{os.path.basename(path)}: fast path and DOM disagree about __NEXT_DATA__')
+            return 1
+        row = [
+            median_ms(dom_next_data, content, args.runs),
+            median_ms(fast_next_data, content, args.runs),
+            median_ms(full_extract, content, args.runs),
+        ]
+        totals = [total + value for total, value in zip(totals, row)]
+        print(f'{os.path.basename(path)[:40]:40} {len(content) / 1024:6.0f} {row[0]:9.1f} {row[1]:7.1f} {row[2]:8.1f}')
+
+    count = len(paths)
+    print(f"{'mean':40} {'':>6} {totals[0] / count:9.1f} {totals[1] / count:7.1f} {totals[2] / count:8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
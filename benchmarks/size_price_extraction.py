@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Скорость и результат извлечения пар размер/цена из текста страницы.
+
+    python benchmarks/size_price_extraction.py [--pages benchmarks/pages] [--runs 5]
+
+Сравнивает прежний вариант (текст через soup.get_text() и пять регулярных выражений,
+каждое по тексту и по HTML) с текущим _extract_sizes_prices_from_html (текст без DOM).
+DOM для прежнего варианта строится вне замера. Выводит медианы в миллисекундах.
+Сначала результаты сверяются на корпусе benchmarks/size_price_corpus.jsonl (строка JSON
+на вход); пары и их порядок должны совпасть. Строка-JSON - текст страницы: типичные записи
+цен и случайные сочетания разделителей, переводов строк и повторов размеров. Объект
+{"html": ...} - страница целиком: встроенные скрипты и стили (с "<" и ">" внутри),
+комментарии, CDATA, атрибуты с ">"; прежний вариант получает текст через
+BeautifulSoup(...).get_text(), текущий - без DOM. Завершается с кодом 1, если
+найденные пары различаются на корпусе или на сохраненных страницах.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Settings требует эти переменные; для замера разбора значения не важны
+for name, value in {
+    'TELEGRAM_BOT_TOKEN': 'benchmark',
+    'DATABASE_URL': 'postgresql://localhost/benchmark',
+    'ADMIN_TGID': '0',
+    'FRONTEND_URL': 'http://localhost',
+}.items():
+    os.environ.setdefault(name, value)
+
+from bs4 import BeautifulSoup  # noqa: E402
+from app.utils.poizon_parser import _extract_sizes_prices_from_html  # noqa: E402
+
+# Предупреждения парсера в замер не входят; отладочные записи отбрасываются, как при LOG_LEVEL=INFO
+logging.getLogger('app').setLevel(logging.ERROR)
+
+
+LEGACY_PATTERNS = [
+    re.compile(r'(\d+[,.]?\d*)\s*\(\d+[,.]?\d*\)\s*(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE),
+    re.compile(r'(\d+[,.]?\d*)\s+(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE),
+    re.compile(r'(\d+[,.]?\d*)\s+(\d{4,6})\s*[₽РP]', re.IGNORECASE),
+    re.compile(r'(\d+[,.]?\d*)\s*[:-]\s*(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE),
+    re.compile(r'(\d+[,.]?\d*)\s*\n\s*(\d{1,2}(?:\s?\d{3})+)\s*[₽РP]', re.IGNORECASE | re.MULTILINE),
+]
+
+
+def legacy_pairs(texts_to_search):
+    """Прежний разбор пар (без печати), для сравнения"""
+    found_pairs = {}
+    for pattern in LEGACY_PATTERNS:
+        for text in texts_to_search:
+            for match in pattern.finditer(text):
+                size = match.group(1).strip().replace('.', ',')
+                price_clean = match.group(2).strip().replace(' ', '').replace(',', '').replace('\xa0', '')
+                try:
+                    size_num = float(size.replace(',', '.'))
+                except ValueError:
+                    continue
+                if size_num < 15 or size_num > 60:
+                    continue
+                try:
+                    price_num = float(price_clean)
+                except ValueError:
+                    continue
+                if price_num < 100 or price_num > 100000:
+                    continue
+                found_pairs[size] = int(price_num * 100)
+    return list(found_pairs.items())
+
+
+def legacy_extract(soup, html_text):
+    """Прежняя реализация: текст через DOM, затем текст и HTML"""
+    page_text = soup.get_text()
+    texts_to_search = [page_text]
+    if html_text != page_text:
+        texts_to_search.append(html_text)
+    return legacy_pairs(texts_to_search)
+
+
+def current_extract(html_text, page_text=None):
+    return [(item['size'], item['price']) for item in _extract_sizes_prices_from_html(html_text, page_text)]
+
+
+def check_corpus(path):
+    """Число входов корпуса, на которых пары (или их порядок) расходятся с прежним разбором"""
+    with open(path, encoding='utf-8') as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    mismatches = 0
+    for case in corpus:
+        if isinstance(case, dict):
+            legacy = legacy_extract(BeautifulSoup(case['html'], 'lxml'), case['html'])
+            current = current_extract(case['html'])
+        else:
+            legacy = legacy_pairs([case])
+            current = current_extract(case, case)
+        if legacy != current:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f'corpus {case!r}: legacy={legacy} current={current}')
+    print(f'corpus: {len(corpus)} inputs, {mismatches} mismatches')
+    return mismatches
+
+
+def median_ms(fn, args, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', default=os.path.join(ROOT, 'benchmarks', 'pages'))
+    parser.add_argument('--corpus', default=os.path.join(ROOT, 'benchmarks', 'size_price_corpus.jsonl'))
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    corpus_mismatches = check_corpus(args.corpus)
+    paths = sorted(glob.glob(os.path.join(args.pages, '*.html')))
+    if not paths:
+        print(f'No saved pages in {args.pages}; save product pages there as *.html to compare speed')
+        return 1 if corpus_mismatches else 0
+
+    print(f"{'page':40} {'KB':>6} {'pairs':>6} {'legacy':>8} {'current':>8}")
+    totals = [0.0, 0.0]
+    mismatches = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            html_text = f.read().decode('utf-8', errors='replace')
+        soup = BeautifulSoup(html_text, 'lxml')
+        legacy = legacy_extract(soup, html_text)
+        current = current_extract(html_text)
+        if legacy != current:
+            mismatches += 1
+            print(f'{os.path.basename(path)}: pairs differ')
+            print(f'    legacy={legacy}')
+            print(f'    current={current}')
+        row = [
+            median_ms(legacy_extract, (soup, html_text), args.runs),
+            median_ms(current_extract, (html_text,), args.runs),
+        ]
+        totals = [total + value for total, value in zip(totals, row)]
+        print(f'{os.path.basename(path)[:40]:40} {len(html_text) / 1024:6.0f} {len(current):6} {row[0]:8.1f} {row[1]:8.1f}')
+
+    count = len(paths)
+    print(f"{'mean':40} {'':>6} {'':>6} {totals[0] / count:8.1f} {totals[1] / count:8.1f}")
+    return 1 if mismatches or corpus_mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import os
+
+# Settings требует эти переменные; тестам реальные значения не нужны
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', 'test')
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/test')
+os.environ.setdefault('ADMIN_TGID', '0')
+os.environ.setdefault('FRONTEND_URL', 'http://localhost')
@@ -0,0 +1,166 @@
+"""
+Снимок каталога (CatalogSnapshot.query) должен отвечать так же, как SQL-путь queries.get_products.
+Оба пути читают одну таблицу products в SQLite: запросы queries.py выполняются как есть,
+с заменой %s на ? и ILIKE на LIKE без учета регистра.
+"""
+import contextlib
+import json
+import re
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db import queries
+from app.db.catalog_snapshot import CatalogSnapshot
+
+
+def _like(pattern, value):
+    # "X LIKE Y" SQLite вызывает как like(Y, X); семантика ILIKE Postgres с экранированием "\"
+    if pattern is None or value is None:
+        return None
+    parts = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        parts.append('.*' if ch == '%' else '.' if ch == '_' else re.escape(ch))
+        i += 1
+    return re.fullmatch(''.join(parts), value, re.IGNORECASE | re.DOTALL) is not None
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self._cur = conn.cursor()
+
+    def execute(self, query, params=()):
+        query = query.replace('%s', '?').replace('ILIKE', 'LIKE')
+        # В SQLite OFFSET допустим только после LIMIT
+        if 'OFFSET' in query and 'LIMIT' not in query:
+            query = query.replace('OFFSET', 'LIMIT -1 OFFSET')
+        self._cur.execute(query, list(params))
+
+    def fetchall(self):
+        return [dict(row) for row in self._cur.fetchall()]
+
+
+class _Connection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    @contextlib.contextmanager
+    def cursor(self):
+        yield _Cursor(self._conn)
+
+
+PRODUCTS = [
+    # (title, description, category, season, is_active)
+    ('Nike Air Force 1', '41: 12000\n42: 12500', 'Кроссовки', 'all', True),
+    ('NIKE Dunk Low', '42: 15000', 'Кроссовки', 'demi', True),
+    ('Adidas Samba', '40: 9000\n41: 9500', 'Кроссовки', 'all', True),
+    ('Dr. Martens 1460', '42: 20000', 'Ботинки', 'winter', True),
+    ('Timberland 6 Inch', '43: 18000', 'Ботинки', 'winter', True),
+    ('Балетки Repetto', '37: 30000', 'Балетки', 'demi', True),
+    ('Туфли Loake', '42: 25000', 'Туфли', 'all', True),
+    ('Кеды Converse', '42: 7000', 'Обувь', 'all', True),
+    ('Худи Stone Island', 'M: 40000', 'Худи & Свитшоты', 'demi', True),
+    ('Куртка The North Face', 'L: 50000', 'Куртки & Пальто', 'winter', True),
+    ('Nike Tech Fleece', 'M: 12000', 'Спортивная одежда', 'demi', True),
+    ('Рюкзак Nike Heritage', None, 'Рюкзаки', None, True),
+    ('Сумка Prada', 'one size', 'Сумки', 'all', True),
+    ('Снятый с продажи Nike', '42: 1000', 'Кроссовки', 'all', False),
+    ('New Balance 550_white', '44: 13000', 'Кроссовки', 'all', True),
+    ('Puma 100% cotton', '42: 8000', 'Кроссовки', 'demi', True),
+]
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    conn = sqlite3.connect(':memory:', detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.row_factory = sqlite3.Row
+    conn.create_function('like', 2, _like)
+    conn.execute(
+        """
+        CREATE TABLE products (
+            id TEXT PRIMARY KEY, title TEXT, description TEXT, price_cents INTEGER,
+            category TEXT, season TEXT, source_url TEXT, created_at TIMESTAMP, updated_at TIMESTAMP,
+            is_active BOOLEAN, size_guide TEXT, images_urls TEXT, images_base64 TEXT
+        )
+        """
+    )
+    started = datetime(2026, 1, 1)
+    for idx, (title, description, category, season, is_active) in enumerate(PRODUCTS):
+        created_at = started + timedelta(hours=idx)
+        conn.execute(
+            'INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                f'00000000-0000-0000-0000-{idx:012d}', title, description, 1000 * (idx + 1),
+                category, season, f'https://thepoizon.ru/product/{idx}', created_at, created_at,
+                is_active, None, json.dumps([f'https://img/{idx}.jpg']), '[]'
+            )
+        )
+
+    @contextlib.contextmanager
+    def get_db_connection():
+        yield _Connection(conn)
+
+    monkeypatch.setattr(queries, 'get_db_connection', get_db_connection)
+    snapshot = CatalogSnapshot()
+    snapshot.load()
+    return snapshot
+
+
+def _sql(**filters):
+    rows = queries.get_products(**filters)
+    for row in rows:
+        row['is_active'] = bool(row['is_active'])
+    return rows
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'category': 'Кроссовки'},
+    {'category': 'Обувь'},
+    {'category': 'Одежда', 'season': 'demi'},
+    {'category': 'Ботинки'},
+    {'category': 'Нет такой'},
+    {'season': 'winter'},
+    {'q': 'nike'},
+    {'q': 'NIKE', 'category': 'Кроссовки'},
+    {'q': '550_'},
+    {'q': '100%'},
+    {'size': '42'},
+    {'size': 'm'},
+    {'brand': 'Nike'},
+    {'brand': 'nike', 'size': '42', 'season': 'all'},
+])
+def test_filters_match_sql(catalog, filters):
+    assert catalog.query(**filters) == _sql(**filters)
+
+
+@pytest.mark.parametrize('limit, offset', [
+    (None, None),
+    (0, None),
+    (0, 3),
+    (1, None),
+    (5, None),
+    (5, 0),
+    (5, 3),
+    (5, 12),
+    (100, None),
+    (None, 4),
+    (None, 100),
+    (3, 100),
+])
+@pytest.mark.parametrize('filters', [{}, {'category': 'Кроссовки'}, {'q': 'nike'}])
+def test_paging_matches_sql(catalog, filters, limit, offset):
+    assert catalog.query(limit=limit, offset=offset, **filters) == _sql(limit=limit, offset=offset, **filters)
+
+
+def test_inactive_products_are_not_listed(catalog):
+    titles = [item['title'] for item in catalog.query(q='Снятый')]
+    assert titles == []
+    assert _sql(q='Снятый') == []
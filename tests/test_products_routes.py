@@ -0,0 +1,20 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.middleware.telegram_auth import get_current_user
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_current_user] = lambda: {'tgid': 1}
+    # Без входа в контекст TestClient startup не выполняется: ни БД, ни фоновых задач
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize('params', [{'limit': -1}, {'offset': -1}])
+def test_negative_paging_is_rejected(client, params):
+    # Postgres отвечает на отрицательные LIMIT/OFFSET ошибкой, снимок - данными; роут отсекает оба пути
+    assert client.get('/products', params=params).status_code == 422
+